@@ -0,0 +1,255 @@
+"""
+Almacén Columnar de Detecciones Confirmadas para MedSeen
+
+Descripción:
+Este módulo guarda las detecciones confirmadas de una sesión en columnas
+NumPy de tipo fijo en lugar de una lista de diccionarios:
+
+- timestamp:  int64, nanosegundos desde la época Unix
+- clase:      uint8, índice en la tabla de nombres de instrumentos
+- confianza:  float32
+- fuente:     uint8, índice en la tabla de nombres de fuentes
+
+Las columnas crecen por bloques de tamaño fijo, sin copiar lo ya escrito.
+Las gráficas y reportes pueden leerlas como vistas NumPy o como una tabla
+Arrow sin copias, y la API anterior (lista de diccionarios y log de texto)
+sigue disponible como vistas perezosas que construyen cada elemento solo
+cuando se accede a él.
+
+Funcionalidades:
+- Inserción O(1) con crecimiento por bloques
+- Vistas NumPy por bloque y columnas consolidadas
+- Exportación a pyarrow.Table (sin copias) y pandas.DataFrame
+- Vistas compatibles: detecciones_confirmadas y log_detecciones
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: almacen_detecciones.py
+
+Requisitos:
+- numpy
+- pandas (a_dataframe)
+- pyarrow (opcional, a_arrow)
+"""
+
+import threading
+from collections.abc import Sequence
+from datetime import datetime
+
+import numpy as np
+
+TAM_BLOQUE = 4096
+
+COLUMNAS = {
+    'timestamp': np.int64,
+    'clase': np.uint8,
+    'confianza': np.float32,
+    'fuente': np.uint8
+}
+
+
+def a_epoch_ns(timestamp):
+    """datetime (hora local) -> nanosegundos desde la época"""
+    return int(round(timestamp.timestamp() * 1e9))
+
+
+def desde_epoch_ns(ns):
+    """Nanosegundos desde la época -> datetime (hora local)"""
+    return datetime.fromtimestamp(int(ns) / 1e9)
+
+
+class _Catalogo:
+    """Tabla nombre <-> id de uint8"""
+
+    def __init__(self, nombres=None):
+        self.nombres = []
+        self.ids = {}
+        for nombre in nombres or []:
+            self.id(nombre)
+
+    def id(self, nombre):
+        ident = self.ids.get(nombre)
+        if ident is None:
+            if len(self.nombres) >= 256:
+                raise ValueError("El catálogo admite a lo más 256 nombres (uint8)")
+            ident = self.ids[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return ident
+
+
+class AlmacenDetecciones:
+    """
+    Almacén columnar de solo inserción.
+
+    Un solo escritor (el hilo de detección) agrega filas; los lectores pueden
+    leer concurrentemente porque el número de filas visibles se publica
+    después de escribir cada fila.
+
+    Args:
+        nombres (iterable): Nombres de instrumentos en el orden de ids del modelo
+        tam_bloque (int): Filas por bloque de crecimiento
+    """
+
+    def __init__(self, nombres=None, tam_bloque=TAM_BLOQUE):
+        self.tam_bloque = tam_bloque
+        self.clases = _Catalogo(nombres)
+        self.fuentes = _Catalogo()
+        self._bloques = []
+        self._n = 0
+        self._lock = threading.Lock()
+        # Columnas contiguas para los lectores: crecen por duplicación y solo
+        # reciben las filas nuevas desde la última lectura
+        self._lock_lectura = threading.Lock()
+        self._consolidado = {c: np.empty(0, dtype=t) for c, t in COLUMNAS.items()}
+        self._n_consolidado = 0
+
+    def __len__(self):
+        return self._n
+
+    def _nuevo_bloque(self):
+        bloque = {c: np.empty(self.tam_bloque, dtype=t) for c, t in COLUMNAS.items()}
+        self._bloques.append(bloque)
+        return bloque
+
+    def agregar(self, instrumento, confianza, timestamp, fuente=""):
+        """Agrega una detección confirmada (O(1), sin copiar datos existentes)"""
+        with self._lock:
+            b, i = divmod(self._n, self.tam_bloque)
+            bloque = self._bloques[b] if b < len(self._bloques) else self._nuevo_bloque()
+            bloque['timestamp'][i] = a_epoch_ns(timestamp)
+            bloque['clase'][i] = self.clases.id(instrumento)
+            bloque['confianza'][i] = confianza
+            bloque['fuente'][i] = self.fuentes.id(fuente)
+            self._n += 1
+
+    def bloques(self):
+        """Vistas NumPy (sin copia) de cada bloque con datos"""
+        n = self._n
+        vistas = []
+        for b, bloque in enumerate(self._bloques):
+            filas = min(self.tam_bloque, n - b * self.tam_bloque)
+            if filas <= 0:
+                break
+            vistas.append({c: arreglo[:filas] for c, arreglo in bloque.items()})
+        return vistas
+
+    def columna(self, nombre):
+        """
+        Columna completa como un arreglo NumPy.
+
+        Con un solo bloque es una vista sin copia; con varios, es una vista
+        de un arreglo contiguo al que cada lectura solo copia las filas
+        agregadas desde la anterior (cada fila se copia una vez, no en cada
+        rerun de las gráficas).
+        """
+        n = self._n
+        if n <= self.tam_bloque:
+            return self._bloques[0][nombre][:n] if n else np.empty(0, dtype=COLUMNAS[nombre])
+
+        with self._lock_lectura:
+            desde = self._n_consolidado
+            if n > desde:
+                capacidad = len(self._consolidado[nombre])
+                if n > capacidad:
+                    capacidad = max(n, 2 * capacidad)
+                    for c in COLUMNAS:
+                        nuevo = np.empty(capacidad, dtype=COLUMNAS[c])
+                        nuevo[:desde] = self._consolidado[c][:desde]
+                        self._consolidado[c] = nuevo
+                # Copiar solo las filas nuevas, bloque por bloque
+                i = desde
+                while i < n:
+                    b, j = divmod(i, self.tam_bloque)
+                    fin = min(n, (b + 1) * self.tam_bloque)
+                    for c in COLUMNAS:
+                        self._consolidado[c][i:fin] = self._bloques[b][c][j:j + fin - i]
+                    i = fin
+                self._n_consolidado = n
+            # Las filas [0, n) ya no cambian: la vista sigue siendo válida aunque el arreglo crezca
+            return self._consolidado[nombre][:n]
+
+    def columnas(self):
+        return {c: self.columna(c) for c in COLUMNAS}
+
+    def a_arrow(self):
+        """Tabla pyarrow con una columna fragmentada por bloque (sin copias)"""
+        import pyarrow as pa
+
+        vistas = self.bloques()
+        datos = {c: pa.chunked_array([v[c] for v in vistas], type=pa.from_numpy_dtype(t))
+                 for c, t in COLUMNAS.items()}
+        datos['timestamp'] = datos['timestamp'].cast(pa.timestamp('ns'))
+        return pa.table(datos)
+
+    def a_dataframe(self):
+        """DataFrame con instrumento y fuente como categorías (sin strings por fila)"""
+        import pandas as pd
+
+        cols = self.columnas()
+        # Misma hora local que datetime.now(), como en la lista original
+        zona_local = datetime.now().astimezone().tzinfo
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(cols['timestamp'], unit='ns', utc=True).tz_convert(zona_local).tz_localize(None),
+            'instrumento': pd.Categorical.from_codes(cols['clase'].astype(np.int16), self.clases.nombres),
+            'confianza': cols['confianza'],
+            'fuente': pd.Categorical.from_codes(cols['fuente'].astype(np.int16), self.fuentes.nombres)
+        })
+
+    def fila(self, i):
+        """Fila i en el formato de diccionario original"""
+        n = self._n
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        b, j = divmod(i, self.tam_bloque)
+        bloque = self._bloques[b]
+        timestamp = desde_epoch_ns(bloque['timestamp'][j])
+        return {
+            'instrumento': self.clases.nombres[bloque['clase'][j]],
+            'confianza': float(bloque['confianza'][j]),
+            'tiempo': timestamp.strftime("%H:%M:%S"),
+            'timestamp': timestamp,
+            'fuente': self.fuentes.nombres[bloque['fuente'][j]]
+        }
+
+
+class _VistaPerezosa(Sequence):
+    """Secuencia de solo lectura que construye cada elemento al accederlo"""
+
+    def __init__(self, almacen):
+        self.almacen = almacen
+
+    def __len__(self):
+        return len(self.almacen)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._elemento(i) for i in range(*indice.indices(len(self)))]
+        return self._elemento(indice)
+
+    def _elemento(self, i):
+        raise NotImplementedError
+
+
+class VistaDetecciones(_VistaPerezosa):
+    """Compatibilidad con la lista de diccionarios detecciones_confirmadas"""
+
+    def _elemento(self, i):
+        return self.almacen.fila(i)
+
+
+class VistaLog(_VistaPerezosa):
+    """Compatibilidad con log_detecciones: el texto se genera solo al mostrarse"""
+
+    def __init__(self, almacen, con_fuente=False):
+        super().__init__(almacen)
+        self.con_fuente = con_fuente
+
+    def _elemento(self, i):
+        d = self.almacen.fila(i)
+        prefijo = f"[{d['fuente']}] " if self.con_fuente else ""
+        return f"{prefijo}{d['instrumento']} ({d['confianza']:.1%}) - {d['tiempo']}"
@@ -0,0 +1,136 @@
+"""
+Renderizador de Anotaciones para MedSeen
+
+Descripción:
+Este módulo dibuja las detecciones (cajas y etiquetas) de las cinco clases
+de instrumentos directamente sobre un búfer reutilizado. A diferencia de
+results[0].plot(), no pasa por el anotador genérico de Ultralytics ni crea
+copias intermedias: la conversión BGR→RGB para la interfaz se escribe
+directo en el búfer de salida y las cajas se dibujan encima, de modo que el
+frame queda listo para mostrarse sin otro cv2.cvtColor.
+
+Los búferes se usan en anillo (varios por fuente) porque la interfaz puede
+estar leyendo el frame anterior mientras el worker dibuja el siguiente.
+
+Funcionalidades:
+- Colores fijos por clase y tamaños de etiqueta precalculados
+- Salida RGB (interfaz Streamlit) o BGR (ventanas de OpenCV)
+- Anillo de búferes reutilizados: sin asignaciones por frame
+- Opción de omitir la anotación cuando nadie está viendo el video
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: anotacion.py
+
+Requisitos:
+- opencv-python (cv2)
+- numpy
+"""
+
+import cv2
+import numpy as np
+
+from backends_inferencia import NOMBRES_CLASES
+
+# Colores RGB por clase (paleta MedSeen)
+COLORES_CLASES = {
+    'botador': (43, 91, 132),
+    'elevador': (79, 195, 215),
+    'forceps': (39, 174, 96),
+    'gubia': (230, 126, 34),
+    'separador': (142, 68, 173)
+}
+COLOR_DEFECTO = (79, 195, 215)
+COLOR_TEXTO = (255, 255, 255)
+
+FUENTE_TEXTO = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class RenderizadorAnotaciones:
+    """
+    Dibuja ResultadoDeteccion sobre búferes reutilizados.
+
+    Args:
+        names (dict): Mapeo id -> nombre de clase si el resultado no trae uno
+        rgb (bool): True para salida RGB (Streamlit), False para BGR (cv2.imshow)
+        n_buferes (int): Tamaño del anillo de búferes
+    """
+
+    def __init__(self, names=None, rgb=True, n_buferes=3):
+        self.names = dict(names or NOMBRES_CLASES)
+        self.rgb = rgb
+        self.n_buferes = n_buferes
+        self._buferes = []
+        self._siguiente = 0
+        self._forma = None
+        self._estilo = None
+        self._etiquetas = {}
+
+    def _bufer(self, forma):
+        if forma != self._forma:
+            # Cambió la resolución: recrear el anillo y los tamaños de texto
+            self._forma = forma
+            self._buferes = [np.empty(forma, dtype=np.uint8) for _ in range(self.n_buferes)]
+            self._siguiente = 0
+            self._estilo = self._calcular_estilo(forma)
+            self._etiquetas = {}
+        bufer = self._buferes[self._siguiente]
+        self._siguiente = (self._siguiente + 1) % self.n_buferes
+        return bufer
+
+    @staticmethod
+    def _calcular_estilo(forma):
+        alto, ancho = forma[:2]
+        grosor = max(2, round((alto + ancho) / 2 * 0.003))
+        escala = max(0.4, grosor / 4)
+        return grosor, escala, max(1, grosor - 1)
+
+    def _color(self, nombre):
+        color = COLORES_CLASES.get(nombre, COLOR_DEFECTO)
+        return color if self.rgb else color[::-1]
+
+    def _tamano_etiqueta(self, nombre):
+        # El ancho de "nombre 0.00" no depende de la confianza: calcularlo una vez por clase
+        tamano = self._etiquetas.get(nombre)
+        if tamano is None:
+            _, escala, grosor_texto = self._estilo
+            (w, h), base = cv2.getTextSize(f"{nombre} 0.00", FUENTE_TEXTO, escala, grosor_texto)
+            tamano = self._etiquetas[nombre] = (w, h + base)
+        return tamano
+
+    def dibujar(self, resultado):
+        """
+        Devuelve el frame de resultado con las detecciones dibujadas.
+
+        El arreglo devuelto pertenece al anillo y se sobrescribe tras
+        n_buferes llamadas; quien necesite conservarlo debe copiarlo.
+        """
+        frame = resultado.orig_img
+        bufer = self._bufer(frame.shape)
+        if self.rgb:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=bufer)
+        else:
+            np.copyto(bufer, frame)
+
+        if len(resultado) == 0:
+            return bufer
+
+        grosor, escala, grosor_texto = self._estilo
+        alto = bufer.shape[0]
+        names = resultado.names or self.names
+        for (x1, y1, x2, y2), conf, k in zip(resultado.xyxy.astype(int).tolist(),
+                                             resultado.conf.tolist(), resultado.cls.tolist()):
+            nombre = names.get(int(k), str(int(k)))
+            color = self._color(nombre)
+            cv2.rectangle(bufer, (x1, y1), (x2, y2), color, grosor)
+
+            ancho_et, alto_et = self._tamano_etiqueta(nombre)
+            # Etiqueta sobre la caja; dentro de ella si no cabe arriba
+            y_et = y1 - alto_et - 2 if y1 - alto_et - 2 >= 0 else min(y1, alto - alto_et - 2)
+            cv2.rectangle(bufer, (x1, y_et), (x1 + ancho_et + 4, y_et + alto_et + 2), color, -1)
+            cv2.putText(bufer, f"{nombre} {conf:.2f}", (x1 + 2, y_et + alto_et - 2),
+                        FUENTE_TEXTO, escala, COLOR_TEXTO, grosor_texto, cv2.LINE_AA)
+        return bufer
@@ -0,0 +1,538 @@
+"""
+Backends de Inferencia en CPU para MedSeen
+
+Descripción:
+Este módulo define una interfaz común de inferencia para el modelo de
+instrumentos dentales con varias implementaciones intercambiables:
+
+- torch:    Ultralytics YOLO sobre PyTorch (best.pt, referencia)
+- onnx:     ONNX Runtime sobre el modelo exportado best.onnx
+- onnx_int8: ONNX Runtime sobre best_int8.onnx, cuantizado con cuantizacion.py
+- openvino: OpenVINO Runtime sobre el IR exportado best_openvino_model/
+- opencv:   OpenCV DNN sobre best.onnx
+
+El checkpoint best.pt se exporta una sola vez a ONNX y/o OpenVINO IR y el
+artefacto se guarda junto a los pesos. Los backends exportados realizan su
+propio letterbox, decodificación y NMS con NumPy/OpenCV, por lo que torch
+nunca se importa en la ruta de inferencia.
+
+Uso:
+python backends_inferencia.py --exportar onnx
+python backends_inferencia.py --backend onnx --verificar
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: backends_inferencia.py
+
+Requisitos:
+- numpy, opencv-python
+- onnxruntime (backend onnx)
+- openvino (backend openvino)
+- ultralytics + PyTorch (backend torch y exportación)
+"""
+
+import argparse
+import ast
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from medicion import CronometroNulo
+
+RUTA_MODELO_PT = "runs/detect/instrumentos_dentales_yolo_model5/weights/best.pt"
+RUTA_IMAGENES_TEST = "datasets/test/images"
+
+# Clases del dataset (datasets/data.yaml), usadas si el artefacto no trae metadatos
+NOMBRES_CLASES = {0: 'botador', 1: 'elevador', 2: 'forceps', 3: 'gubia', 4: 'separador'}
+
+DESCRIPCION_BACKENDS = {
+    'torch': "PyTorch (best.pt)",
+    'onnx': "ONNX Runtime",
+    'onnx_int8': "ONNX Runtime INT8",
+    'openvino': "OpenVINO",
+    'opencv': "OpenCV DNN"
+}
+
+COLOR_CAJA = (215, 195, 79)  # BGR del azul cyan MedSeen
+
+SIN_CRONOMETRO = CronometroNulo()
+
+# Etapas del pipeline de MedSeen -> claves de Results.speed de Ultralytics
+ETAPAS_ULTRALYTICS = {'preproceso': 'preprocess', 'inferencia': 'inference', 'postproceso': 'postprocess'}
+
+
+class ResultadoDeteccion:
+    """
+    Detecciones de un frame en formato independiente del backend.
+
+    Attributes:
+        xyxy (np.ndarray): Cajas (N, 4) en píxeles del frame original
+        conf (np.ndarray): Confianzas (N,)
+        cls (np.ndarray): Ids de clase (N,)
+        names (dict): Mapeo id -> nombre de clase
+        orig_img (np.ndarray): Frame original (BGR)
+    """
+
+    def __init__(self, xyxy, conf, cls, names, orig_img, plot=None):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+        self.names = names
+        self.orig_img = orig_img
+        self._plot = plot
+
+    def __len__(self):
+        return len(self.conf)
+
+    def plot(self):
+        """Devuelve una copia BGR del frame con las cajas dibujadas"""
+        if self._plot is not None:
+            return self._plot()
+
+        img = self.orig_img.copy()
+        for (x1, y1, x2, y2), c, k in zip(self.xyxy.astype(int), self.conf, self.cls):
+            cv2.rectangle(img, (x1, y1), (x2, y2), COLOR_CAJA, 2)
+            etiqueta = f"{self.names.get(int(k), int(k))} {c:.2f}"
+            cv2.putText(img, etiqueta, (x1, max(y1 - 6, 12)), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, COLOR_CAJA, 1, cv2.LINE_AA)
+        return img
+
+
+def letterbox(img, imgsz=640, color=114):
+    """
+    Redimensiona manteniendo la proporción y rellena hasta imgsz x imgsz.
+
+    Returns:
+        tuple: (imagen, escala, (pad_x, pad_y))
+    """
+    h, w = img.shape[:2]
+    escala = min(imgsz / h, imgsz / w)
+    nw, nh = int(round(w * escala)), int(round(h * escala))
+    if (nw, nh) != (w, h):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (imgsz - nw) // 2, (imgsz - nh) // 2
+    salida = np.full((imgsz, imgsz, 3), color, dtype=np.uint8)
+    salida[pad_y:pad_y + nh, pad_x:pad_x + nw] = img
+    return salida, escala, (pad_x, pad_y)
+
+
+def preprocesar(frames, imgsz=640):
+    """Convierte frames BGR en un tensor NCHW float32 RGB normalizado"""
+    blob = np.empty((len(frames), 3, imgsz, imgsz), dtype=np.float32)
+    transformaciones = []
+    for i, frame in enumerate(frames):
+        img, escala, pad = letterbox(frame, imgsz)
+        blob[i] = img[..., ::-1].transpose(2, 0, 1)
+        transformaciones.append((escala, pad))
+    blob *= 1.0 / 255.0
+    return blob, transformaciones
+
+
+def nms(xyxy, scores, iou=0.7):
+    """Non-Maximum Suppression en NumPy; devuelve índices conservados"""
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = xyxy.T
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    orden = scores.argsort()[::-1]
+    conservar = []
+    while orden.size:
+        i = orden[0]
+        conservar.append(i)
+        resto = orden[1:]
+        ix1 = np.maximum(x1[i], x1[resto])
+        iy1 = np.maximum(y1[i], y1[resto])
+        ix2 = np.minimum(x2[i], x2[resto])
+        iy2 = np.minimum(y2[i], y2[resto])
+        inter = (ix2 - ix1).clip(0) * (iy2 - iy1).clip(0)
+        union = areas[i] + areas[resto] - inter
+        orden = resto[inter <= iou * np.maximum(union, 1e-9)]
+    return np.asarray(conservar, dtype=np.int64)
+
+
+def nms_por_clase(xyxy, scores, cls, iou=0.7):
+    """NMS independiente por clase (desplaza las cajas de cada clase)"""
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    desplazamiento = cls.astype(np.float32)[:, None] * (float(xyxy.max()) + 1.0)
+    return nms(xyxy + desplazamiento, scores, iou)
+
+
+def postprocesar(salida, frames, transformaciones, names, conf=0.25, iou=0.7, max_det=300):
+    """
+    Decodifica la salida cruda de YOLOv8 (B, 4 + nc, N) en ResultadoDeteccion.
+    """
+    resultados = []
+    for b, frame in enumerate(frames):
+        pred = salida[b].T
+        puntajes = pred[:, 4:]
+        cls = puntajes.argmax(axis=1)
+        confs = puntajes[np.arange(len(cls)), cls]
+
+        mascara = confs >= conf
+        pred, cls, confs = pred[mascara], cls[mascara], confs[mascara]
+
+        cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        idx = nms_por_clase(xyxy, confs, cls, iou)[:max_det]
+        xyxy, confs, cls = xyxy[idx], confs[idx], cls[idx]
+
+        # Deshacer el letterbox: volver a coordenadas del frame original
+        escala, (pad_x, pad_y) = transformaciones[b]
+        xyxy -= (pad_x, pad_y, pad_x, pad_y)
+        xyxy /= escala
+        alto, ancho = frame.shape[:2]
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, ancho)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, alto)
+
+        resultados.append(ResultadoDeteccion(
+            xyxy.astype(np.float32), confs.astype(np.float32), cls.astype(np.int64), names, frame
+        ))
+    return resultados
+
+
+def ruta_artefacto(ruta_pt, formato):
+    """Ruta donde se guarda el modelo exportado junto a los pesos"""
+    base = os.path.splitext(ruta_pt)[0]
+    if formato == 'onnx':
+        return base + ".onnx"
+    if formato == 'onnx_int8':
+        return base + "_int8.onnx"
+    if formato == 'openvino':
+        return os.path.join(base + "_openvino_model", os.path.basename(base) + ".xml")
+    raise ValueError(f"Formato de exportación no soportado: {formato}")
+
+
+def exportar_modelo(ruta_pt, formato, forzar=False):
+    """
+    Exporta best.pt a ONNX, ONNX INT8 u OpenVINO IR una sola vez.
+
+    El artefacto se reutiliza mientras sea más reciente que el checkpoint,
+    o siempre que no haya checkpoint (despliegue solo con el artefacto).
+    La exportación requiere ultralytics/PyTorch, pero solo se ejecuta aquí.
+
+    Returns:
+        str: Ruta del artefacto exportado
+    """
+    destino = ruta_artefacto(ruta_pt, formato)
+    if not forzar and os.path.exists(destino):
+        if not os.path.exists(ruta_pt) or os.path.getmtime(destino) >= os.path.getmtime(ruta_pt):
+            return destino
+
+    if formato == 'onnx_int8':
+        # Cuantización estática calibrada con datasets/valid/images
+        from cuantizacion import cuantizar_modelo
+
+        return cuantizar_modelo(ruta_pt)
+
+    from ultralytics import YOLO
+
+    # Ejes dinámicos: permiten batch variable y distintos tamaños de entrada
+    YOLO(ruta_pt).export(format=formato, dynamic=True)
+    if not os.path.exists(destino):
+        raise RuntimeError(f"La exportación a {formato} no generó {destino}")
+    return destino
+
+
+def _leer_nombres(metadatos):
+    try:
+        nombres = ast.literal_eval(metadatos['names'])
+        return {int(k): v for k, v in nombres.items()}
+    except (KeyError, ValueError, SyntaxError, AttributeError):
+        return dict(NOMBRES_CLASES)
+
+
+class BackendInferencia:
+    """Interfaz común: predecir(frames) -> lista de ResultadoDeteccion"""
+
+    nombre = ""
+
+    def __init__(self, ruta_pt, imgsz=640):
+        self.ruta_pt = ruta_pt
+        self.imgsz = imgsz
+        self.names = dict(NOMBRES_CLASES)
+
+    def _inferir(self, blob):
+        raise NotImplementedError
+
+    def predecir(self, frames, conf=0.25, iou=0.7, imgsz=None, cronometro=SIN_CRONOMETRO):
+        """
+        Ejecuta la detección sobre una lista de frames BGR en una sola llamada.
+
+        Args:
+            cronometro: Opcional, registra las etapas preproceso/inferencia/postproceso
+
+        Returns:
+            list: Un ResultadoDeteccion por frame
+        """
+        imgsz = imgsz or self.imgsz
+        with cronometro.medir('preproceso'):
+            blob, transformaciones = preprocesar(frames, imgsz)
+        with cronometro.medir('inferencia'):
+            salida = self._inferir(blob)
+        with cronometro.medir('postproceso'):
+            return postprocesar(salida, frames, transformaciones, self.names, conf, iou)
+
+    def calentar(self):
+        """Primera inferencia para inicializar el runtime"""
+        self.predecir([np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)])
+
+
+class BackendTorch(BackendInferencia):
+    """Ultralytics YOLO sobre PyTorch (referencia, importa torch)"""
+
+    nombre = 'torch'
+
+    def __init__(self, ruta_pt, imgsz=640):
+        super().__init__(ruta_pt, imgsz)
+        from ultralytics import YOLO
+
+        self.modelo = YOLO(ruta_pt)
+        self.names = dict(self.modelo.names)
+
+    def predecir(self, frames, conf=0.25, iou=0.7, imgsz=None, cronometro=SIN_CRONOMETRO):
+        results = self.modelo.predict(source=list(frames), conf=conf, iou=iou,
+                                      imgsz=imgsz or self.imgsz, verbose=False)
+        resultados = []
+        for r, frame in zip(results, frames):
+            # Ultralytics ya mide sus etapas (ms por imagen)
+            for etapa, clave in ETAPAS_ULTRALYTICS.items():
+                if r.speed.get(clave) is not None:
+                    cronometro.registrar(etapa, r.speed[clave] / 1000.0)
+            boxes = r.boxes
+            resultados.append(ResultadoDeteccion(
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy(),
+                boxes.cls.cpu().numpy().astype(np.int64),
+                self.names, frame, plot=r.plot
+            ))
+        return resultados
+
+
+class BackendONNXRuntime(BackendInferencia):
+    """ONNX Runtime con el proveedor de CPU"""
+
+    nombre = 'onnx'
+    formato = 'onnx'
+
+    def __init__(self, ruta_pt, imgsz=640):
+        super().__init__(ruta_pt, imgsz)
+        import onnxruntime as ort
+
+        ruta = exportar_modelo(ruta_pt, self.formato)
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sesion = ort.InferenceSession(ruta, opciones, providers=['CPUExecutionProvider'])
+        self.entrada = self.sesion.get_inputs()[0].name
+        self.names = _leer_nombres(self.sesion.get_modelmeta().custom_metadata_map)
+
+    def _inferir(self, blob):
+        return self.sesion.run(None, {self.entrada: blob})[0]
+
+
+class BackendONNXInt8(BackendONNXRuntime):
+    """ONNX Runtime sobre el modelo cuantizado a INT8 (pesos y activaciones)"""
+
+    nombre = 'onnx_int8'
+    formato = 'onnx_int8'
+
+
+class BackendOpenVINO(BackendInferencia):
+    """OpenVINO Runtime sobre el IR exportado"""
+
+    nombre = 'openvino'
+
+    def __init__(self, ruta_pt, imgsz=640):
+        super().__init__(ruta_pt, imgsz)
+        import openvino as ov
+
+        ruta = exportar_modelo(ruta_pt, 'openvino')
+        core = ov.Core()
+        self.compilado = core.compile_model(core.read_model(ruta), 'CPU')
+        self.salida = self.compilado.output(0)
+        self.names = self._nombres_metadata(os.path.dirname(ruta))
+
+    @staticmethod
+    def _nombres_metadata(carpeta):
+        ruta_meta = os.path.join(carpeta, "metadata.yaml")
+        try:
+            import yaml
+
+            with open(ruta_meta, encoding="utf-8") as f:
+                nombres = yaml.safe_load(f)['names']
+            return {int(k): v for k, v in nombres.items()}
+        except Exception:
+            return dict(NOMBRES_CLASES)
+
+    def _inferir(self, blob):
+        return self.compilado([blob])[self.salida]
+
+
+class BackendOpenCVDNN(BackendInferencia):
+    """OpenCV DNN sobre best.onnx (sin dependencias adicionales)"""
+
+    nombre = 'opencv'
+
+    def __init__(self, ruta_pt, imgsz=640):
+        super().__init__(ruta_pt, imgsz)
+        ruta = exportar_modelo(ruta_pt, 'onnx')
+        self.red = cv2.dnn.readNetFromONNX(ruta)
+        self.red.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.red.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def _inferir(self, blob):
+        # OpenCV DNN maneja mejor batch 1: se procesa cada imagen por separado
+        salidas = []
+        for i in range(len(blob)):
+            self.red.setInput(blob[i:i + 1])
+            salidas.append(self.red.forward())
+        return np.concatenate(salidas, axis=0)
+
+
+BACKENDS = {
+    'torch': BackendTorch,
+    'onnx': BackendONNXRuntime,
+    'onnx_int8': BackendONNXInt8,
+    'openvino': BackendOpenVINO,
+    'opencv': BackendOpenCVDNN
+}
+
+
+def crear_backend(ruta_pt, backend='torch', imgsz=640):
+    """Construye el backend solicitado para el checkpoint dado"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](ruta_pt, imgsz)
+
+
+def cargar_backend(ruta_pt, backend='torch', imgsz=640):
+    """Crea y calienta un backend (cargador usado por el registro de modelos)"""
+    modelo = crear_backend(ruta_pt, backend, imgsz)
+    modelo.calentar()
+    return modelo
+
+
+def _iou_matriz(a, b):
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = (ix2 - ix1).clip(0) * (iy2 - iy1).clip(0)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def verificar_paridad(backend, ruta_pt=RUTA_MODELO_PT, carpeta=RUTA_IMAGENES_TEST,
+                      conf=0.25, iou_min=0.9, tolerancia_conf=0.05):
+    """
+    Compara las salidas de un backend exportado contra las de PyTorch.
+
+    Una detección coincide si tiene la misma clase, IoU >= iou_min y una
+    diferencia de confianza <= tolerancia_conf.
+
+    Returns:
+        dict: Resumen con coincidencias, diferencias y tiempos por backend
+    """
+    referencia = crear_backend(ruta_pt, 'torch')
+    candidato = crear_backend(ruta_pt, backend)
+
+    rutas = sorted(glob.glob(os.path.join(carpeta, "*.jpg")))
+    total_ref = coincidencias = 0
+    max_dif_conf = 0.0
+    tiempos = {'torch': 0.0, backend: 0.0}
+    discrepancias = []
+
+    for ruta in rutas:
+        frame = cv2.imread(ruta)
+        if frame is None:
+            continue
+
+        t0 = time.perf_counter()
+        ref = referencia.predecir([frame], conf=conf)[0]
+        t1 = time.perf_counter()
+        cand = candidato.predecir([frame], conf=conf)[0]
+        t2 = time.perf_counter()
+        tiempos['torch'] += t1 - t0
+        tiempos[backend] += t2 - t1
+
+        total_ref += len(ref)
+        if len(ref) and len(cand):
+            ious = _iou_matriz(ref.xyxy, cand.xyxy)
+            usados = set()
+            for i in range(len(ref)):
+                for j in np.argsort(-ious[i]):
+                    if ious[i, j] < iou_min:
+                        break
+                    # Ya emparejada con otra referencia: probar el siguiente candidato
+                    if j in usados or cand.cls[j] != ref.cls[i]:
+                        continue
+                    dif = abs(float(cand.conf[j]) - float(ref.conf[i]))
+                    max_dif_conf = max(max_dif_conf, dif)
+                    if dif <= tolerancia_conf:
+                        coincidencias += 1
+                        usados.add(j)
+                    break
+
+        if len(ref) != len(cand):
+            discrepancias.append(os.path.basename(ruta))
+
+    n = max(len(rutas), 1)
+    return {
+        'backend': backend,
+        'imagenes': len(rutas),
+        'detecciones_referencia': total_ref,
+        'coincidencias': coincidencias,
+        'tasa_coincidencia': coincidencias / total_ref if total_ref else 1.0,
+        'max_diferencia_confianza': max_dif_conf,
+        'imagenes_con_diferente_conteo': discrepancias,
+        'ms_por_imagen': {k: v / n * 1000 for k, v in tiempos.items()}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportación y verificación de backends de inferencia")
+    parser.add_argument("--modelo", default=RUTA_MODELO_PT, help="Ruta al checkpoint best.pt")
+    parser.add_argument("--exportar", choices=['onnx', 'onnx_int8', 'openvino'], help="Exportar el modelo a este formato")
+    parser.add_argument("--forzar", action="store_true", help="Reexportar aunque exista el artefacto")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != 'torch'], default='onnx',
+                        help="Backend a verificar contra PyTorch")
+    parser.add_argument("--verificar", action="store_true", help="Verificar paridad contra PyTorch")
+    parser.add_argument("--imagenes", default=RUTA_IMAGENES_TEST, help="Carpeta de imágenes de prueba")
+    parser.add_argument("--min-coincidencia", type=float, default=0.95,
+                        help="Tasa mínima de coincidencia para aprobar la verificación")
+    args = parser.parse_args(argv)
+
+    if args.exportar:
+        print(f"✅ Exportado: {exportar_modelo(args.modelo, args.exportar, args.forzar)}")
+
+    if args.verificar:
+        resumen = verificar_paridad(args.backend, args.modelo, args.imagenes)
+        print(f"Backend: {resumen['backend']} | Imágenes: {resumen['imagenes']}")
+        print(f"Coincidencias: {resumen['coincidencias']}/{resumen['detecciones_referencia']} "
+              f"({resumen['tasa_coincidencia']:.1%})")
+        print(f"Máx. diferencia de confianza: {resumen['max_diferencia_confianza']:.4f}")
+        for nombre, ms in resumen['ms_por_imagen'].items():
+            print(f"  {nombre}: {ms:.1f} ms/imagen")
+        if resumen['imagenes_con_diferente_conteo']:
+            print(f"⚠️ Conteo distinto en: {', '.join(resumen['imagenes_con_diferente_conteo'])}")
+
+        if resumen['tasa_coincidencia'] < args.min_coincidencia:
+            print("❌ Paridad insuficiente")
+            return 1
+        print("✅ Paridad verificada")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
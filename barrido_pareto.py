@@ -0,0 +1,257 @@
+"""
+Barrido Velocidad/Precisión (Frente de Pareto) para MedSeen
+
+Descripción:
+Este script entrena (o ajusta a partir de pesos previos) una rejilla de
+variantes de modelo YOLOv8 y tamaños de entrada, y para cada una mide:
+
+- mAP50 y mAP50-95 con el mismo flujo de validación de
+  validate_dental_instruments_yolo.py (model.val sobre datasets/data.yaml),
+  evaluados sobre el mismo artefacto exportado cuya latencia se mide (así el
+  piso de precisión también aplica a modelos cuantizados INT8)
+- Latencia en CPU por imagen sobre datasets/test/images, con el backend de
+  despliegue de la aplicación (ONNX Runtime por defecto)
+
+Con esos puntos calcula el frente de Pareto (ninguna otra variante es a la
+vez más rápida y más precisa), escribe una tabla y una gráfica, y recomienda
+la variante más rápida que cumple el piso de precisión configurado.
+
+Cada variante se entrena en runs/barrido/<modelo>_<imgsz> (nombres
+deterministas, sin model2...model43) y sus resultados se guardan en
+runs/barrido/resultados.json: volver a ejecutar el barrido solo entrena y
+mide lo que falta.
+
+Uso:
+python barrido_pareto.py
+python barrido_pareto.py --modelos yolov8n.pt yolov8s.pt --tamanos 320 416 512 640 --epocas 50
+python barrido_pareto.py --metrica map50_95 --piso 0.60 --solo-reporte
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: barrido_pareto.py
+
+Requisitos:
+- ultralytics + PyTorch (entrenamiento y validación)
+- onnxruntime (latencia con el backend por defecto)
+- matplotlib (gráfica)
+- backends_inferencia.py, cuantizacion.py, train_dental_instruments_yolo.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from backends_inferencia import BACKENDS, RUTA_IMAGENES_TEST, exportar_modelo, ruta_artefacto
+from cuantizacion import RUTA_DATA_YAML, RUTA_REPORTES, cuantizar_modelo, evaluar_map, imagenes, medir_latencia
+from train_dental_instruments_yolo import parametros_entrenamiento
+
+PROYECTO_BARRIDO = "runs/barrido"
+RUTA_RESULTADOS = os.path.join(PROYECTO_BARRIDO, "resultados.json")
+
+MODELOS = ("yolov8n.pt", "yolov8s.pt")
+TAMANOS = (320, 416, 512, 640)
+METRICAS = {'map50': "mAP50", 'map50_95': "mAP50-95"}
+
+
+def nombre_variante(modelo, imgsz):
+    """yolov8n.pt, 416 -> yolov8n_416 (también para pesos propios: best.pt -> best_416)"""
+    return f"{os.path.splitext(os.path.basename(modelo))[0]}_{imgsz}"
+
+
+def entrenar_variante(modelo, imgsz, epocas, batch="auto", device="auto", reentrenar=False):
+    """
+    Entrena una variante con la misma configuración que train_dental_instruments_yolo.py.
+
+    Returns:
+        str: Ruta de best.pt de la variante
+    """
+    nombre = nombre_variante(modelo, imgsz)
+    pesos = os.path.join(PROYECTO_BARRIDO, nombre, "weights", "best.pt")
+    if os.path.exists(pesos) and not reentrenar:
+        return pesos
+
+    from ultralytics import YOLO
+
+    # Dispositivo, batch, caché y workers resueltos igual que en el entrenamiento principal
+    parametros = parametros_entrenamiento(device, imgsz, batch, data=RUTA_DATA_YAML)
+    print(f"🏋️ Entrenando {nombre} ({epocas} épocas, {parametros['device']}, batch {parametros['batch']})...")
+    YOLO(modelo).train(data=RUTA_DATA_YAML, epochs=epocas, imgsz=imgsz,
+                       project=PROYECTO_BARRIDO, name=nombre, exist_ok=True, **parametros)
+    return pesos
+
+
+def medir_variante(pesos, imgsz, backend, rutas_test):
+    if backend == 'onnx_int8':
+        # Calibrar a la resolución de la variante, fuera de la medición de latencia
+        # (exportar_modelo cuantizaría con el imgsz fijo de 640)
+        int8 = ruta_artefacto(pesos, 'onnx_int8')
+        if not os.path.exists(int8) or os.path.getmtime(int8) < os.path.getmtime(pesos):
+            print(f"🔧 Cuantizando {pesos} a {imgsz} px...")
+            cuantizar_modelo(pesos, imgsz=imgsz)
+    # La precisión se mide sobre el mismo artefacto que se cronometra (no sobre el .pt FP32)
+    ruta_map = exportar_modelo(pesos, 'onnx' if backend == 'opencv' else backend)
+    fila = {'pesos': pesos, 'imgsz': imgsz, 'backend': backend, 'ruta_map': ruta_map}
+    fila.update(evaluar_map(ruta_map, RUTA_DATA_YAML, imgsz))
+    fila['ms_por_imagen'] = medir_latencia(pesos, backend, rutas_test, imgsz)
+    return fila
+
+
+def frente_pareto(filas, metrica):
+    """Filas no dominadas: ninguna otra es tan rápida y tan precisa, y mejor en algo"""
+    frente = []
+    for f in filas:
+        dominada = any(
+            o['ms_por_imagen'] <= f['ms_por_imagen'] and o[metrica] >= f[metrica]
+            and (o['ms_por_imagen'] < f['ms_por_imagen'] or o[metrica] > f[metrica])
+            for o in filas
+        )
+        if not dominada:
+            frente.append(f)
+    return sorted(frente, key=lambda f: f['ms_por_imagen'])
+
+
+def recomendar(filas, metrica, piso):
+    """La variante más rápida con metrica >= piso (None si ninguna lo cumple)"""
+    aptas = [f for f in filas if f[metrica] >= piso]
+    return min(aptas, key=lambda f: f['ms_por_imagen']) if aptas else None
+
+
+def graficar(filas, frente, recomendada, metrica, piso, destino):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.scatter([f['ms_por_imagen'] for f in filas], [f[metrica] for f in filas],
+               color="#B0BEC5", label="Variantes")
+    ax.plot([f['ms_por_imagen'] for f in frente], [f[metrica] for f in frente],
+            "o-", color="#4FC3D7", label="Frente de Pareto")
+    for f in filas:
+        ax.annotate(f['variante'], (f['ms_por_imagen'], f[metrica]), fontsize=7,
+                    xytext=(4, 4), textcoords="offset points")
+    ax.axhline(piso, linestyle="--", color="#E57373", label=f"Piso {METRICAS[metrica]} {piso:.2f}")
+    if recomendada:
+        ax.scatter([recomendada['ms_por_imagen']], [recomendada[metrica]], s=160,
+                   facecolors="none", edgecolors="#2E7D32", linewidths=2, label="Recomendada")
+    ax.set_xlabel(f"Latencia CPU por imagen (ms, {filas[0]['backend']})")
+    ax.set_ylabel(METRICAS[metrica])
+    ax.set_title("MedSeen: velocidad vs. precisión")
+    ax.grid(alpha=0.3)
+    ax.legend(loc="lower right")
+    fig.tight_layout()
+    fig.savefig(destino, dpi=150)
+    plt.close(fig)
+
+
+def escribir_reporte(filas, metrica, piso, destino):
+    """Tabla Markdown (frente marcado con ★) más JSON y PNG con el mismo nombre base"""
+    frente = frente_pareto(filas, metrica)
+    recomendada = recomendar(filas, metrica, piso)
+    en_frente = {f['variante'] for f in frente}
+
+    lineas = [
+        "# Barrido velocidad/precisión — MedSeen",
+        "",
+        f"Dataset: {RUTA_DATA_YAML} • Latencia: {RUTA_IMAGENES_TEST} • Piso: {METRICAS[metrica]} >= {piso:.2f}",
+        "",
+        "| | Variante | imgsz | mAP50 | mAP50-95 | ms/imagen (CPU) |",
+        "|---|---|---:|---:|---:|---:|",
+    ]
+    for f in sorted(filas, key=lambda f: f['ms_por_imagen']):
+        marca = "★" if f['variante'] in en_frente else ""
+        lineas.append(f"| {marca} | {f['variante']} | {f['imgsz']} | {f['map50']:.3f} "
+                      f"| {f['map50_95']:.3f} | {f['ms_por_imagen']:.1f} |")
+    lineas.append("")
+    lineas.append("★ = frente de Pareto.")
+    if recomendada:
+        lineas.append(f"Recomendada: **{recomendada['variante']}** ({recomendada['pesos']}), "
+                      f"{METRICAS[metrica]} {recomendada[metrica]:.3f} a {recomendada['ms_por_imagen']:.1f} ms/imagen.")
+    else:
+        lineas.append(f"Ninguna variante alcanza {METRICAS[metrica]} >= {piso:.2f}.")
+
+    carpeta = os.path.dirname(destino)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    base = os.path.splitext(destino)[0]
+    with open(destino, "w", encoding="utf-8") as archivo:
+        archivo.write("\n".join(lineas) + "\n")
+    with open(base + ".json", "w", encoding="utf-8") as archivo:
+        json.dump({'metrica': metrica, 'piso': piso, 'recomendada': recomendada,
+                   'frente': [f['variante'] for f in frente], 'variantes': filas},
+                  archivo, indent=2, ensure_ascii=False)
+    graficar(filas, frente, recomendada, metrica, piso, base + ".png")
+    return "\n".join(lineas), recomendada
+
+
+def cargar_resultados():
+    if os.path.exists(RUTA_RESULTADOS):
+        with open(RUTA_RESULTADOS, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def guardar_resultados(resultados):
+    os.makedirs(PROYECTO_BARRIDO, exist_ok=True)
+    temporal = RUTA_RESULTADOS + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, RUTA_RESULTADOS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de modelos e imgsz con frente de Pareto")
+    parser.add_argument("--modelos", nargs="+", default=list(MODELOS),
+                        help="Pesos iniciales (yolov8n.pt, yolov8s.pt o un best.pt propio para ajustar)")
+    parser.add_argument("--tamanos", nargs="+", type=int, default=list(TAMANOS), help="Tamaños de entrada")
+    parser.add_argument("--epocas", type=int, default=100, help="Épocas por variante")
+    parser.add_argument("--batch", default="auto", help="Tamaño del batch de entrenamiento o 'auto'")
+    parser.add_argument("--device", default="auto", help="Dispositivo de entrenamiento (auto, cuda, mps, cpu, 0...)")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != 'torch'], default="onnx",
+                        help="Backend de despliegue para medir la latencia en CPU")
+    parser.add_argument("--metrica", choices=list(METRICAS), default="map50", help="Métrica del piso")
+    parser.add_argument("--piso", type=float, default=0.85, help="Precisión mínima aceptable")
+    parser.add_argument("--reentrenar", action="store_true", help="Entrenar aunque existan pesos")
+    parser.add_argument("--remedir", action="store_true", help="Volver a medir variantes ya medidas")
+    parser.add_argument("--solo-reporte", action="store_true",
+                        help="No entrenar ni medir; solo regenerar el reporte con lo guardado")
+    parser.add_argument("--salida", default=os.path.join(RUTA_REPORTES, "pareto.md"),
+                        help="Ruta del reporte Markdown (se escriben también .json y .png)")
+    args = parser.parse_args(argv)
+
+    resultados = cargar_resultados()
+    if not args.solo_reporte:
+        rutas_test = imagenes(RUTA_IMAGENES_TEST)
+        for modelo in args.modelos:
+            for imgsz in args.tamanos:
+                variante = nombre_variante(modelo, imgsz)
+                previa = resultados.get(variante)
+                # Filas de otro backend (o anteriores a medir mAP sobre el artefacto) se vuelven a medir
+                vigente = previa is not None and previa.get('backend') == args.backend and 'ruta_map' in previa
+                if vigente and not (args.remedir or args.reentrenar):
+                    continue
+                pesos = entrenar_variante(modelo, imgsz, args.epocas, args.batch, args.device, args.reentrenar)
+                print(f"📏 Midiendo {variante}...")
+                fila = medir_variante(pesos, imgsz, args.backend, rutas_test)
+                fila['variante'] = variante
+                resultados[variante] = fila
+                # Guardar tras cada variante: un barrido interrumpido retoma donde quedó
+                guardar_resultados(resultados)
+
+    if not resultados:
+        print("❌ No hay variantes medidas")
+        return 1
+
+    tabla, recomendada = escribir_reporte(list(resultados.values()), args.metrica, args.piso, args.salida)
+    print()
+    print(tabla)
+    print(f"\n💾 Reporte guardado en {args.salida}")
+    return 0 if recomendada else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
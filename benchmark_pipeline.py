@@ -0,0 +1,254 @@
+"""
+Benchmark del Pipeline Completo de MedSeen
+
+Descripción:
+Este script mide, sin interfaz gráfica, dónde se va el tiempo de cada frame
+en el pipeline de detección. Ejecuta dos escenarios sobre entradas
+reproducibles (datasets/test/images, clips grabados o la fuente sintética)
+en modo replay, de modo que todos los frames se procesan y los resultados
+son comparables entre commits y backends:
+
+- detector: MedSeenDentalDetector con su hilo de captura, lote de
+  predicción, confirmación, anotación (ya en RGB) y la codificación JPEG
+  que realiza st.image (usada como sustituto de la visualización)
+- camara:   el bucle de camara.py sin ventana
+
+Para cada escenario se reporta el throughput (frames/s), la latencia
+p50/p95/p99 de cada etapa y el pico de memoria residente, y todo se guarda
+en un JSON que puede compararse contra una línea base.
+
+Uso:
+python benchmark_pipeline.py --backend onnx --salida bench_onnx.json
+python benchmark_pipeline.py --backend onnx --fuentes datasets/test/images clip.mp4
+python benchmark_pipeline.py --backend onnx --comparar bench_base.json
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: benchmark_pipeline.py
+
+Requisitos:
+- backends_inferencia.py, captura.py, medicion.py
+- medSeen_dental_detector_app.py (escenario detector)
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import cv2
+
+from backends_inferencia import BACKENDS, RUTA_IMAGENES_TEST, RUTA_MODELO_PT, cargar_backend
+from captura import crear_fuente
+from medicion import CronometroEtapas, memoria_pico_mb
+
+ESCENARIOS = ('detector', 'camara')
+
+# Diferencias menores a esto en p95 se consideran ruido de medición
+MIN_DIFERENCIA_MS = 0.5
+
+
+def commit_actual():
+    """Hash corto del commit actual (None fuera de un repositorio git)"""
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True)
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def simular_visualizacion(detector, cronometro):
+    """Lo que hace la UI con cada frame anotado: la codificación de st.image"""
+    for flujo in detector.flujos:
+        frame, _ = detector.capturar_y_procesar(flujo.indice)
+        if frame is None:
+            continue
+        with cronometro.medir('visualizacion'):
+            cv2.imencode(".jpg", frame)
+
+
+def importar_detector():
+    """Importa la app fuera de `streamlit run` (antes de medir: la importación no cuenta)"""
+    from streamlit.logger import set_log_level
+    from medSeen_dental_detector_app import MedSeenDentalDetector
+
+    # Silenciar los avisos del modo "bare" de Streamlit
+    set_log_level("error")
+    return MedSeenDentalDetector
+
+
+def medir_detector(modelo, ruta_modelo, fuente, conf, cronometro, detectar_cada=1):
+    """Ejecuta MedSeenDentalDetector sobre la fuente hasta agotarla"""
+    MedSeenDentalDetector = importar_detector()
+    detector = MedSeenDentalDetector(ruta_modelo, confidence=conf, fuentes=[fuente],
+                                     modo_replay=True, cronometro=cronometro, detectar_cada=detectar_cada)
+    detector.model = modelo
+    if not detector.iniciar_camara():
+        raise RuntimeError(f"No se pudo abrir la fuente: {fuente}")
+
+    # El bucle del worker, pero en este hilo para incluir la visualización simulada
+    detector.running = True
+    frames = 0
+    try:
+        while True:
+            detector._aviso_frames.wait(0.5)
+            detector._aviso_frames.clear()
+            procesados = detector.procesar_pendientes()
+            if procesados:
+                frames += procesados
+                simular_visualizacion(detector, cronometro)
+            elif detector.fuentes_agotadas():
+                break
+    finally:
+        detector.running = False
+        detector._detener_capturas()
+    return frames
+
+
+def medir_camara(modelo, fuente, conf, cronometro, detectar_cada=1):
+    """Ejecuta el bucle de camara.py sin ventana sobre la fuente"""
+    import camara
+
+    fuente = crear_fuente(fuente)
+    if not fuente.abrir():
+        raise RuntimeError(f"No se pudo abrir la fuente: {fuente.nombre}")
+    return camara.ejecutar(modelo, fuente, conf=conf, modo_replay=True, mostrar=False,
+                           cronometro=cronometro, detectar_cada=detectar_cada)
+
+
+def ejecutar_escenario(escenario, modelo, ruta_modelo, fuente, conf, detectar_cada=1):
+    """
+    Mide un escenario sobre una fuente.
+
+    Returns:
+        dict: frames, segundos, fps, etapas (percentiles) y memoria pico
+    """
+    cronometro = CronometroEtapas()
+    inicio = time.perf_counter()
+    if escenario == 'detector':
+        frames = medir_detector(modelo, ruta_modelo, fuente, conf, cronometro, detectar_cada)
+    else:
+        frames = medir_camara(modelo, fuente, conf, cronometro, detectar_cada)
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'escenario': escenario,
+        'fuente': str(fuente),
+        'frames': frames,
+        'segundos': segundos,
+        'fps': frames / segundos if segundos > 0 else 0.0,
+        'etapas': cronometro.resumen(),
+        'contadores': dict(cronometro.contadores),
+        # ru_maxrss es monótono: incluye el pico de los escenarios anteriores
+        'memoria_pico_mb': memoria_pico_mb()
+    }
+
+
+def imprimir_escenario(r):
+    print(f"\n▶ {r['escenario']} · {r['fuente']}: {r['frames']} frames en "
+          f"{r['segundos']:.2f}s ({r['fps']:.1f} FPS) · pico RSS {r['memoria_pico_mb']:.0f} MB")
+    print(f"  {'etapa':<18}{'n':>7}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for etapa, s in r['etapas'].items():
+        print(f"  {etapa:<18}{s['n']:>7}{s['media_ms']:>10.2f}{s['p50_ms']:>10.2f}"
+              f"{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+
+
+def comparar(actual, base, tolerancia=0.10):
+    """
+    Compara dos reportes por escenario/fuente: FPS y p95 de cada etapa.
+
+    Returns:
+        list: Descripciones de las regresiones mayores a la tolerancia
+    """
+    regresiones = []
+    previos = {(r['escenario'], r['fuente']): r for r in base['resultados']}
+    print(f"\n📊 Comparación contra {base.get('commit') or 'línea base'} ({base.get('backend')})")
+    for r in actual['resultados']:
+        p = previos.get((r['escenario'], r['fuente']))
+        if p is None:
+            continue
+        cambio_fps = (r['fps'] - p['fps']) / p['fps'] if p['fps'] else 0.0
+        print(f"  {r['escenario']} · {r['fuente']}: {p['fps']:.1f} → {r['fps']:.1f} FPS ({cambio_fps:+.1%})")
+        if cambio_fps < -tolerancia:
+            regresiones.append(f"{r['escenario']}/{r['fuente']}: FPS {cambio_fps:+.1%}")
+
+        for etapa, s in r['etapas'].items():
+            previa = p['etapas'].get(etapa)
+            if not previa or previa['p95_ms'] <= 0:
+                continue
+            cambio = (s['p95_ms'] - previa['p95_ms']) / previa['p95_ms']
+            print(f"    {etapa:<18} p95 {previa['p95_ms']:8.2f} → {s['p95_ms']:8.2f} ms ({cambio:+.1%})")
+            if cambio > tolerancia and s['p95_ms'] - previa['p95_ms'] > MIN_DIFERENCIA_MS:
+                regresiones.append(f"{r['escenario']}/{r['fuente']}/{etapa}: p95 {cambio:+.1%}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de detección de MedSeen")
+    parser.add_argument("--modelo", default=RUTA_MODELO_PT, help="Ruta al checkpoint best.pt")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="torch", help="Backend de inferencia")
+    parser.add_argument("--conf", type=float, default=0.5, help="Confianza mínima")
+    parser.add_argument("--fuentes", nargs="+", default=[RUTA_IMAGENES_TEST, "sintetica:300"],
+                        help="Directorios de imágenes, clips de video o 'sintetica[:N]'")
+    parser.add_argument("--escenarios", nargs="+", choices=ESCENARIOS, default=list(ESCENARIOS))
+    parser.add_argument("--detectar-cada", type=int, default=1,
+                        help="Correr el modelo 1 de cada N frames y seguir las cajas en los demás")
+    parser.add_argument("--salida", default=None, help="Ruta del reporte JSON")
+    parser.add_argument("--comparar", default=None, help="Reporte JSON base contra el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.10,
+                        help="Regresión relativa máxima permitida al comparar (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    print(f"⏳ Cargando backend {args.backend}...")
+    inicio = time.perf_counter()
+    modelo = cargar_backend(args.modelo, backend=args.backend)
+    carga = time.perf_counter() - inicio
+
+    reporte = {
+        'commit': commit_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'backend': args.backend,
+        'modelo': args.modelo,
+        'conf': args.conf,
+        'detectar_cada': args.detectar_cada,
+        'plataforma': {'python': platform.python_version(), 'sistema': platform.platform(),
+                       'procesador': platform.processor(), 'opencv': cv2.__version__},
+        'carga_modelo_s': carga,
+        'resultados': []
+    }
+
+    if 'detector' in args.escenarios:
+        importar_detector()
+
+    for escenario in args.escenarios:
+        for fuente in args.fuentes:
+            resultado = ejecutar_escenario(escenario, modelo, args.modelo, fuente, args.conf, args.detectar_cada)
+            imprimir_escenario(resultado)
+            reporte['resultados'].append(resultado)
+
+    salida = args.salida or f"benchmark_{args.backend}_{reporte['commit'] or 'local'}.json"
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Reporte guardado en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(reporte, json.load(f), args.tolerancia)
+        if regresiones:
+            print("\n❌ Regresiones detectadas:")
+            for r in regresiones:
+                print(f"  - {r}")
+            return 1
+        print("\n✅ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,125 @@
-from ultralytics import YOLO
-import cv2
-import time
-
-def main():
-    model = YOLO("runs/detect/instrumentos_dentales_yolo_model5/weights/best.pt")
-    cap = cv2.VideoCapture(0)
-
-    if not cap.isOpened():
-        print("❌ No se pudo acceder a la cámara.")
-        return
-
-    print("✅ Cámara abierta. Presiona 'q' para salir.")
-
-    clase_en_proceso = ""
-    tiempo_detectando = 0
-    UMBRAL_TIEMPO = 3
-
-    while True:
-        try:
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                print("⚠️ No se pudo leer el frame.")
-                continue
-
-            results = model.predict(source=frame, conf=0.5, verbose=False)
-
-            if results and hasattr(results[0], "boxes") and results[0].boxes is not None:
-                boxes = results[0].boxes
-                clases = results[0].names
-
-                if boxes.conf is not None and len(boxes.conf) > 0:
-                    scores = boxes.conf.tolist()
-                    class_ids = boxes.cls.tolist()
-
-                    max_idx = scores.index(max(scores))
-                    nombre = clases[int(class_ids[max_idx])]
-
-                    if nombre == clase_en_proceso:
-                        tiempo_detectando += 1
-                    else:
-                        clase_en_proceso = nombre
-                        tiempo_detectando = 1
-
-                    if tiempo_detectando >= UMBRAL_TIEMPO:
-                        print(f"✅ Confirmado: {nombre}")
-                        tiempo_detectando = 0  # Reinicia para no repetir
-
-            annotated = results[0].plot()
-            cv2.imshow("Detección en tiempo real", annotated)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                print("👋 Saliendo por tecla 'q'")
-                break
-
-        except Exception as e:
-            print(f"❌ Error inesperado: {e}")
-
-    cap.release()
-    cv2.destroyAllWindows()
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import argparse
+import cv2
+import time
+
+from backends_inferencia import BACKENDS, RUTA_MODELO_PT, ResultadoDeteccion, crear_backend
+from captura import crear_fuente, iterar_frames
+from medicion import CronometroNulo
+from anotacion import RenderizadorAnotaciones
+from seguimiento import SeguidorMultiple
+from cambio_escena import DetectorCambio
+from region_interes import InferenciaRegiones, parsear_mosaico, parsear_roi
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detección en tiempo real con la cámara local")
+    parser.add_argument("--modelo", default=RUTA_MODELO_PT, help="Ruta al checkpoint best.pt")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="torch", help="Backend de inferencia")
+    parser.add_argument("--conf", type=float, default=0.5, help="Confianza mínima")
+    parser.add_argument("--fuente", default="0",
+                        help="Índice de cámara, video, directorio de imágenes o 'sintetica[:N]'")
+    parser.add_argument("--replay", action="store_true",
+                        help="Procesar fuentes grabadas a máxima velocidad, sin ritmo de reloj")
+    parser.add_argument("--detectar-cada", type=int, default=1,
+                        help="Correr el modelo 1 de cada N frames y seguir las cajas en los demás")
+    parser.add_argument("--reutilizar-estatica", type=float, default=None, metavar="SEGUNDOS",
+                        help="Reutilizar detecciones mientras la escena no cambie, refrescando cada SEGUNDOS")
+    parser.add_argument("--roi", default="",
+                        help="Región de la charola x1,y1,x2,y2 en fracciones del frame")
+    parser.add_argument("--mosaico", default="", help="Ventanas FILASxCOLUMNAS para inferencia en mosaico")
+    parser.add_argument("--resolucion", default="640x480", help="Resolución de captura ANCHOxALTO")
+    args = parser.parse_args(argv)
+
+    model = crear_backend(args.modelo, args.backend)
+    roi, mosaico = parsear_roi(args.roi), parsear_mosaico(args.mosaico)
+    if roi or mosaico:
+        model = InferenciaRegiones(model, roi=roi, mosaico=mosaico)
+    ancho, alto = (int(v) for v in args.resolucion.lower().split('x'))
+    fuente = crear_fuente(args.fuente, ancho, alto)
+
+    if not fuente.abrir():
+        print(f"❌ No se pudo acceder a la fuente: {fuente.nombre}")
+        return
+
+    print(f"✅ Fuente abierta: {fuente.nombre} (backend: {args.backend}). Presiona 'q' para salir.")
+
+    ejecutar(model, fuente, conf=args.conf, modo_replay=args.replay, detectar_cada=args.detectar_cada,
+             edad_max_reutilizar=args.reutilizar_estatica)
+
+def ejecutar(model, fuente, conf=0.5, modo_replay=False, mostrar=True, cronometro=None, detectar_cada=1,
+             edad_max_reutilizar=None):
+    """Bucle captura → predicción → seguimiento → confirmación → anotación sobre una fuente abierta"""
+    cronometro = cronometro or CronometroNulo()
+    # Cada instrumento seguido lleva su propio contador de confirmación
+    seguidor = SeguidorMultiple()
+    frames_sin_detectar = 0
+    # Escena estática: se reutiliza el último resultado del modelo
+    cambio = DetectorCambio(edad_maxima=edad_max_reutilizar) if edad_max_reutilizar else None
+    ultimo_resultado = None
+    UMBRAL_TIEMPO = 3
+    frames_procesados = 0
+    renderizador = RenderizadorAnotaciones(rgb=False)
+
+    frames = iterar_frames(fuente, modo_replay=modo_replay)
+    while True:
+        with cronometro.medir('captura'):
+            frame = next(frames, False)
+        if frame is False:
+            break
+
+        try:
+            if frame is None:
+                print("⚠️ No se pudo leer el frame.")
+                continue
+
+            if frames_sin_detectar + 1 >= detectar_cada:
+                frames_sin_detectar = 0
+                with cronometro.medir('cambio_escena'):
+                    escena_cambio = cambio is None or cambio.hay_cambio(frame)
+                inferido = escena_cambio or ultimo_resultado is None
+                if inferido:
+                    resultado = ultimo_resultado = model.predecir([frame], conf=conf, cronometro=cronometro)[0]
+                    if cambio is not None:
+                        cambio.marcar_inferido()
+                else:
+                    resultado = ResultadoDeteccion(ultimo_resultado.xyxy, ultimo_resultado.conf,
+                                                   ultimo_resultado.cls, ultimo_resultado.names, frame)
+                    cronometro.incrementar('frames_reutilizados')
+                with cronometro.medir('seguimiento'):
+                    pistas = seguidor.actualizar(resultado, contar=inferido)
+            else:
+                # Frame intermedio: las cajas avanzan con la predicción de cada pista
+                frames_sin_detectar += 1
+                with cronometro.medir('seguimiento'):
+                    pistas = seguidor.propagar()
+                    resultado = seguidor.como_resultado(frame)
+            frames_procesados += 1
+
+            with cronometro.medir('confirmacion'):
+                for pista in pistas:
+                    if pista.aciertos >= UMBRAL_TIEMPO:
+                        print(f"✅ Confirmado: {resultado.names.get(pista.clase, pista.clase)}")
+                        pista.aciertos = 0  # Reinicia para no repetir
+
+            if not mostrar:
+                continue
+
+            with cronometro.medir('anotacion'):
+                annotated = renderizador.dibujar(resultado)
+
+            with cronometro.medir('visualizacion'):
+                cv2.imshow("Detección en tiempo real", annotated)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                print("👋 Saliendo por tecla 'q'")
+                break
+
+        except Exception as e:
+            print(f"❌ Error inesperado: {e}")
+
+    fuente.cerrar()
+    if mostrar:
+        cv2.destroyAllWindows()
+    return frames_procesados
+
+if __name__ == "__main__":
+    main()
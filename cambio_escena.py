@@ -0,0 +1,86 @@
+"""
+Detección de Cambios de Escena para MedSeen
+
+Descripción:
+Este módulo decide, antes de llamar al modelo, si el frame actual cambió
+respecto al último frame que sí se infirió. Durante largos periodos la
+cámara de la charola ve la misma escena; en esos casos se reutilizan las
+detecciones anteriores en lugar de correr YOLO otra vez.
+
+La comparación se hace sobre una miniatura en escala de grises (promedio
+por área, que además suaviza el ruido del sensor): se cuentan las celdas
+cuya diferencia supera un umbral, y si la fracción de celdas cambiadas es
+mínima la escena se considera estática. Cada cierto tiempo se fuerza una
+inferencia aunque la escena no cambie, para no arrastrar resultados viejos.
+
+Funcionalidades:
+- Miniatura en escala de grises con cv2.resize (INTER_AREA)
+- Umbral por celda y fracción mínima de celdas cambiadas
+- Edad máxima de los resultados reutilizados
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: cambio_escena.py
+
+Requisitos:
+- opencv-python
+- numpy
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# Tamaño de la miniatura (ancho, alto): cada celda promedia ~10x10 píxeles de un frame 640x480
+TAMANO_MINIATURA = (64, 48)
+
+
+class DetectorCambio:
+    """
+    Compara cada frame contra el último que se envió al modelo.
+
+    Args:
+        umbral (int): Diferencia mínima de gris (0-255) para que una celda cuente como cambiada
+        fraccion_min (float): Fracción de celdas cambiadas a partir de la cual hay cambio
+        edad_maxima (float): Segundos tras los cuales se fuerza una inferencia
+    """
+
+    def __init__(self, umbral=12, fraccion_min=0.002, edad_maxima=2.0):
+        self.umbral = umbral
+        self.fraccion_min = fraccion_min
+        self.edad_maxima = edad_maxima
+        self._referencia = None
+        self._actual = None
+        self._inferido = 0.0
+        self.ultima_fraccion = 0.0
+
+    def _miniatura(self, frame):
+        # Reducir primero: la conversión a gris se hace sobre la miniatura, no sobre el frame completo
+        miniatura = cv2.resize(frame, TAMANO_MINIATURA, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(miniatura, cv2.COLOR_BGR2GRAY) if miniatura.ndim == 3 else miniatura
+
+    def hay_cambio(self, frame, ahora=None):
+        """
+        True si el frame debe inferirse: la escena cambió, no hay
+        referencia o los resultados reutilizables son demasiado viejos.
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        self._actual = self._miniatura(frame)
+        if self._referencia is None or ahora - self._inferido >= self.edad_maxima:
+            return True
+        diferencia = cv2.absdiff(self._actual, self._referencia)
+        self.ultima_fraccion = np.count_nonzero(diferencia > self.umbral) / diferencia.size
+        return self.ultima_fraccion >= self.fraccion_min
+
+    def marcar_inferido(self, ahora=None):
+        """El último frame evaluado se envió al modelo: pasa a ser la referencia"""
+        self._referencia = self._actual
+        self._inferido = time.monotonic() if ahora is None else ahora
+
+    def reiniciar(self):
+        self._referencia = None
+        self._actual = None
@@ -0,0 +1,441 @@
+"""
+Captura de Video en Segundo Plano para MedSeen
+
+Descripción:
+Este módulo implementa las fuentes de frames y el hilo dedicado de captura.
+El hilo lee la fuente de forma continua y conserva únicamente el frame más
+reciente, junto con su marca de tiempo de captura, en una ranura protegida
+por un candado. La ruta de inferencia toma ese frame sin bloquearse y sin
+descartar lecturas, de modo que cada predicción trabaja siempre sobre la
+imagen más actual del sensor.
+
+Las fuentes son intercambiables: cámaras en vivo, archivos de video,
+directorios de imágenes (por ejemplo datasets/test/images) y un generador
+sintético en memoria. En modo replay las fuentes grabadas se entregan tan
+rápido como el consumidor las procese, sin ritmo de reloj y sin descartar
+frames, para medir el rendimiento real del pipeline sobre entradas idénticas.
+
+Funcionalidades:
+- Ranura thread-safe de "último valor" con versión y marca de tiempo
+- Fuentes: cámara, video, directorio de imágenes y sintética
+- Hilo de captura continuo con reconexión automática de cámaras
+- Ritmo de reproducción real o replay a máxima velocidad
+- Contadores de frames leídos y reconexiones
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: captura.py
+
+Requisitos:
+- opencv-python (cv2)
+- numpy
+"""
+
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from medicion import CronometroNulo
+
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class RanuraUltimoValor:
+    """Ranura thread-safe que conserva solo el valor publicado más reciente"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._valor = None
+        self._timestamp = 0.0
+        self._version = 0
+        self._consumida = 0
+
+    def publicar(self, valor, timestamp=None):
+        """
+        Reemplaza el valor actual; los lectores nunca ven valores intermedios.
+
+        Returns:
+            int: Versión asignada al valor publicado
+        """
+        with self._cond:
+            self._valor = valor
+            self._timestamp = time.time() if timestamp is None else timestamp
+            self._version += 1
+            self._cond.notify_all()
+            return self._version
+
+    def obtener(self):
+        """
+        Devuelve el valor más reciente sin bloquear.
+
+        Returns:
+            tuple: (valor, timestamp, version). La versión aumenta en cada
+            publicación y permite detectar si ya se procesó ese valor.
+        """
+        with self._cond:
+            return self._valor, self._timestamp, self._version
+
+    def esperar_nuevo(self, version, timeout=None):
+        """
+        Espera a que se publique un valor con versión mayor a la indicada.
+
+        Returns:
+            tuple: igual que obtener(); si vence el timeout se devuelve el
+            valor actual y el llamador puede comparar la versión.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > version, timeout)
+            return self._valor, self._timestamp, self._version
+
+    def esperar(self, timeout=None):
+        """Espera a que exista al menos un valor publicado"""
+        return self.esperar_nuevo(0, timeout)[2] > 0
+
+    def confirmar(self, version):
+        """Marca como consumido el valor con la versión indicada"""
+        with self._cond:
+            if version > self._consumida:
+                self._consumida = version
+                self._cond.notify_all()
+
+    def esperar_consumo(self, version, timeout=None):
+        """Espera a que el consumidor confirme la versión indicada"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._consumida >= version, timeout)
+
+
+def abrir_camara(indice=0, ancho=640, alto=480, fps=30):
+    """Abre la cámara con la configuración optimizada de MedSeen"""
+    cap = cv2.VideoCapture(indice)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, ancho)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, alto)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class FuenteFrames:
+    """
+    Interfaz común de las fuentes de frames.
+
+    Attributes:
+        nombre (str): Nombre legible de la fuente
+        fps (float): Ritmo nativo de la fuente (None si no tiene)
+        en_vivo (bool): True si la fuente marca su propio ritmo y debe
+            reconectarse ante fallos (cámaras); False si es grabada y finita
+    """
+
+    nombre = ""
+    fps = None
+    en_vivo = False
+
+    def abrir(self):
+        """Prepara la fuente; devuelve True si está lista para leer"""
+        return True
+
+    def leer(self):
+        """Devuelve (ok, frame) como cv2.VideoCapture.read()"""
+        raise NotImplementedError
+
+    def cerrar(self):
+        """Libera los recursos de la fuente"""
+
+
+class FuenteCamara(FuenteFrames):
+    """Cámara en vivo por índice"""
+
+    en_vivo = True
+
+    def __init__(self, indice=0, ancho=640, alto=480, fps=30):
+        self.indice = indice
+        self.ancho = ancho
+        self.alto = alto
+        self.fps = fps
+        self.nombre = f"Cámara {indice}"
+        self._cap = None
+
+    def abrir(self):
+        self._cap = abrir_camara(self.indice, self.ancho, self.alto, self.fps)
+        return self._cap.isOpened()
+
+    def leer(self):
+        return self._cap.read()
+
+    def cerrar(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class FuenteVideo(FuenteFrames):
+    """Archivo de video grabado (por ejemplo, un procedimiento completo)"""
+
+    def __init__(self, ruta, bucle=False):
+        self.ruta = ruta
+        self.bucle = bucle
+        self.nombre = os.path.basename(ruta)
+        self._cap = None
+
+    def abrir(self):
+        self._cap = cv2.VideoCapture(self.ruta)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        return self._cap.isOpened()
+
+    def leer(self):
+        ret, frame = self._cap.read()
+        if not ret and self.bucle:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return ret, frame
+
+    def cerrar(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+class FuenteDirectorio(FuenteFrames):
+    """Imágenes de un directorio en orden alfabético (ej. datasets/test/images)"""
+
+    def __init__(self, carpeta, fps=30, bucle=False):
+        self.carpeta = carpeta
+        self.fps = fps
+        self.bucle = bucle
+        self.nombre = os.path.basename(os.path.normpath(carpeta))
+        self.rutas = []
+        self._pos = 0
+
+    def abrir(self):
+        self.rutas = sorted(
+            r for r in glob.glob(os.path.join(self.carpeta, "*"))
+            if r.lower().endswith(EXTENSIONES_IMAGEN)
+        )
+        self._pos = 0
+        return bool(self.rutas)
+
+    def leer(self):
+        if self._pos >= len(self.rutas):
+            if not self.bucle or not self.rutas:
+                return False, None
+            self._pos = 0
+        frame = cv2.imread(self.rutas[self._pos])
+        self._pos += 1
+        return frame is not None, frame
+
+
+class FuenteSintetica(FuenteFrames):
+    """
+    Generador en memoria: un rectángulo que se desplaza sobre fondo fijo.
+
+    No toca disco ni cámara, por lo que aísla el costo del resto del pipeline.
+    """
+
+    def __init__(self, n_frames=300, ancho=640, alto=480, fps=30, semilla=0):
+        self.n_frames = n_frames
+        self.ancho = ancho
+        self.alto = alto
+        self.fps = fps
+        self.nombre = "sintetica"
+        self._fondo = np.random.default_rng(semilla).integers(
+            90, 140, size=(alto, ancho, 3), dtype=np.uint8
+        )
+        self._i = 0
+
+    def abrir(self):
+        self._i = 0
+        return True
+
+    def leer(self):
+        if self.n_frames is not None and self._i >= self.n_frames:
+            return False, None
+        frame = self._fondo.copy()
+        x = (self._i * 7) % max(self.ancho - 120, 1)
+        y = self.alto // 3
+        cv2.rectangle(frame, (x, y), (x + 120, y + 40), (200, 200, 200), -1)
+        self._i += 1
+        return True, frame
+
+
+def crear_fuente(spec, ancho=640, alto=480, fps=30):
+    """
+    Construye una fuente a partir de una especificación.
+
+    - int o "0": cámara por índice
+    - "sintetica" o "sintetica:N": generador en memoria de N frames
+    - ruta a directorio: imágenes del directorio
+    - ruta a archivo: video
+    - FuenteFrames: se devuelve tal cual
+    """
+    if isinstance(spec, FuenteFrames):
+        return spec
+    if isinstance(spec, int) or str(spec).isdigit():
+        return FuenteCamara(int(spec), ancho, alto, fps)
+    spec = str(spec)
+    if spec.startswith("sintetica"):
+        _, _, n = spec.partition(":")
+        return FuenteSintetica(int(n) if n else 300, ancho, alto, fps)
+    if os.path.isdir(spec):
+        return FuenteDirectorio(spec, fps)
+    return FuenteVideo(spec)
+
+
+class Marcapasos:
+    """Reproduce una fuente grabada a su ritmo nativo (sin acumular atraso)"""
+
+    def __init__(self, fps=None):
+        self.periodo = 1.0 / fps if fps else 0.0
+        self._siguiente = None
+
+    def esperar(self, detener=None):
+        if not self.periodo:
+            return
+        ahora = time.monotonic()
+        if self._siguiente is None:
+            self._siguiente = ahora
+        espera = self._siguiente - ahora
+        if espera > 0:
+            if detener is not None:
+                detener.wait(espera)
+            else:
+                time.sleep(espera)
+        self._siguiente = max(self._siguiente + self.periodo, ahora)
+
+
+def iterar_frames(fuente, modo_replay=False):
+    """
+    Recorre una fuente ya abierta respetando su ritmo (o sin ritmo en replay).
+
+    Para fuentes en vivo un fallo de lectura produce None en lugar de
+    terminar; las fuentes grabadas terminan al agotarse.
+    """
+    marcapasos = Marcapasos(None if (modo_replay or fuente.en_vivo) else fuente.fps)
+    while True:
+        ret, frame = fuente.leer()
+        if not ret or frame is None:
+            if fuente.en_vivo:
+                yield None
+                continue
+            return
+        marcapasos.esperar()
+        yield frame
+
+
+class CapturaEnSegundoPlano:
+    """
+    Hilo de captura que lee una fuente de frames continuamente.
+
+    En modo normal solo se conserva el frame más reciente: si la inferencia es
+    más lenta que la cámara, los frames intermedios se sobrescriben en la
+    ranura en lugar de acumularse en el buffer del driver. En modo replay el
+    hilo espera a que el consumidor tome cada frame, de modo que una fuente
+    grabada se procesa completa y sin ritmo de reloj.
+    """
+
+    def __init__(self, fuente=0, ancho=640, alto=480, fps=30, espera_reconexion=0.5,
+                 aviso=None, modo_replay=False, cronometro=None):
+        self.fuente = crear_fuente(fuente, ancho, alto, fps)
+        self.cronometro = cronometro or CronometroNulo()
+        self.espera_reconexion = espera_reconexion
+        self.modo_replay = modo_replay
+        # Evento opcional compartido entre capturas para despertar a un consumidor
+        self.aviso = aviso
+
+        self.ranura = RanuraUltimoValor()
+        self.frames_leidos = 0
+        self.reconexiones = 0
+        self.agotada = False
+
+        self._hilo = None
+        self._detener = threading.Event()
+
+    @property
+    def nombre(self):
+        return self.fuente.nombre
+
+    def iniciar(self, timeout_primer_frame=2.0):
+        """
+        Abre la fuente y arranca el hilo de captura.
+
+        Returns:
+            bool: True si la fuente se abrió correctamente
+        """
+        if not self.fuente.abrir():
+            self.fuente.cerrar()
+            return False
+
+        self.agotada = False
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="medseen-captura", daemon=True)
+        self._hilo.start()
+
+        # Dar tiempo a que llegue el primer frame para no iniciar con la ranura vacía
+        self.ranura.esperar(timeout_primer_frame)
+        return True
+
+    def _bucle(self):
+        ritmo = None if (self.modo_replay or self.fuente.en_vivo) else self.fuente.fps
+        marcapasos = Marcapasos(ritmo)
+
+        while not self._detener.is_set():
+            with self.cronometro.medir('captura'):
+                ret, frame = self.fuente.leer()
+            if not ret or frame is None:
+                if self.fuente.en_vivo:
+                    self._reconectar()
+                    continue
+                self.agotada = True
+                self._avisar()
+                break
+
+            marcapasos.esperar(self._detener)
+            version = self.ranura.publicar(frame, time.time())
+            self.frames_leidos += 1
+            self.cronometro.incrementar('frames_capturados')
+            self._avisar()
+
+            if self.modo_replay:
+                # Sin descartes: no leer el siguiente frame hasta que se tome este
+                while not self._detener.is_set():
+                    if self.ranura.esperar_consumo(version, timeout=0.1):
+                        break
+
+    def _avisar(self):
+        if self.aviso is not None:
+            self.aviso.set()
+
+    def _reconectar(self):
+        self.fuente.cerrar()
+        if self._detener.wait(self.espera_reconexion):
+            return
+        self.fuente.abrir()
+        self.reconexiones += 1
+        self.cronometro.incrementar('reconexiones')
+
+    def leer_ultimo(self):
+        """
+        Obtiene el frame más reciente sin bloquear.
+
+        Returns:
+            tuple: (frame, timestamp_captura, version); frame es None si aún
+            no se ha capturado ninguno.
+        """
+        return self.ranura.obtener()
+
+    def confirmar(self, version):
+        """Indica que el frame con esa versión ya fue tomado (libera el replay)"""
+        self.ranura.confirmar(version)
+
+    def detener(self):
+        """Detiene el hilo de captura y libera la fuente"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2.0)
+            self._hilo = None
+        self.fuente.cerrar()
@@ -0,0 +1,72 @@
+"""
+Carga Diferida de Dependencias para MedSeen
+
+Descripción:
+Este módulo ofrece una fachada mínima para importar dependencias pesadas
+(pandas, Plotly, ReportLab, Matplotlib) la primera vez que se usan en lugar
+de al arrancar la aplicación. `importar_diferido("pandas")` devuelve un
+objeto que se comporta como el módulo: el import real ocurre en el primer
+acceso a un atributo (pd.DataFrame, go.Figure, ...), una sola vez y de
+forma segura entre hilos.
+
+Así la primera pintura de la interfaz no paga por las gráficas ni por el
+reporte PDF, que solo se necesitan con una sesión activa o al terminarla.
+
+Funcionalidades:
+- Proxy de módulo con import en el primer acceso
+- Seguro entre hilos (los reruns de Streamlit corren en hilos distintos)
+- Registro de los módulos diferidos ya cargados y su tiempo de carga
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: carga_diferida.py
+
+Requisitos:
+- Ninguno (biblioteca estándar)
+"""
+
+import importlib
+import threading
+import time
+
+# nombre del módulo -> segundos que tardó su primer import
+CARGADOS = {}
+
+
+class ModuloDiferido:
+    """Se comporta como el módulo `nombre`, importándolo en el primer acceso"""
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def cargar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    inicio = time.perf_counter()
+                    modulo = importlib.import_module(self._nombre)
+                    CARGADOS[self._nombre] = time.perf_counter() - inicio
+                    self._modulo = modulo
+        return self._modulo
+
+    @property
+    def cargado(self):
+        return self._modulo is not None
+
+    def __getattr__(self, atributo):
+        # Solo se llama para atributos que no son del proxy
+        return getattr(self.cargar(), atributo)
+
+    def __repr__(self):
+        estado = "cargado" if self.cargado else "sin cargar"
+        return f"<ModuloDiferido {self._nombre} ({estado})>"
+
+
+def importar_diferido(nombre):
+    """Proxy del módulo `nombre`; el import real ocurre al usarlo"""
+    return ModuloDiferido(nombre)
@@ -0,0 +1,277 @@
+"""
+Cuantización INT8 del Modelo de Instrumentos Dentales
+
+Descripción:
+Este script cuantiza el modelo best.pt a INT8 (pesos y activaciones) con la
+cuantización estática de ONNX Runtime, calibrando los rangos de activación
+con las imágenes de datasets/valid/images preprocesadas exactamente como en
+la inferencia (letterbox a 640, RGB, 0-1). El artefacto best_int8.onnx se
+guarda junto a los pesos y queda disponible como backend 'onnx_int8' en la
+aplicación y en camara.py.
+
+Después evalúa el modelo original y el cuantizado con la misma validación
+de validate_dental_instruments_yolo.py (model.val sobre datasets/data.yaml)
+y escribe un reporte lado a lado con mAP50, mAP50-95, latencia en CPU por
+imagen (con los backends de la aplicación, sobre datasets/test/images como
+en barrido_pareto.py) y tamaño del modelo.
+
+La decodificación de cajas de la cabeza Detect (DFL, concatenaciones y
+escalado por stride) se deja en FP32: cuantizarla mueve las coordenadas
+varios píxeles y apenas ahorra tiempo. Las convoluciones sí se cuantizan.
+
+Uso:
+python cuantizacion.py
+python cuantizacion.py --metodo percentil --imagenes-calibracion 100
+python cuantizacion.py --solo-reporte
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: cuantizacion.py
+
+Requisitos:
+- onnx, onnxruntime
+- ultralytics + PyTorch (exportación a ONNX y evaluación mAP)
+- backends_inferencia.py
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+import cv2
+
+from backends_inferencia import (RUTA_IMAGENES_TEST, RUTA_MODELO_PT, crear_backend, exportar_modelo,
+                                 preprocesar, ruta_artefacto)
+
+RUTA_CALIBRACION = "datasets/valid/images"
+# Misma carpeta que reporte_pdf.py, sin importarlo (arrastra el diario y SQLite)
+RUTA_REPORTES = os.environ.get("MEDSEEN_REPORTES", "reportes")
+RUTA_DATA_YAML = "datasets/data.yaml"
+EXTENSIONES = ("*.jpg", "*.jpeg", "*.png")
+
+# Modelos comparados en el reporte: (etiqueta, backend)
+VARIANTES = (
+    ("best.pt (FP32, PyTorch)", 'torch'),
+    ("best.onnx (FP32)", 'onnx'),
+    ("best_int8.onnx (INT8)", 'onnx_int8'),
+)
+
+BLOQUE_MODELO = re.compile(r"^/model\.(\d+)/")
+
+
+def imagenes(carpeta, n_max=None):
+    rutas = sorted(r for patron in EXTENSIONES for r in glob.glob(os.path.join(carpeta, patron)))
+    return rutas[:n_max] if n_max else rutas
+
+
+def lector_calibracion(rutas, nombre_entrada, imgsz=640):
+    """CalibrationDataReader que entrega una imagen preprocesada por llamada"""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class LectorCalibracion(CalibrationDataReader):
+        def __init__(self):
+            self._rutas = iter(rutas)
+
+        def get_next(self):
+            for ruta in self._rutas:
+                frame = cv2.imread(ruta)
+                if frame is not None:
+                    blob, _ = preprocesar([frame], imgsz)
+                    return {nombre_entrada: blob}
+            return None
+
+    return LectorCalibracion()
+
+
+def nodos_decodificacion(modelo):
+    """
+    Nodos de la cabeza Detect que decodifican cajas (todo salvo sus Conv de
+    clasificación/regresión, más la Conv fija de DFL).
+    """
+    bloques = [int(m.group(1)) for n in modelo.graph.node if (m := BLOQUE_MODELO.match(n.name))]
+    if not bloques:
+        return []
+    cabeza = f"/model.{max(bloques)}/"
+    return [n.name for n in modelo.graph.node
+            if n.name.startswith(cabeza) and (n.op_type != 'Conv' or '/dfl/' in n.name)]
+
+
+def cuantizar_modelo(ruta_pt=RUTA_MODELO_PT, carpeta=RUTA_CALIBRACION, n_imagenes=None,
+                     metodo='minmax', cuantizar_cabeza=False, imgsz=640):
+    """
+    Exporta best.pt a ONNX (si hace falta) y genera best_int8.onnx.
+
+    Returns:
+        str: Ruta del modelo cuantizado
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    ruta_fp32 = exportar_modelo(ruta_pt, 'onnx')
+    destino = ruta_artefacto(ruta_pt, 'onnx_int8')
+    rutas = imagenes(carpeta, n_imagenes)
+    if not rutas:
+        raise FileNotFoundError(f"No hay imágenes de calibración en {carpeta}")
+
+    # Inferencia de formas previa a la cuantización (recomendada por ONNX Runtime)
+    entrada = destino + ".pre.onnx"
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        quant_pre_process(ruta_fp32, entrada)
+    except Exception:
+        entrada = ruta_fp32
+
+    modelo_fp32 = onnx.load(entrada)
+    excluidos = [] if cuantizar_cabeza else nodos_decodificacion(modelo_fp32)
+    metodos = {'minmax': CalibrationMethod.MinMax, 'percentil': CalibrationMethod.Percentile,
+               'entropia': CalibrationMethod.Entropy}
+
+    temporal = destino + ".tmp"
+    print(f"🔧 Calibrando con {len(rutas)} imágenes de {carpeta} ({metodo}); "
+          f"{len(excluidos)} nodos de decodificación en FP32")
+    try:
+        quantize_static(
+            entrada, temporal,
+            lector_calibracion(rutas, modelo_fp32.graph.input[0].name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=metodos[metodo],
+            nodes_to_exclude=excluidos
+        )
+        # Conservar los metadatos de Ultralytics (names, stride, imgsz) para backends y model.val
+        cuantizado = onnx.load(temporal)
+        del cuantizado.metadata_props[:]
+        cuantizado.metadata_props.extend(onnx.load(ruta_fp32, load_external_data=False).metadata_props)
+        onnx.save(cuantizado, temporal)
+        os.replace(temporal, destino)
+    finally:
+        for sobrante in (temporal, destino + ".pre.onnx"):
+            if os.path.exists(sobrante):
+                os.remove(sobrante)
+    return destino
+
+
+def evaluar_map(ruta_modelo, data=RUTA_DATA_YAML, imgsz=640):
+    """Misma validación que validate_dental_instruments_yolo.py"""
+    from ultralytics import YOLO
+
+    metricas = YOLO(ruta_modelo, task='detect').val(data=data, imgsz=imgsz, batch=1, plots=False, verbose=False)
+    return {'map50': float(metricas.box.map50), 'map50_95': float(metricas.box.map)}
+
+
+def medir_latencia(ruta_pt, backend, rutas, imgsz=640, calentamiento=3):
+    """Mediana de ms por imagen con el backend de la aplicación (CPU, batch 1)"""
+    modelo = crear_backend(ruta_pt, backend, imgsz)
+    frames = [f for f in (cv2.imread(r) for r in rutas) if f is not None]
+    for frame in frames[:calentamiento]:
+        modelo.predecir([frame])
+    tiempos = []
+    for frame in frames:
+        inicio = time.perf_counter()
+        modelo.predecir([frame])
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def tamano_mb(ruta):
+    return os.path.getsize(ruta) / (1024 * 1024)
+
+
+def comparar_modelos(ruta_pt=RUTA_MODELO_PT, data=RUTA_DATA_YAML, carpeta=RUTA_IMAGENES_TEST, imgsz=640):
+    """
+    Evalúa cada variante de VARIANTES y devuelve una fila por modelo.
+
+    La latencia se mide sobre `carpeta` (el split de prueba por defecto, no
+    las imágenes de calibración), igual que en barrido_pareto.py.
+    """
+    rutas = imagenes(carpeta)
+    filas = []
+    for etiqueta, backend in VARIANTES:
+        ruta = ruta_pt if backend == 'torch' else ruta_artefacto(ruta_pt, backend)
+        print(f"📏 Evaluando {etiqueta}...")
+        fila = {'modelo': etiqueta, 'backend': backend, 'ruta': ruta, 'tamano_mb': tamano_mb(ruta)}
+        fila.update(evaluar_map(ruta, data, imgsz))
+        fila['ms_por_imagen'] = medir_latencia(ruta_pt, backend, rutas, imgsz)
+        filas.append(fila)
+    return filas
+
+
+def escribir_reporte(filas, destino, data=RUTA_DATA_YAML, calibracion=RUTA_CALIBRACION,
+                     latencia=RUTA_IMAGENES_TEST):
+    """Tabla Markdown lado a lado (y el mismo contenido en JSON junto a ella)"""
+    base = filas[0]
+    lineas = [
+        "# Cuantización INT8 — MedSeen",
+        "",
+        f"Generado: {time.strftime('%Y-%m-%d %H:%M')} • Dataset: {data} • Calibración: {calibracion} "
+        f"• Latencia: {latencia}",
+        "",
+        "| Modelo | mAP50 | mAP50-95 | ms/imagen (CPU) | Tamaño (MB) |",
+        "|---|---:|---:|---:|---:|",
+    ]
+    for f in filas:
+        lineas.append(
+            f"| {f['modelo']} | {f['map50']:.3f} ({f['map50'] - base['map50']:+.3f}) "
+            f"| {f['map50_95']:.3f} ({f['map50_95'] - base['map50_95']:+.3f}) "
+            f"| {f['ms_por_imagen']:.1f} (x{base['ms_por_imagen'] / f['ms_por_imagen']:.2f}) "
+            f"| {f['tamano_mb']:.1f} |"
+        )
+    lineas.append("")
+    lineas.append("Entre paréntesis: diferencia de mAP y aceleración contra best.pt.")
+
+    carpeta = os.path.dirname(destino)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(destino, "w", encoding="utf-8") as f:
+        f.write("\n".join(lineas) + "\n")
+    with open(os.path.splitext(destino)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(filas, f, indent=2, ensure_ascii=False)
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cuantización INT8 de best.pt y comparación contra FP32")
+    parser.add_argument("--modelo", default=RUTA_MODELO_PT, help="Ruta al checkpoint best.pt")
+    parser.add_argument("--calibracion", default=RUTA_CALIBRACION, help="Carpeta de imágenes de calibración")
+    parser.add_argument("--imagenes-calibracion", type=int, default=None,
+                        help="Máximo de imágenes de calibración (todas por defecto)")
+    parser.add_argument("--metodo", choices=['minmax', 'percentil', 'entropia'], default='minmax',
+                        help="Método de calibración de rangos de activación")
+    parser.add_argument("--cuantizar-cabeza", action="store_true",
+                        help="Cuantizar también la decodificación de cajas de la cabeza Detect")
+    parser.add_argument("--data", default=RUTA_DATA_YAML, help="data.yaml para la evaluación mAP")
+    parser.add_argument("--solo-reporte", action="store_true",
+                        help="No volver a cuantizar; solo evaluar el artefacto existente")
+    parser.add_argument("--salida", default=os.path.join(RUTA_REPORTES, "cuantizacion.md"),
+                        help="Ruta del reporte Markdown (se escribe también un .json)")
+    args = parser.parse_args(argv)
+
+    if not args.solo_reporte:
+        ruta = cuantizar_modelo(args.modelo, args.calibracion, args.imagenes_calibracion,
+                                args.metodo, args.cuantizar_cabeza)
+        print(f"✅ Modelo cuantizado: {ruta}")
+
+    if not os.path.exists(ruta_artefacto(args.modelo, 'onnx_int8')):
+        print("❌ No existe el modelo INT8; ejecuta sin --solo-reporte")
+        return 1
+
+    filas = comparar_modelos(args.modelo, args.data)
+    print()
+    print(escribir_reporte(filas, args.salida, args.data, args.calibracion))
+    print(f"\n💾 Reporte guardado en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
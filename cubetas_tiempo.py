@@ -0,0 +1,93 @@
+"""
+Cubetas de Tiempo Multirresolución para MedSeen
+
+Descripción:
+Este módulo agrupa conteos de detecciones en cubetas de tiempo sobre
+enteros (minutos y segundos desde la época Unix) con NumPy, sin formatear
+horas como texto. Las gráficas temporales se construyen a partir de una
+serie densa por minuto que se reagrupa a 10 minutos o a una hora con un
+solo np.bincount, y la resolución se elige según la duración de la sesión
+para que un turno de 12 horas no produzca cientos de puntos.
+
+Las cubetas se alinean a la hora local (xx:00, xx:10, ...) y, al ser
+enteros, ordenan correctamente aunque la sesión cruce la medianoche.
+
+Funcionalidades:
+- Resoluciones de 1 minuto, 10 minutos y 1 hora
+- Elección automática de resolución por duración de la sesión
+- Reagrupación vectorizada de matrices clase x minuto
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: cubetas_tiempo.py
+
+Requisitos:
+- numpy
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+# Resoluciones disponibles, en segundos
+RESOLUCIONES = (60, 600, 3600)
+NOMBRES_RESOLUCION = {60: "1 minuto", 600: "10 minutos", 3600: "1 hora"}
+# Máximo de cubetas que se grafican antes de pasar a la siguiente resolución
+MAX_CUBETAS = 90
+
+
+def desfase_local(referencia=None):
+    """Segundos que suma la zona horaria local a UTC (para alinear cubetas a la hora local)"""
+    referencia = referencia or datetime.now()
+    return int(referencia.astimezone().utcoffset().total_seconds())
+
+
+def elegir_resolucion(duracion_s, max_cubetas=MAX_CUBETAS):
+    """La resolución más fina que no excede max_cubetas para la duración dada"""
+    for resolucion in RESOLUCIONES:
+        if duracion_s / resolucion <= max_cubetas:
+            return resolucion
+    return RESOLUCIONES[-1]
+
+
+def reagrupar(conteos_minuto, minuto_origen, resolucion, desfase=0):
+    """
+    Reagrupa una matriz densa de conteos por minuto a otra resolución.
+
+    Args:
+        conteos_minuto (np.ndarray): Matriz filas x minutos (o vector), columna 0 = minuto_origen
+        minuto_origen (int): Minuto desde la época de la primera columna
+        resolucion (int): Segundos por cubeta (múltiplo de 60)
+        desfase (int): Desfase local en segundos (ver desfase_local)
+
+    Returns:
+        tuple: (inicios de cubeta en segundos desde la época, matriz filas x cubetas)
+    """
+    es_vector = np.ndim(conteos_minuto) == 1
+    conteos = np.atleast_2d(conteos_minuto)
+    filas, n = conteos.shape
+    if n == 0:
+        vacia = np.zeros((filas, 0), dtype=np.int64)
+        return np.empty(0, dtype=np.int64), vacia[0] if es_vector else vacia
+
+    segundos = (minuto_origen + np.arange(n, dtype=np.int64)) * 60 + desfase
+    cubetas = segundos // resolucion
+    cubetas -= cubetas[0]
+    n_cubetas = int(cubetas[-1]) + 1
+
+    # Un solo bincount para todas las filas: índice plano fila * n_cubetas + cubeta
+    indices = (np.arange(filas, dtype=np.int64)[:, None] * n_cubetas + cubetas).ravel()
+    suma = np.bincount(indices, weights=conteos.ravel(), minlength=filas * n_cubetas)
+    matriz = suma.reshape(filas, n_cubetas).astype(np.int64)
+
+    primera = (minuto_origen * 60 + desfase) // resolucion
+    inicios = (primera + np.arange(n_cubetas, dtype=np.int64)) * resolucion - desfase
+    return inicios, matriz[0] if es_vector else matriz
+
+
+def a_datetimes(inicios):
+    """Segundos desde la época -> lista de datetime en hora local"""
+    return [datetime.fromtimestamp(int(s)) for s in inicios]
@@ -0,0 +1,355 @@
+"""
+Diario Persistente de Sesiones para MedSeen
+
+Descripción:
+Este módulo guarda cada detección confirmada en un diario local SQLite en
+modo WAL, de modo que una recarga del navegador, una caída de Streamlit o un
+reinicio del equipo no pierden la sesión. Las escrituras se encolan desde la
+ruta caliente sin bloquear y un hilo en segundo plano las agrupa en lotes,
+una transacción por lote, así el hilo de detección nunca espera a fsync.
+
+Una sesión que no se cerró correctamente queda marcada como activa en el
+diario y puede reanudarse al iniciar, o usarse directamente para generar el
+reporte PDF. Cada sesión registra a su dueño (pid y token del escritor) y
+un latido que el escritor renueva mientras la sesión tiene a alguien
+atendiéndola; solo se ofrecen como interrumpidas las sesiones cuyo dueño
+murió o cuyo latido venció, no las que siguen vivas en otra pestaña. Al
+reanudar, el nuevo escritor reclama la sesión: desde ese momento las
+escrituras del dueño anterior (si sigue vivo) se descartan.
+
+Funcionalidades:
+- SQLite en modo WAL con synchronous=NORMAL
+- Cola sin bloqueo y escritura por lotes en un hilo dedicado
+- Dueño y latido por sesión; detección de sesiones interrumpidas y reanudación
+- Lectura de una sesión completa para el reporte PDF
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: diario_sesion.py
+
+Requisitos:
+- sqlite3 (biblioteca estándar)
+- psutil (verificar si el proceso dueño de una sesión sigue vivo)
+- almacen_detecciones.py, estadisticas_sesion.py
+"""
+
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+from almacen_detecciones import AlmacenDetecciones, VistaDetecciones, a_epoch_ns, desde_epoch_ns
+from backends_inferencia import NOMBRES_CLASES
+from estadisticas_sesion import EstadisticasSesion
+
+RUTA_DIARIO = os.environ.get("MEDSEEN_DIARIO", "sesiones/medseen_diario.db")
+
+# Cada cuántos segundos el escritor renueva el latido de sus sesiones abiertas
+INTERVALO_LATIDO = 5.0
+# Sin latido durante este tiempo, la sesión se considera interrumpida aunque su proceso viva
+LATIDO_VENCIDO = 20.0
+
+# Tokens de los escritores con hilo en marcha en este proceso
+_ESCRITORES_ACTIVOS = set()
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sesiones (
+    id TEXT PRIMARY KEY,
+    inicio_ns INTEGER NOT NULL,
+    fin_ns INTEGER,
+    estado TEXT NOT NULL DEFAULT 'activa',
+    configuracion TEXT,
+    pid INTEGER,
+    token TEXT,
+    latido_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS detecciones (
+    sesion_id TEXT NOT NULL,
+    timestamp_ns INTEGER NOT NULL,
+    instrumento TEXT NOT NULL,
+    confianza REAL NOT NULL,
+    fuente TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detecciones_sesion ON detecciones (sesion_id, timestamp_ns);
+"""
+
+# Columnas agregadas después de la primera versión del esquema (diarios existentes)
+COLUMNAS_DUENO = (("pid", "INTEGER"), ("token", "TEXT"), ("latido_ns", "INTEGER"))
+
+# Solo se inserta si el escritor sigue siendo el dueño de la sesión: si otra
+# pestaña la reclamó, las filas del escritor anterior se descartan
+SQL_DETECCION = ("INSERT INTO detecciones (sesion_id, timestamp_ns, instrumento, confianza, fuente) "
+                 "SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM sesiones WHERE id = ? AND token = ?)")
+
+
+class DiarioSesion:
+    """
+    Diario SQLite con escritura por lotes en segundo plano.
+
+    Args:
+        ruta (str): Archivo SQLite del diario
+        intervalo_flush (float): Espera máxima (s) para completar un lote
+        tam_lote (int): Máximo de operaciones por transacción
+        vivo (callable): Devuelve False si la sesión ya no tiene quién la atienda
+            (p. ej. la pestaña se recargó); entonces deja de renovarse el latido
+    """
+
+    def __init__(self, ruta=RUTA_DIARIO, intervalo_flush=1.0, tam_lote=256, vivo=None):
+        self.ruta = ruta
+        self.intervalo_flush = intervalo_flush
+        self.tam_lote = tam_lote
+        self.vivo = vivo
+        self.escritas = 0
+        self.ultimo_error = None
+        # Dueño de las sesiones que abre este escritor
+        self.pid = os.getpid()
+        self.token = uuid.uuid4().hex
+        self._abiertas = set()
+        self._candado = threading.Lock()
+        self._ultimo_latido = 0.0
+        self._cola = queue.SimpleQueue()
+        self._hilo = None
+
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with closing(self._conectar()) as con:
+            con.executescript(ESQUEMA)
+            existentes = {fila[1] for fila in con.execute("PRAGMA table_info(sesiones)")}
+            for columna, tipo in COLUMNAS_DUENO:
+                if columna not in existentes:
+                    con.execute(f"ALTER TABLE sesiones ADD COLUMN {columna} {tipo}")
+
+    def _conectar(self):
+        con = sqlite3.connect(self.ruta, timeout=10)
+        con.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL no pierde consistencia ante caídas y evita fsync por transacción
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def iniciar(self):
+        if self._hilo is None:
+            _ESCRITORES_ACTIVOS.add(self.token)
+            self._hilo = threading.Thread(target=self._bucle, name="medseen-diario", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        con = self._conectar()
+        try:
+            while True:
+                lote, marcas, fin = self._tomar_lote()
+                if lote:
+                    self._escribir(con, lote)
+                for marca in marcas:
+                    marca.set()
+                if fin:
+                    break
+                self._latir(con)
+        finally:
+            con.close()
+
+    def _tomar_lote(self):
+        """Espera la primera operación y junta las que lleguen hasta el intervalo o tam_lote"""
+        lote, marcas = [], []
+        limite = None
+        while len(lote) < self.tam_lote:
+            # Sin operaciones pendientes, despertar a tiempo para el siguiente latido
+            espera = self._espera_latido() if limite is None else limite - time.monotonic()
+            if espera is not None and espera <= 0:
+                break
+            try:
+                item = self._cola.get(timeout=espera)
+            except queue.Empty:
+                break
+            if item is None:
+                return lote, marcas, True
+            if isinstance(item, threading.Event):
+                # vaciar(): escribir lo acumulado de inmediato
+                marcas.append(item)
+                break
+            lote.append(item)
+            if limite is None:
+                limite = time.monotonic() + self.intervalo_flush
+        return lote, marcas, False
+
+    def _escribir(self, con, lote):
+        try:
+            with con:
+                for sql, grupo in itertools.groupby(lote, key=lambda op: op[0]):
+                    con.executemany(sql, [params for _, params in grupo])
+            self.escritas += len(lote)
+            self.ultimo_error = None
+        except sqlite3.Error as e:
+            self.ultimo_error = str(e)
+
+    def _espera_latido(self):
+        return max(0.05, self._ultimo_latido + INTERVALO_LATIDO - time.monotonic())
+
+    def _latir(self, con):
+        """Renueva el latido de las sesiones abiertas por este escritor"""
+        if time.monotonic() - self._ultimo_latido < INTERVALO_LATIDO:
+            return
+        self._ultimo_latido = time.monotonic()
+        with self._candado:
+            abiertas = list(self._abiertas)
+        if not abiertas or (self.vivo is not None and not self.vivo()):
+            return
+        marcas = ",".join("?" * len(abiertas))
+        try:
+            with con:
+                con.execute(f"UPDATE sesiones SET latido_ns = ? WHERE token = ? AND id IN ({marcas})",
+                            (time.time_ns(), self.token, *abiertas))
+        except sqlite3.Error as e:
+            self.ultimo_error = str(e)
+
+    def _encolar(self, sql, params):
+        self._cola.put((sql, params))
+
+    def vaciar(self, timeout=5.0):
+        """Espera a que todo lo encolado quede escrito"""
+        if self._hilo is None:
+            return True
+        marca = threading.Event()
+        self._cola.put(marca)
+        return marca.wait(timeout)
+
+    def detener(self):
+        """Escribe lo pendiente y detiene el hilo"""
+        if self._hilo is not None:
+            self._cola.put(None)
+            self._hilo.join(timeout=5.0)
+            self._hilo = None
+            _ESCRITORES_ACTIVOS.discard(self.token)
+
+    # Operaciones de sesión
+
+    def abrir_sesion(self, inicio, configuracion=None, sesion_id=None):
+        """Registra una sesión nueva y devuelve su id"""
+        sesion_id = sesion_id or uuid.uuid4().hex
+        self._encolar("INSERT OR IGNORE INTO sesiones (id, inicio_ns, configuracion, pid, token, latido_ns) "
+                      "VALUES (?, ?, ?, ?, ?, ?)",
+                      (sesion_id, a_epoch_ns(inicio), json.dumps(configuracion or {}, default=str),
+                       self.pid, self.token, time.time_ns()))
+        with self._candado:
+            self._abiertas.add(sesion_id)
+        return sesion_id
+
+    def reclamar_sesion(self, sesion_id):
+        """Este escritor pasa a ser el dueño de una sesión interrumpida que se reanuda"""
+        self._encolar("UPDATE sesiones SET pid = ?, token = ?, latido_ns = ? WHERE id = ?",
+                      (self.pid, self.token, time.time_ns(), sesion_id))
+        with self._candado:
+            self._abiertas.add(sesion_id)
+        return sesion_id
+
+    def registrar(self, sesion_id, instrumento, confianza, timestamp, fuente=""):
+        """Encola una detección confirmada (no bloquea; se descarta si la sesión ya tiene otro dueño)"""
+        self._encolar(SQL_DETECCION, (sesion_id, a_epoch_ns(timestamp), instrumento, float(confianza), fuente,
+                                      sesion_id, self.token))
+
+    def cerrar_sesion(self, sesion_id):
+        with self._candado:
+            self._abiertas.discard(sesion_id)
+        # Un dueño desplazado no puede cerrar la sesión que otro escritor reanudó
+        self._encolar("UPDATE sesiones SET estado = 'cerrada', fin_ns = ? WHERE id = ? AND token = ?",
+                      (time.time_ns(), sesion_id, self.token))
+
+    # Lectura (conexiones propias: WAL permite leer mientras se escribe)
+
+    def sesion_interrumpida(self):
+        """
+        Sesión más reciente que no se cerró correctamente y ya no tiene dueño
+        vivo (las sesiones en curso en otra pestaña no cuentan).
+
+        Returns:
+            dict: {id, inicio, detecciones} o None
+        """
+        with closing(self._conectar()) as con:
+            filas = con.execute(
+                "SELECT id, inicio_ns, pid, token, latido_ns FROM sesiones "
+                "WHERE estado = 'activa' ORDER BY inicio_ns DESC"
+            ).fetchall()
+            for sesion_id, inicio_ns, pid, token, latido_ns in filas:
+                if dueno_vivo(pid, token, latido_ns):
+                    continue
+                detecciones = con.execute("SELECT COUNT(*) FROM detecciones WHERE sesion_id = ?",
+                                          (sesion_id,)).fetchone()[0]
+                return {'id': sesion_id, 'inicio': desde_epoch_ns(inicio_ns), 'detecciones': detecciones}
+        return None
+
+    def descartar_sesion(self, sesion_id):
+        """Marca una sesión interrumpida como cerrada sin reanudarla"""
+        with closing(self._conectar()) as con, con:
+            con.execute("UPDATE sesiones SET estado = 'cerrada' WHERE id = ?", (sesion_id,))
+
+    def detecciones(self, sesion_id):
+        """Itera (timestamp, instrumento, confianza, fuente) en orden cronológico"""
+        with closing(self._conectar()) as con:
+            cursor = con.execute(
+                "SELECT timestamp_ns, instrumento, confianza, fuente FROM detecciones "
+                "WHERE sesion_id = ? ORDER BY timestamp_ns", (sesion_id,)
+            )
+            for ns, instrumento, confianza, fuente in cursor:
+                yield desde_epoch_ns(ns), instrumento, confianza, fuente or ""
+
+    def cargar_sesion(self, sesion_id):
+        """Reconstruye una sesión del diario con la interfaz que usa el reporte PDF"""
+        with closing(self._conectar()) as con:
+            fila = con.execute("SELECT inicio_ns FROM sesiones WHERE id = ?", (sesion_id,)).fetchone()
+        if fila is None:
+            raise KeyError(f"Sesión no encontrada en el diario: {sesion_id}")
+        sesion = SesionDiario(sesion_id, desde_epoch_ns(fila[0]), diario=self)
+        for timestamp, instrumento, confianza, fuente in self.detecciones(sesion_id):
+            sesion.agregar(instrumento, confianza, timestamp, fuente)
+        return sesion
+
+
+def dueno_vivo(pid, token, latido_ns, ahora_ns=None):
+    """
+    True si la sesión sigue en curso: su latido es reciente y su escritor
+    vive (en este proceso, con el hilo en marcha; en otro, con el pid vivo).
+    Las sesiones sin dueño registrado (diarios anteriores) se consideran muertas.
+    """
+    if pid is None or latido_ns is None:
+        return False
+    ahora_ns = time.time_ns() if ahora_ns is None else ahora_ns
+    if ahora_ns - latido_ns > LATIDO_VENCIDO * 1e9:
+        return False
+    if pid == os.getpid():
+        # Mismo pid con otro token: un proceso anterior que reutilizó el pid, o un escritor detenido
+        return token in _ESCRITORES_ACTIVOS
+    import psutil
+
+    return psutil.pid_exists(pid)
+
+
+class SesionDiario:
+    """Sesión leída del diario: los mismos datos que el detector expone al reporte"""
+
+    def __init__(self, sesion_id, inicio, diario=None):
+        # Mismos nombres que el detector: el reporte puede leer el registro del diario
+        self.id_sesion = sesion_id
+        self.diario = diario
+        self.inicio_sesion = inicio
+        self.almacen = AlmacenDetecciones(NOMBRES_CLASES.values())
+        self.estadisticas_sesion = EstadisticasSesion(inicio)
+
+    def agregar(self, instrumento, confianza, timestamp, fuente=""):
+        self.almacen.agregar(instrumento, confianza, timestamp, fuente)
+        self.estadisticas_sesion.registrar(instrumento, confianza, timestamp)
+
+    @property
+    def detecciones_confirmadas(self):
+        return VistaDetecciones(self.almacen)
+
+    @property
+    def estadisticas(self):
+        return self.estadisticas_sesion.conteos
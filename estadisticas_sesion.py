@@ -0,0 +1,189 @@
+"""
+Estadísticas Incrementales de Sesión para MedSeen
+
+Descripción:
+Este módulo mantiene los agregados de una sesión de detección que consumen
+el dashboard y el reporte PDF: conteos por instrumento, suma y suma de
+cuadrados de la confianza, histograma de confianza y una matriz densa de
+conteos por instrumento y minuto, que se reagrupa a 10 minutos o a una hora
+para las gráficas temporales (ver cubetas_tiempo.py).
+
+Cada confirmación los actualiza en O(1) desde _confirmar_deteccion, de modo
+que el costo de graficar depende del número de instrumentos y de minutos de
+la sesión, no del número de detecciones acumuladas en el turno.
+
+Funcionalidades:
+- Conteos por clase y totales
+- Promedio y desviación estándar de la confianza sin recorrer detecciones
+- Histograma de confianza de cubetas fijas
+- Conteos por minuto e instrumento con resolución automática para graficar
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: estadisticas_sesion.py
+
+Requisitos:
+- numpy
+- cubetas_tiempo.py
+"""
+
+import math
+import threading
+
+import numpy as np
+
+from cubetas_tiempo import a_datetimes, desfase_local, elegir_resolucion, reagrupar
+
+N_CUBETAS_CONFIANZA = 20
+# Minutos reservados al crecer la matriz por minuto
+BLOQUE_MINUTOS = 120
+
+
+class EstadisticasSesion:
+    """
+    Agregados de una sesión actualizados en O(1) por detección confirmada.
+
+    Los conteos por tiempo se guardan en una matriz instrumento x minuto
+    indexada por minutos enteros desde el primero de la sesión, por lo que
+    ordenan correctamente aunque la sesión cruce la medianoche.
+    """
+
+    def __init__(self, inicio=None):
+        self.inicio = inicio
+        self.ultima = None
+        self.total = 0
+        self.conteos = {}
+        self.suma_confianza = 0.0
+        self.suma_cuadrados = 0.0
+        self.histograma_confianza = np.zeros(N_CUBETAS_CONFIANZA, dtype=np.int64)
+        # Filas: instrumentos en orden de aparición; columnas: minutos desde minuto_origen
+        self.filas = {}
+        self.por_minuto = np.zeros((0, BLOQUE_MINUTOS), dtype=np.int64)
+        self.minuto_origen = None
+        self.n_minutos = 0
+        self.desfase = desfase_local(inicio)
+        self._lock = threading.Lock()
+
+    def registrar(self, instrumento, confianza, timestamp):
+        """Agrega una detección confirmada (O(1) amortizado)"""
+        minuto = int(timestamp.timestamp()) // 60
+        cubeta = min(int(confianza * N_CUBETAS_CONFIANZA), N_CUBETAS_CONFIANZA - 1)
+        with self._lock:
+            self.total += 1
+            self.ultima = timestamp
+            self.conteos[instrumento] = self.conteos.get(instrumento, 0) + 1
+            self.suma_confianza += confianza
+            self.suma_cuadrados += confianza * confianza
+            self.histograma_confianza[cubeta] += 1
+            # Calcular índices antes de indexar: ambos pueden reasignar la matriz
+            fila, columna = self._fila(instrumento), self._columna(minuto)
+            self.por_minuto[fila, columna] += 1
+
+    def __getstate__(self):
+        # Copia consistente (bajo el lock) para pickle/deepcopy, p. ej. el reporte PDF
+        with self._lock:
+            estado = self.__dict__.copy()
+            estado['conteos'] = dict(self.conteos)
+            estado['filas'] = dict(self.filas)
+            estado['histograma_confianza'] = self.histograma_confianza.copy()
+            estado['por_minuto'] = self.por_minuto[:, :self.n_minutos].copy()
+        del estado['_lock']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def _fila(self, instrumento):
+        fila = self.filas.get(instrumento)
+        if fila is None:
+            fila = self.filas[instrumento] = len(self.filas)
+            nueva = np.zeros((1, self.por_minuto.shape[1]), dtype=np.int64)
+            self.por_minuto = np.vstack([self.por_minuto, nueva])
+        return fila
+
+    def _columna(self, minuto):
+        if self.minuto_origen is None:
+            self.minuto_origen = minuto
+        if minuto < self.minuto_origen:
+            # Llegó un minuto anterior al primero (p. ej. dos fuentes desfasadas)
+            faltan = self.minuto_origen - minuto
+            self.por_minuto = np.pad(self.por_minuto, ((0, 0), (faltan, 0)))
+            self.minuto_origen = minuto
+            self.n_minutos += faltan
+        columna = minuto - self.minuto_origen
+        capacidad = self.por_minuto.shape[1]
+        if columna >= capacidad:
+            extra = max(capacidad, columna + 1 - capacidad, BLOQUE_MINUTOS)
+            self.por_minuto = np.pad(self.por_minuto, ((0, 0), (0, extra)))
+        self.n_minutos = max(self.n_minutos, columna + 1)
+        return columna
+
+    @property
+    def confianza_promedio(self):
+        return self.suma_confianza / self.total if self.total else 0.0
+
+    @property
+    def desviacion_confianza(self):
+        if self.total < 2:
+            return 0.0
+        media = self.confianza_promedio
+        varianza = max(self.suma_cuadrados / self.total - media * media, 0.0)
+        return math.sqrt(varianza)
+
+    def copia_conteos(self):
+        """Conteos por instrumento (copia segura para iterar desde la UI)"""
+        with self._lock:
+            return dict(self.conteos)
+
+    def histograma(self):
+        """
+        Returns:
+            tuple: (centros, cuentas) del histograma de confianza
+        """
+        with self._lock:
+            cuentas = self.histograma_confianza.copy()
+        ancho = 1.0 / N_CUBETAS_CONFIANZA
+        centros = (np.arange(N_CUBETAS_CONFIANZA) + 0.5) * ancho
+        return centros, cuentas
+
+    def resolucion_auto(self):
+        """Resolución de las gráficas temporales según la duración de la sesión"""
+        return elegir_resolucion(self.n_minutos * 60)
+
+    def _reagrupado(self, resolucion):
+        with self._lock:
+            instrumentos = list(self.filas)
+            datos = self.por_minuto[:, :self.n_minutos].copy()
+            origen = self.minuto_origen or 0
+        inicios, matriz = reagrupar(datos, origen, resolucion, self.desfase)
+        return instrumentos, inicios, matriz
+
+    def serie(self, resolucion=None):
+        """
+        Detecciones totales por cubeta de tiempo (incluye cubetas vacías).
+
+        Args:
+            resolucion (int): Segundos por cubeta; None elige según la duración
+
+        Returns:
+            tuple: (lista de datetime de inicio, arreglo de conteos, resolución usada)
+        """
+        resolucion = resolucion or self.resolucion_auto()
+        _, inicios, matriz = self._reagrupado(resolucion)
+        return a_datetimes(inicios), matriz.sum(axis=0), resolucion
+
+    def matriz_clase(self, resolucion=None):
+        """
+        Conteos por instrumento y cubeta de tiempo.
+
+        Returns:
+            tuple: (instrumentos, inicios como datetime, matriz instrumentos x cubetas, resolución usada)
+        """
+        resolucion = resolucion or self.resolucion_auto()
+        instrumentos, inicios, matriz = self._reagrupado(resolucion)
+        orden = sorted(range(len(instrumentos)), key=instrumentos.__getitem__)
+        return [instrumentos[i] for i in orden], a_datetimes(inicios), matriz[orden], resolucion
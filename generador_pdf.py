@@ -0,0 +1,405 @@
+"""
+Generador del Reporte PDF de MedSeen
+
+Descripción:
+Este módulo arma el reporte PDF de una sesión: tablas con ReportLab y la
+figura 2x2 de Matplotlib. Es la parte pesada del reporte y solo se importa
+dentro de los procesos trabajadores (ver reporte_pdf.py), de modo que la
+aplicación de Streamlit no carga ReportLab, Matplotlib ni Seaborn al
+arrancar.
+
+Funcionalidades:
+- PDFGenerator: reporte completo a partir de una sesión o instantánea
+- TablaRegistro: registro completo partido por páginas mientras se lee
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: generador_pdf.py
+
+Requisitos:
+- reportlab
+- matplotlib
+- seaborn
+- pandas
+- cubetas_tiempo.py
+"""
+
+import io
+import os
+from datetime import datetime, timedelta
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, Flowable
+
+from cubetas_tiempo import NOMBRES_RESOLUCION
+
+
+class TablaRegistro(Flowable):
+    """
+    Tabla del registro completo que se parte por páginas mientras lee filas.
+
+    wrap() nunca declara que cabe, así ReportLab llama a split() en cada
+    frame; split() toma del iterador solo las filas que caben y devuelve esa
+    página como Table más una continuación que sigue leyendo del mismo
+    iterador. En memoria solo existe la página en curso, sin importar el
+    largo de la sesión.
+
+    Las filas leídas quedan en la instancia (_pendientes) hasta que una
+    página las dibuja: si ReportLab llama a split() y descarta el resultado
+    (al probar otro frame), la siguiente llamada vuelve a entregar las
+    mismas filas en lugar de perderlas.
+    """
+
+    ALTO_FILA = 13
+    ENCABEZADO = ['#', 'Fecha y hora', 'Instrumento', 'Confianza', 'Fuente']
+    ANCHOS = [0.8*inch, 1.8*inch, 1.6*inch, 1*inch, 1.2*inch]
+
+    def __init__(self, registro, estilo, numero=0, pendientes=None):
+        super().__init__()
+        self._filas = iter(registro)
+        self._estilo = estilo
+        self._numero = numero
+        self._pendientes = list(pendientes or [])
+        self._llenar(1)
+
+    def _leer(self):
+        fila = next(self._filas, None)
+        if fila is None:
+            return None
+        timestamp, instrumento, confianza, fuente = fila
+        self._numero += 1
+        return [str(self._numero), timestamp.strftime("%d/%m/%Y %H:%M:%S"), instrumento,
+                f"{confianza:.1%}", fuente]
+
+    def _llenar(self, n):
+        """Lee del iterador hasta tener n filas pendientes (o agotarlo)"""
+        while len(self._pendientes) < n:
+            fila = self._leer()
+            if fila is None:
+                break
+            self._pendientes.append(fila)
+
+    @property
+    def vacia(self):
+        return not self._pendientes
+
+    def wrap(self, availWidth, availHeight):
+        return sum(self.ANCHOS), availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        cupo = int(availHeight // self.ALTO_FILA) - 1
+        if cupo < 1 or not self._pendientes:
+            return []
+        # Una fila de más para saber si hace falta continuación
+        self._llenar(cupo + 1)
+        pagina, resto = self._pendientes[:cupo], self._pendientes[cupo:]
+        filas = [self.ENCABEZADO] + pagina
+        tabla = Table(filas, colWidths=self.ANCHOS, rowHeights=[self.ALTO_FILA] * len(filas))
+        tabla.setStyle(self._estilo)
+        if not resto:
+            return [tabla]
+        # Continuación nueva (no self): ReportLab marca como pospuesto al flowable que no cupo
+        return [tabla, TablaRegistro(self._filas, self._estilo, self._numero, resto)]
+
+    def draw(self):
+        pass
+
+
+class PDFGenerator:
+    """Reporte PDF de una sesión (detector, SesionDiario o InstantaneaSesion)"""
+
+    def __init__(self):
+        self.colors_pdf = {
+            'primary': colors.Color(43/255, 91/255, 132/255),
+            'secondary': colors.Color(79/255, 195/255, 215/255),
+            'text': colors.Color(44/255, 62/255, 80/255)
+        }
+    
+    def generar_reporte(self, detector, destino=None, registro=None):
+        """
+        Genera un reporte PDF completo de la sesión.
+        
+        Args:
+            detector: Detector, SesionDiario o InstantaneaSesion
+            destino (str): Archivo de salida; None para devolver un BytesIO
+            registro (iterable): Filas (timestamp, instrumento, confianza, fuente) del
+                registro completo; None para incluir solo las últimas detecciones
+        """
+        buffer = destino or io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
+        
+        # Estilos
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=self.colors_pdf['primary'],
+            alignment=TA_CENTER,
+            spaceAfter=30
+        )
+        
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],  
+            fontSize=16,
+            textColor=self.colors_pdf['primary'],
+            spaceAfter=12
+        )
+        
+        story = []
+        
+        # Logo y título
+        try:
+            if os.path.exists("img/logo.png"):
+                logo = Image("img/logo.png", width=2*inch, height=2*inch)
+                logo.hAlign = 'CENTER'
+                story.append(logo)
+                story.append(Spacer(1, 20))
+        except:
+            pass
+        
+        # Título principal
+        title = Paragraph("REPORTE DE DETECCIÓN DE INSTRUMENTOS DENTALES", title_style)
+        story.append(title)
+        story.append(Spacer(1, 30))
+        
+        # Información de la sesión
+        story.append(Paragraph("INFORMACIÓN DE LA SESIÓN", heading_style))
+        
+        session_data = [
+            ['Fecha de inicio', detector.inicio_sesion.strftime("%d/%m/%Y") if detector.inicio_sesion else 'N/A'],
+            ['Hora de inicio', detector.inicio_sesion.strftime("%H:%M:%S") if detector.inicio_sesion else 'N/A'],
+            ['Duración estimada', self._calcular_duracion(detector)],
+            ['Total de detecciones', str(detector.estadisticas_sesion.total)],
+            ['Instrumentos únicos', str(len(detector.estadisticas))],
+            ['Confianza promedio', f"{self._calcular_confianza_promedio(detector):.1%}"]
+        ]
+        
+        session_table = Table(session_data, colWidths=[3*inch, 2*inch])
+        session_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['secondary']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, self.colors_pdf['primary'])
+        ]))
+        
+        story.append(session_table)
+        story.append(Spacer(1, 30))
+        
+        # Estadísticas por instrumento
+        conteos = detector.estadisticas_sesion.copia_conteos()
+        if conteos:
+            story.append(Paragraph("ESTADÍSTICAS POR INSTRUMENTO", heading_style))
+            
+            stats_data = [['Instrumento', 'Cantidad', 'Porcentaje']]
+            total = detector.estadisticas_sesion.total
+            
+            for instrumento, cantidad in sorted(conteos.items(), key=lambda x: x[1], reverse=True):
+                porcentaje = (cantidad / total) * 100
+                stats_data.append([instrumento, str(cantidad), f"{porcentaje:.1f}%"])
+            
+            stats_table = Table(stats_data, colWidths=[2.5*inch, 1*inch, 1*inch])
+            stats_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['primary']),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('GRID', (0, 0), (-1, -1), 1, self.colors_pdf['primary']),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+            ]))
+            
+            story.append(stats_table)
+            story.append(Spacer(1, 30))
+        
+        # Log de detecciones
+        if registro is not None:
+            story.append(PageBreak())
+            story.append(Paragraph("REGISTRO CRONOLÓGICO COMPLETO DE DETECCIONES", heading_style))
+            tabla = TablaRegistro(registro, self._estilo_registro())
+            if tabla.vacia:
+                story.append(Paragraph("No se registraron detecciones en esta sesión.", styles['Normal']))
+            else:
+                story.append(tabla)
+        else:
+            story.append(Paragraph("REGISTRO CRONOLÓGICO DE DETECCIONES", heading_style))
+            
+            if detector.detecciones_confirmadas:
+                log_data = [['Hora', 'Instrumento', 'Confianza']]
+                
+                for deteccion in detector.detecciones_confirmadas[-20:]:  # Últimas 20
+                    log_data.append([
+                        deteccion['tiempo'],
+                        deteccion['instrumento'],
+                        f"{deteccion['confianza']:.1%}"
+                    ])
+                
+                log_table = Table(log_data, colWidths=[1.5*inch, 2.5*inch, 1*inch])
+                log_table.setStyle(TableStyle([
+                    ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['secondary']),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, 0), 10),
+                    ('FONTSIZE', (0, 1), (-1, -1), 9),
+                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                    ('GRID', (0, 0), (-1, -1), 1, self.colors_pdf['primary']),
+                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+                ]))
+                
+                story.append(log_table)
+            else:
+                story.append(Paragraph("No se registraron detecciones en esta sesión.", styles['Normal']))
+        
+        # Agregar gráficas al PDF
+        if detector.estadisticas_sesion.total:
+            story.append(PageBreak())
+            story.append(Paragraph("ANÁLISIS GRÁFICO DETALLADO", heading_style))
+            
+            # Generar gráficas con matplotlib para el PDF
+            self._generar_graficas_pdf(detector, story)
+        
+        story.append(Spacer(1, 40))
+        
+        # Footer
+        footer_text = f"""
+        <para align="center">
+        <b>MedSeen - Sistema de Detección de Instrumentos Dentales</b><br/>
+        Reporte generado el {datetime.now().strftime("%d/%m/%Y a las %H:%M:%S")}<br/>
+        Tecnología: YOLO + OpenCV + Inteligencia Artificial
+        </para>
+        """
+        story.append(Paragraph(footer_text, styles['Normal']))
+        
+        # Construir PDF
+        doc.build(story)
+        if destino:
+            return destino
+        buffer.seek(0)
+        return buffer
+    
+    def _estilo_registro(self):
+        # Sin ROWBACKGROUNDS ni fuentes grandes: filas de alto fijo para calcular cuántas caben
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['secondary']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+            ('GRID', (0, 0), (-1, -1), 0.5, self.colors_pdf['primary'])
+        ])
+    
+    def _calcular_duracion(self, detector):
+        if not detector.inicio_sesion:
+            return "N/A"
+        
+        # Estimar duración basada en las detecciones
+        if detector.estadisticas_sesion.ultima:
+            duracion = detector.estadisticas_sesion.ultima - detector.inicio_sesion
+        else:
+            duracion = timedelta(minutes=1)  # Duración mínima estimada
+        
+        return str(duracion).split('.')[0]  # Remover microsegundos
+    
+    def _calcular_confianza_promedio(self, detector):
+        return detector.estadisticas_sesion.confianza_promedio
+    
+    def _generar_graficas_pdf(self, detector, story):
+        """Genera múltiples gráficas para incluir en el PDF"""
+        try:
+            # Configurar matplotlib para PDF
+            plt.style.use('default')
+            sns.set_palette("husl")
+            
+            # Preparar datos (agregados de la sesión, sin recorrer las detecciones)
+            sesion = detector.estadisticas_sesion
+            df_stats = pd.DataFrame(list(sesion.copia_conteos().items()), columns=['Instrumento', 'Cantidad'])
+            cubetas, conteo_cubeta, resolucion = sesion.serie()
+            
+            # Crear figura con múltiples subplots
+            fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
+            fig.suptitle('Análisis Gráfico de Detecciones', fontsize=16, fontweight='bold')
+            
+            # 1. Gráfica de barras
+            colors_bars = ['#2B5B84', '#4FC3D7', '#1A4A6B', '#27AE60', '#F39C12']
+            bars = ax1.bar(df_stats['Instrumento'], df_stats['Cantidad'], 
+                          color=colors_bars[:len(df_stats)])
+            ax1.set_title('Detecciones por Instrumento', fontweight='bold')
+            ax1.set_xlabel('Instrumentos')
+            ax1.set_ylabel('Cantidad')
+            ax1.tick_params(axis='x', rotation=45)
+            
+            # Agregar valores en las barras
+            for bar in bars:
+                height = bar.get_height()
+                ax1.text(bar.get_x() + bar.get_width()/2., height,
+                        f'{int(height)}', ha='center', va='bottom')
+            
+            # 2. Gráfica de pie
+            ax2.pie(df_stats['Cantidad'], labels=df_stats['Instrumento'], autopct='%1.1f%%',
+                   colors=colors_bars[:len(df_stats)], startangle=90)
+            ax2.set_title('Distribución Porcentual', fontweight='bold')
+            
+            # 3. Línea de tiempo (resolución según la duración de la sesión)
+            if sesion.total > 1:
+                ax3.plot(cubetas, conteo_cubeta, 
+                        marker='o', linewidth=2, markersize=6, color='#2B5B84')
+                ax3.set_title('Detecciones en el Tiempo', fontweight='bold')
+                ax3.set_xlabel('Tiempo')
+                ax3.set_ylabel(f'Detecciones por {NOMBRES_RESOLUCION[resolucion]}')
+                ax3.tick_params(axis='x', rotation=45)
+            else:
+                ax3.text(0.5, 0.5, 'Datos insuficientes\npara gráfica temporal', 
+                        ha='center', va='center', transform=ax3.transAxes)
+                ax3.set_title('Detecciones en el Tiempo')
+            
+            # 4. Gráfica de confianza
+            if sesion.total:
+                centros, cuentas = sesion.histograma()
+                ax4.bar(centros, cuentas, width=1 / len(centros), color='#4FC3D7', alpha=0.7, edgecolor='black')
+                ax4.axvline(sesion.confianza_promedio, color='red', linestyle='--', 
+                           label=f'Promedio: {sesion.confianza_promedio:.2%}')
+                ax4.set_title('Distribución de Confianza', fontweight='bold')
+                ax4.set_xlabel('Nivel de Confianza')
+                ax4.set_ylabel('Frecuencia')
+                ax4.legend()
+            else:
+                ax4.text(0.5, 0.5, 'Sin datos de confianza', 
+                        ha='center', va='center', transform=ax4.transAxes)
+            
+            plt.tight_layout()
+            
+            # Guardar gráfica como imagen temporal
+            temp_img = io.BytesIO()
+            plt.savefig(temp_img, format='png', dpi=150, bbox_inches='tight')
+            temp_img.seek(0)
+            plt.close()
+            
+            # Agregar imagen al PDF
+            img = Image(temp_img, width=7*inch, height=5.8*inch)
+            story.append(img)
+            story.append(Spacer(1, 20))
+            
+        except Exception as e:
+            story.append(Paragraph(f"Error generando gráficas: {str(e)}", getSampleStyleSheet()['Normal']))
@@ -0,0 +1,187 @@
+"""
+Gobernador de Rendimiento Adaptativo para MedSeen
+
+Descripción:
+Este módulo ajusta en vivo el tamaño de entrada del modelo (imgsz) y la
+zancada de detección (correr el modelo 1 de cada N frames) para sostener un
+FPS objetivo o una fracción máxima de CPU, según el equipo. En una PC lenta
+de consultorio baja la resolución y espacia las inferencias en lugar de
+quedarse atrás; en una rápida vuelve a 640 px y a detectar en cada frame.
+
+Los puntos de operación forman una escalera de más a menos costoso: primero
+se reduce imgsz (640 → 512 → 416 → 320) y después se aumenta la zancada. Para
+no oscilar, se baja un escalón en cuanto la capacidad medida no alcanza el
+objetivo, pero solo se sube si la capacidad estimada del escalón superior lo
+supera con margen y tras un tiempo de espera que se duplica cada vez que una
+subida tuvo que revertirse.
+
+Funcionalidades:
+- Latencia móvil del detector y del resto del pipeline por ciclo
+- Uso de CPU del proceso (fracción del total de núcleos)
+- Estimación del costo de otro imgsz (proporcional al área de entrada)
+- Histéresis con margen, enfriamiento y espera creciente tras reversiones
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: gobernador.py
+
+Requisitos:
+- numpy
+"""
+
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+# Tamaños de entrada probados, de menor a mayor (múltiplos de 32)
+TAMANOS_ENTRADA = (320, 416, 512, 640)
+ZANCADA_MAXIMA = 6
+
+
+class GobernadorRendimiento:
+    """
+    Elige el punto de operación (imgsz, zancada) que sostiene el objetivo.
+
+    Args:
+        fps_objetivo (float): Frames por segundo por fuente a sostener (None = sin objetivo)
+        cpu_objetivo (float): Fracción máxima de CPU del proceso, 0-1 (None = sin límite)
+        tamanos (tuple): Tamaños de entrada permitidos, de menor a mayor
+        zancada_min (int): Zancada del mejor escalón (la elegida por el usuario)
+        zancada_max (int): Zancada del escalón más barato
+        ventana (int): Ciclos que se promedian antes de decidir
+        margen (float): Holgura relativa exigida para subir un escalón
+        enfriamiento (float): Segundos mínimos entre cambios
+    """
+
+    def __init__(self, fps_objetivo=15.0, cpu_objetivo=None, tamanos=TAMANOS_ENTRADA,
+                 zancada_min=1, zancada_max=ZANCADA_MAXIMA, ventana=20, margen=0.2, enfriamiento=2.0):
+        self.fps_objetivo = fps_objetivo
+        self.cpu_objetivo = cpu_objetivo
+        self.margen = margen
+        self.enfriamiento = enfriamiento
+        zancada_min = max(1, int(zancada_min))
+        zancada_max = max(zancada_min, int(zancada_max))
+        tamanos = sorted(tamanos)
+        self.niveles = ([(t, zancada_min) for t in reversed(tamanos)]
+                        + [(tamanos[0], z) for z in range(zancada_min + 1, zancada_max + 1)])
+        self.nivel = 0
+        self.cambios = 0
+
+        # Latencias por ciclo: llamada al detector y resto del pipeline
+        self._detector = deque(maxlen=ventana)
+        self._resto = deque(maxlen=ventana)
+        self._ultimo_cambio = float("-inf")
+        self._ultima_subida = None
+        # Espera antes de intentar subir; se duplica si una subida se revierte
+        self._espera_subida = 5.0
+        self._nucleos = os.cpu_count() or 1
+        self._cpu_ref = (time.process_time(), time.monotonic())
+        self.uso_cpu = 0.0
+        # Última capacidad evaluada (la interfaz la lee desde otro hilo)
+        self.capacidad = 0.0
+
+    @property
+    def imgsz(self):
+        return self.niveles[self.nivel][0]
+
+    @property
+    def zancada(self):
+        return self.niveles[self.nivel][1]
+
+    def registrar(self, segundos_ciclo, segundos_detector=None, ahora=None):
+        """
+        Registra un ciclo del pipeline y decide si cambiar de escalón.
+
+        Args:
+            segundos_ciclo (float): Duración total del ciclo (todas las fuentes)
+            segundos_detector (float): Parte del ciclo en la llamada al modelo (None si solo se propagó)
+
+        Returns:
+            bool: True si cambió el punto de operación
+        """
+        if segundos_detector is not None:
+            self._detector.append(segundos_detector)
+            self._resto.append(max(segundos_ciclo - segundos_detector, 0.0))
+        else:
+            self._resto.append(segundos_ciclo)
+
+        ahora = time.monotonic() if ahora is None else ahora
+        if ahora - self._ultimo_cambio < self.enfriamiento or len(self._detector) < self._detector.maxlen // 2:
+            return False
+        self._medir_cpu(ahora)
+        self.capacidad = self.capacidad_fps()
+
+        if self._insuficiente(self.nivel) and self.nivel < len(self.niveles) - 1:
+            # Una subida que no se sostuvo: esperar más antes de intentarla otra vez
+            if self._ultima_subida is not None and ahora - self._ultima_subida < 4 * self._espera_subida:
+                self._espera_subida = min(self._espera_subida * 2, 300.0)
+            self._ultima_subida = None
+            return self._cambiar(self.nivel + 1, ahora)
+
+        if (self.nivel > 0 and ahora - self._ultimo_cambio >= self._espera_subida
+                and self._holgado(self.nivel - 1)):
+            self._ultima_subida = ahora
+            return self._cambiar(self.nivel - 1, ahora)
+        return False
+
+    def _medir_cpu(self, ahora):
+        cpu, reloj = time.process_time(), ahora
+        cpu_ref, reloj_ref = self._cpu_ref
+        if reloj - reloj_ref > 0:
+            self.uso_cpu = (cpu - cpu_ref) / (reloj - reloj_ref) / self._nucleos
+        self._cpu_ref = (cpu, reloj)
+
+    def _costo_ciclo(self, nivel):
+        """Segundos por frame estimados en `nivel`, a partir de lo medido en el actual"""
+        tamano, zancada = self.niveles[nivel]
+        detector = float(np.median(list(self._detector))) * (tamano / self.imgsz) ** 2
+        resto = float(np.median(list(self._resto))) if self._resto else 0.0
+        return detector / zancada + resto
+
+    def capacidad_fps(self, nivel=None):
+        """Ciclos por segundo que el pipeline puede sostener (estimado para otro nivel)"""
+        if not self._detector:
+            return 0.0
+        return 1.0 / max(self._costo_ciclo(self.nivel if nivel is None else nivel), 1e-6)
+
+    def _insuficiente(self, nivel):
+        if self.fps_objetivo and self.capacidad_fps(nivel) < self.fps_objetivo:
+            return True
+        return bool(self.cpu_objetivo) and self.uso_cpu > self.cpu_objetivo
+
+    def _holgado(self, nivel):
+        """El escalón `nivel` cumpliría el objetivo con margen"""
+        if self.fps_objetivo and self.capacidad_fps(nivel) < self.fps_objetivo * (1 + self.margen):
+            return False
+        if self.cpu_objetivo:
+            cpu_estimado = self.uso_cpu * self._costo_ciclo(nivel) / self._costo_ciclo(self.nivel)
+            if cpu_estimado > self.cpu_objetivo * (1 - self.margen):
+                return False
+        return True
+
+    def _cambiar(self, nivel, ahora):
+        self.nivel = nivel
+        # Las latencias del escalón anterior ya no aplican: se decide con muestras nuevas
+        self._detector.clear()
+        self._resto.clear()
+        self._ultimo_cambio = ahora
+        self._cpu_ref = (time.process_time(), ahora)
+        self.cambios += 1
+        return True
+
+    def estado(self):
+        """Punto de operación actual para mostrarlo en la interfaz"""
+        return {
+            'imgsz': self.imgsz,
+            'zancada': self.zancada,
+            'nivel': self.nivel,
+            'niveles': len(self.niveles),
+            'capacidad_fps': self.capacidad,
+            'uso_cpu': self.uso_cpu,
+            'cambios': self.cambios
+        }
@@ -53,27 +53,36 @@ streamlit run medSeen_dental_detector_app.py
 """
 
 import streamlit as st
-from ultralytics import YOLO
 import cv2
+import threading
 import time
-from datetime import datetime, timedelta
-import pandas as pd
+import uuid
+from datetime import datetime
 import os
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-import io
 import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.backends.backend_pdf import PdfPages
+import html
+from carga_diferida import CARGADOS, importar_diferido
+from captura import CapturaEnSegundoPlano, RanuraUltimoValor
+from registro_modelos import obtener_modelo
+from backends_inferencia import DESCRIPCION_BACKENDS, NOMBRES_CLASES, ResultadoDeteccion
+from medicion import MetricasPipeline, obtener_exportador
+from anotacion import RenderizadorAnotaciones
+from seguimiento import SeguidorMultiple
+from gobernador import GobernadorRendimiento
+from cambio_escena import DetectorCambio
+from region_interes import InferenciaRegiones, parsear_mosaico, parsear_roi
+from transmision import obtener_servidor, retirar_sesion
+from estadisticas_sesion import EstadisticasSesion
+from cubetas_tiempo import NOMBRES_RESOLUCION
+from almacen_detecciones import AlmacenDetecciones, VistaDetecciones, VistaLog
+from diario_sesion import LATIDO_VENCIDO, RUTA_DIARIO, DiarioSesion
+from reporte_pdf import RUTA_REPORTES, InstantaneaSesion, enviar_reporte
+
+# Solo el dashboard las usa: se importan con la primera gráfica, no al arrancar
+pd = importar_diferido("pandas")
+go = importar_diferido("plotly.graph_objects")
+subplots = importar_diferido("plotly.subplots")
 
 # Configuración de la página
 st.set_page_config(
@@ -96,6 +105,18 @@ COLORS = {
     'error': '#E74C3C'
 }
 
+# Intervalo (segundos) con el que la UI consulta los resultados del detector
+INTERVALO_REFRESCO_UI = 0.2
+# Con MJPEG el video no depende de los reruns: solo se refrescan métricas y log
+INTERVALO_REFRESCO_MJPEG = 1.0
+
+# Archivo .prom para el textfile collector de node_exporter
+RUTA_METRICAS_PROM = os.environ.get("MEDSEEN_METRICAS_PROM", "metricas/medseen.prom")
+INTERVALO_METRICAS_PROM = 10.0
+
+# Sin lecturas de la UI durante este tiempo se asume que nadie ve el video
+ESPERA_SIN_ESPECTADOR = 2.0
+
 # CSS minimalista con colores MedSeen
 st.markdown(f"""
 <style>
@@ -286,288 +307,148 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
-class PDFGenerator:
-    def __init__(self):
-        self.colors_pdf = {
-            'primary': colors.Color(43/255, 91/255, 132/255),
-            'secondary': colors.Color(79/255, 195/255, 215/255),
-            'text': colors.Color(44/255, 62/255, 80/255)
-        }
-    
-    def generar_reporte(self, detector):
-        """Genera un reporte PDF completo de la sesión"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
-        
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=self.colors_pdf['primary'],
-            alignment=TA_CENTER,
-            spaceAfter=30
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],  
-            fontSize=16,
-            textColor=self.colors_pdf['primary'],
-            spaceAfter=12
-        )
-        
-        story = []
-        
-        # Logo y título
-        try:
-            if os.path.exists("img/logo.png"):
-                logo = Image("img/logo.png", width=2*inch, height=2*inch)
-                logo.hAlign = 'CENTER'
-                story.append(logo)
-                story.append(Spacer(1, 20))
-        except:
-            pass
-        
-        # Título principal
-        title = Paragraph("REPORTE DE DETECCIÓN DE INSTRUMENTOS DENTALES", title_style)
-        story.append(title)
-        story.append(Spacer(1, 30))
-        
-        # Información de la sesión
-        story.append(Paragraph("INFORMACIÓN DE LA SESIÓN", heading_style))
-        
-        session_data = [
-            ['Fecha de inicio', detector.inicio_sesion.strftime("%d/%m/%Y") if detector.inicio_sesion else 'N/A'],
-            ['Hora de inicio', detector.inicio_sesion.strftime("%H:%M:%S") if detector.inicio_sesion else 'N/A'],
-            ['Duración estimada', self._calcular_duracion(detector)],
-            ['Total de detecciones', str(len(detector.detecciones_confirmadas))],
-            ['Instrumentos únicos', str(len(detector.estadisticas))],
-            ['Confianza promedio', f"{self._calcular_confianza_promedio(detector):.1%}"]
-        ]
-        
-        session_table = Table(session_data, colWidths=[3*inch, 2*inch])
-        session_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['secondary']),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, self.colors_pdf['primary'])
-        ]))
-        
-        story.append(session_table)
-        story.append(Spacer(1, 30))
-        
-        # Estadísticas por instrumento
-        if detector.estadisticas:
-            story.append(Paragraph("ESTADÍSTICAS POR INSTRUMENTO", heading_style))
-            
-            stats_data = [['Instrumento', 'Cantidad', 'Porcentaje']]
-            total = sum(detector.estadisticas.values())
-            
-            for instrumento, cantidad in sorted(detector.estadisticas.items(), key=lambda x: x[1], reverse=True):
-                porcentaje = (cantidad / total) * 100
-                stats_data.append([instrumento, str(cantidad), f"{porcentaje:.1f}%"])
-            
-            stats_table = Table(stats_data, colWidths=[2.5*inch, 1*inch, 1*inch])
-            stats_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['primary']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, self.colors_pdf['primary']),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-            ]))
-            
-            story.append(stats_table)
-            story.append(Spacer(1, 30))
-        
-        # Log de detecciones
-        story.append(Paragraph("REGISTRO CRONOLÓGICO DE DETECCIONES", heading_style))
-        
-        if detector.detecciones_confirmadas:
-            log_data = [['Hora', 'Instrumento', 'Confianza']]
-            
-            for deteccion in detector.detecciones_confirmadas[-20:]:  # Últimas 20
-                log_data.append([
-                    deteccion['tiempo'],
-                    deteccion['instrumento'],
-                    f"{deteccion['confianza']:.1%}"
-                ])
-            
-            log_table = Table(log_data, colWidths=[1.5*inch, 2.5*inch, 1*inch])
-            log_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), self.colors_pdf['secondary']),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, self.colors_pdf['primary']),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-            ]))
-            
-            story.append(log_table)
-        else:
-            story.append(Paragraph("No se registraron detecciones en esta sesión.", styles['Normal']))
-        
-        # Agregar gráficas al PDF
-        if detector.estadisticas and detector.detecciones_confirmadas:
-            story.append(PageBreak())
-            story.append(Paragraph("ANÁLISIS GRÁFICO DETALLADO", heading_style))
-            
-            # Generar gráficas con matplotlib para el PDF
-            self._generar_graficas_pdf(detector, story)
-        
-        story.append(Spacer(1, 40))
-        
-        # Footer
-        footer_text = f"""
-        <para align="center">
-        <b>MedSeen - Sistema de Detección de Instrumentos Dentales</b><br/>
-        Reporte generado el {datetime.now().strftime("%d/%m/%Y a las %H:%M:%S")}<br/>
-        Tecnología: YOLO + OpenCV + Inteligencia Artificial
-        </para>
-        """
-        story.append(Paragraph(footer_text, styles['Normal']))
-        
-        # Construir PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-    
-    def _calcular_duracion(self, detector):
-        if not detector.inicio_sesion:
-            return "N/A"
-        
-        # Estimar duración basada en las detecciones
-        if detector.detecciones_confirmadas:
-            ultima_deteccion = detector.detecciones_confirmadas[-1]['timestamp']
-            duracion = ultima_deteccion - detector.inicio_sesion
-        else:
-            duracion = timedelta(minutes=1)  # Duración mínima estimada
-        
-        return str(duracion).split('.')[0]  # Remover microsegundos
-    
-    def _calcular_confianza_promedio(self, detector):
-        if not detector.detecciones_confirmadas:
-            return 0
+def parsear_fuentes(texto):
+    """Convierte "0, 1, video.mp4" en [0, 1, 'video.mp4'] (ver captura.crear_fuente)"""
+    fuentes = []
+    for parte in texto.split(','):
+        parte = parte.strip()
+        if parte:
+            fuentes.append(int(parte) if parte.isdigit() else parte)
+    return fuentes or [0]
+
+class EstadoFlujo:
+    """Estado de confirmación y estadísticas propias de una fuente de video"""
+    def __init__(self, indice, fuente, edad_max_reutilizar=None):
+        self.indice = indice
+        self.fuente = fuente
+        self.nombre = str(fuente)
+        self.captura = None
+        self.version = 0
+        # Canal de resultados: la UI solo lee el último frame anotado publicado
+        self.resultados = RanuraUltimoValor()
+        # Dibuja en RGB sobre búferes reutilizados (sin plot() ni cvtColor extra)
+        self.renderizador = RenderizadorAnotaciones()
         
-        total_confianza = sum(d['confianza'] for d in detector.detecciones_confirmadas)
-        return total_confianza / len(detector.detecciones_confirmadas)
-    
-    def _generar_graficas_pdf(self, detector, story):
-        """Genera múltiples gráficas para incluir en el PDF"""
-        try:
-            # Configurar matplotlib para PDF
-            plt.style.use('default')
-            sns.set_palette("husl")
-            
-            # Preparar datos
-            df_stats = pd.DataFrame(list(detector.estadisticas.items()), columns=['Instrumento', 'Cantidad'])
-            df_detecciones = pd.DataFrame(detector.detecciones_confirmadas)
-            
-            # Crear figura con múltiples subplots
-            fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 10))
-            fig.suptitle('Análisis Gráfico de Detecciones', fontsize=16, fontweight='bold')
-            
-            # 1. Gráfica de barras
-            colors_bars = ['#2B5B84', '#4FC3D7', '#1A4A6B', '#27AE60', '#F39C12']
-            bars = ax1.bar(df_stats['Instrumento'], df_stats['Cantidad'], 
-                          color=colors_bars[:len(df_stats)])
-            ax1.set_title('Detecciones por Instrumento', fontweight='bold')
-            ax1.set_xlabel('Instrumentos')
-            ax1.set_ylabel('Cantidad')
-            ax1.tick_params(axis='x', rotation=45)
-            
-            # Agregar valores en las barras
-            for bar in bars:
-                height = bar.get_height()
-                ax1.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{int(height)}', ha='center', va='bottom')
-            
-            # 2. Gráfica de pie
-            ax2.pie(df_stats['Cantidad'], labels=df_stats['Instrumento'], autopct='%1.1f%%',
-                   colors=colors_bars[:len(df_stats)], startangle=90)
-            ax2.set_title('Distribución Porcentual', fontweight='bold')
-            
-            # 3. Línea de tiempo (agrupada por minutos)
-            if len(df_detecciones) > 1:
-                df_detecciones['minuto'] = df_detecciones['timestamp'].dt.floor('min')
-                conteo_temporal = df_detecciones.groupby('minuto').size()
-                ax3.plot(conteo_temporal.index, conteo_temporal.values, 
-                        marker='o', linewidth=2, markersize=6, color='#2B5B84')
-                ax3.set_title('Detecciones en el Tiempo', fontweight='bold')
-                ax3.set_xlabel('Tiempo')
-                ax3.set_ylabel('Detecciones por Minuto')
-                ax3.tick_params(axis='x', rotation=45)
-            else:
-                ax3.text(0.5, 0.5, 'Datos insuficientes\npara gráfica temporal', 
-                        ha='center', va='center', transform=ax3.transAxes)
-                ax3.set_title('Detecciones en el Tiempo')
-            
-            # 4. Gráfica de confianza
-            confianzas = [d['confianza'] for d in detector.detecciones_confirmadas]
-            if confianzas:
-                ax4.hist(confianzas, bins=10, color='#4FC3D7', alpha=0.7, edgecolor='black')
-                ax4.axvline(np.mean(confianzas), color='red', linestyle='--', 
-                           label=f'Promedio: {np.mean(confianzas):.2%}')
-                ax4.set_title('Distribución de Confianza', fontweight='bold')
-                ax4.set_xlabel('Nivel de Confianza')
-                ax4.set_ylabel('Frecuencia')
-                ax4.legend()
-            else:
-                ax4.text(0.5, 0.5, 'Sin datos de confianza', 
-                        ha='center', va='center', transform=ax4.transAxes)
-            
-            plt.tight_layout()
-            
-            # Guardar gráfica como imagen temporal
-            temp_img = io.BytesIO()
-            plt.savefig(temp_img, format='png', dpi=150, bbox_inches='tight')
-            temp_img.seek(0)
-            plt.close()
-            
-            # Agregar imagen al PDF
-            img = Image(temp_img, width=7*inch, height=5.8*inch)
-            story.append(img)
-            story.append(Spacer(1, 20))
-            
-        except Exception as e:
-            story.append(Paragraph(f"Error generando gráficas: {str(e)}", getSampleStyleSheet()['Normal']))
+        # Una pista por instrumento, cada una con su contador de confirmación
+        self.seguidor = SeguidorMultiple()
+        self.frames_sin_detectar = 0
+        # Escena estática: se reutiliza el último resultado del modelo en lugar de inferir
+        self.cambio = DetectorCambio(edad_maxima=edad_max_reutilizar) if edad_max_reutilizar else None
+        self.ultimo_resultado = None
+        self.estadisticas = {}
+        self.total_detecciones = 0
+        self.ultima_confirmacion = None
+        # Última confirmación por clase: una pista perdida y recreada no vuelve a contar
+        self.ultima_por_clase = {}
+        self.frames_procesados = 0
+        self.version_transmitida = 0
+
+class CacheFiguras:
+    """
+    Figuras Plotly memorizadas por versión de datos de la sesión.
+    
+    Mientras no haya confirmaciones nuevas, cada rerun recibe la misma figura
+    sin reconstruirla; el costo de graficar sigue a las detecciones y no a la
+    frecuencia de refresco de la interfaz.
+    """
+    def __init__(self):
+        self._figuras = {}
+        self.construidas = 0
+        self.reutilizadas = 0
+    
+    def obtener(self, nombre, version, constructor, *args):
+        guardada = self._figuras.get(nombre)
+        if guardada is not None and guardada[0] == version:
+            self.reutilizadas += 1
+            return guardada[1]
+        figura = constructor(*args)
+        self._figuras[nombre] = (version, figura)
+        self.construidas += 1
+        return figura
+    
+    def limpiar(self):
+        self._figuras.clear()
 
 # Detector mejorado
 class MedSeenDentalDetector:
-    def __init__(self, model_path, confidence=0.5, umbral_tiempo=3):
+    def __init__(self, model_path, confidence=0.5, umbral_tiempo=3, backend='torch', fuentes=None,
+                 modo_replay=False, cronometro=None, ruta_metricas=None, anotar=True, ruta_diario=None,
+                 detectar_cada=1, fps_objetivo=None, cpu_objetivo=None, edad_max_reutilizar=None,
+                 roi=None, mosaico=None, resolucion_captura=(640, 480)):
         self.model_path = model_path
         self.confidence = confidence
         self.umbral_tiempo = umbral_tiempo
+        self.backend = backend
+        self.fuentes = list(fuentes) if fuentes else [0]
+        # Replay: las fuentes grabadas se procesan completas y sin ritmo de reloj
+        self.modo_replay = modo_replay
+        # El modelo corre 1 de cada N frames por fuente; en los demás se propagan las pistas
+        self.detectar_cada = max(1, int(detectar_cada))
+        # Región de la charola (fracciones del frame) y mosaico filas x columnas para alta resolución
+        self.roi = roi
+        self.mosaico = mosaico
+        self.resolucion_captura = resolucion_captura
+        # Segundos máximos que se reutilizan resultados en escena estática (None = inferir siempre)
+        self.edad_max_reutilizar = edad_max_reutilizar
+        # Con objetivo de FPS o CPU, imgsz y la zancada de detección se ajustan solos
+        if fps_objetivo or cpu_objetivo:
+            self.gobernador = GobernadorRendimiento(fps_objetivo, cpu_objetivo, zancada_min=self.detectar_cada)
+        else:
+            self.gobernador = None
+        # Contadores e histogramas en vivo; el cronómetro opcional recibe además las muestras crudas
+        self.metricas = MetricasPipeline(detalle=cronometro)
+        # Anotar el video; además se omite sola si la UI deja de leer frames
+        self.anotar = anotar
+        self._ultima_vista = time.monotonic()
+        # Identifica la sesión en las URLs de la transmisión MJPEG
+        self.clave_video = uuid.uuid4().hex[:12]
+        # Diario en disco: las confirmaciones sobreviven a recargas y caídas
+        # Su latido solo se renueva mientras alguna pestaña lee resultados de esta sesión
+        self.diario = DiarioSesion(ruta_diario, vivo=self._hay_interfaz) if ruta_diario else None
+        self.id_sesion = None
+        # Exportador compartido por el proceso: cada sesión aparece con su etiqueta sesion="<clave>"
+        self.exportador = obtener_exportador(ruta_metricas, INTERVALO_METRICAS_PROM) if ruta_metricas else None
         
         # Variables de control
-        self.clase_en_proceso = ""
-        self.tiempo_detectando = 0
-        self.detecciones_confirmadas = []
-        self.estadisticas = {}
-        self.log_detecciones = []
+        self.flujos = []
+        # Detecciones confirmadas en columnas NumPy (timestamp, clase, confianza, fuente)
+        self.almacen = AlmacenDetecciones(NOMBRES_CLASES.values())
+        # Agregados O(1) por confirmación: dashboard y PDF leen de aquí
+        self.estadisticas_sesion = EstadisticasSesion()
+        # Sube con cada confirmación: las figuras del dashboard se reconstruyen solo si cambia
+        self.version_datos = 0
+        self.figuras = CacheFiguras()
         self.inicio_sesion = None
         self.model = None
-        self.cap = None
         self.running = False
-        self.pdf_generator = PDFGenerator()
+        self.ultimo_error = None
+        self._hilo_deteccion = None
+        self._aviso_frames = threading.Event()
+        self.fin_fuentes = threading.Event()
         
+    @property
+    def detecciones_confirmadas(self):
+        """Vista perezosa de lista de diccionarios sobre el almacén columnar"""
+        return VistaDetecciones(self.almacen)
+    
+    @property
+    def log_detecciones(self):
+        """Líneas de log generadas bajo demanda desde el almacén"""
+        return VistaLog(self.almacen, con_fuente=len(self.flujos) > 1)
+    
+    @property
+    def estadisticas(self):
+        """Conteos por instrumento de la sesión (copia tomada bajo el lock; el worker sigue escribiendo)"""
+        return self.estadisticas_sesion.copia_conteos()
+    
     def cargar_modelo(self):
         try:
-            self.model = YOLO(self.model_path)
-            st.success("Modelo YOLO cargado correctamente")
+            # Modelo compartido por proceso: solo la primera sesión paga la carga
+            self.model = obtener_modelo(self.model_path, backend=self.backend, imgsz=640)
+            if self.roi or self.mosaico:
+                # Solo se infiere la charola, en una o varias ventanas por frame
+                self.model = InferenciaRegiones(self.model, roi=self.roi, mosaico=self.mosaico)
+            st.success(f"Modelo YOLO cargado correctamente ({DESCRIPCION_BACKENDS[self.backend]})")
             return True
         except Exception as e:
             st.error(f"Error cargando modelo: {e}")
@@ -575,25 +456,43 @@ class MedSeenDentalDetector:
     
     def iniciar_camara(self):
         try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                st.error("No se pudo acceder a la cámara")
-                return False
-            
-            # Configuración optimizada
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.cap.set(cv2.CAP_PROP_FPS, 30)
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.flujos = [EstadoFlujo(i, fuente, self.edad_max_reutilizar) for i, fuente in enumerate(self.fuentes)]
+            for flujo in self.flujos:
+                # Hilo dedicado por fuente que mantiene solo su frame más reciente
+                ancho, alto = self.resolucion_captura
+                captura = CapturaEnSegundoPlano(flujo.fuente, ancho=ancho, alto=alto, fps=30,
+                                                aviso=self._aviso_frames,
+                                                modo_replay=self.modo_replay,
+                                                cronometro=self.metricas)
+                flujo.nombre = captura.nombre
+                if not captura.iniciar():
+                    self._detener_capturas()
+                    st.error(f"No se pudo acceder a la fuente de video: {flujo.nombre}")
+                    return False
+                flujo.captura = captura
             
-            st.success("Cámara iniciada correctamente")
+            st.success(f"Cámara iniciada correctamente ({len(self.flujos)} fuente(s))")
             return True
             
         except Exception as e:
+            self._detener_capturas()
             st.error(f"Error con la cámara: {e}")
             return False
     
-    def iniciar_sesion(self):
+    def _detener_capturas(self):
+        for flujo in self.flujos:
+            if flujo.captura:
+                flujo.captura.detener()
+                flujo.captura = None
+    
+    def iniciar_sesion(self, reanudar=None):
+        """
+        Inicia la detección.
+        
+        Args:
+            reanudar (dict): Sesión interrumpida del diario (ver DiarioSesion.sesion_interrumpida)
+                cuyas detecciones se restauran antes de continuar
+        """
         if not self.cargar_modelo():
             return False
         
@@ -601,156 +500,318 @@ class MedSeenDentalDetector:
             return False
         
         # Reset completo
-        self.inicio_sesion = datetime.now()
-        self.detecciones_confirmadas = []
-        self.estadisticas = {}
-        self.log_detecciones = []
-        self.clase_en_proceso = ""
-        self.tiempo_detectando = 0
+        self.inicio_sesion = reanudar['inicio'] if reanudar else datetime.now()
+        self.almacen = AlmacenDetecciones(NOMBRES_CLASES.values())
+        self.estadisticas_sesion = EstadisticasSesion(self.inicio_sesion)
+        self.version_datos = 0
+        self.figuras.limpiar()
+        if self.diario:
+            self.diario.iniciar()
+            if reanudar:
+                self.id_sesion = self.diario.reclamar_sesion(reanudar['id'])
+                self._restaurar_desde_diario()
+            else:
+                self.id_sesion = self.diario.abrir_sesion(self.inicio_sesion, {
+                    'modelo': self.model_path, 'backend': self.backend, 'confianza': self.confidence,
+                    'umbral_tiempo': self.umbral_tiempo, 'fuentes': self.fuentes
+                })
+        self.fin_fuentes.clear()
         self.running = True
+        self._iniciar_worker()
+        if self.exportador:
+            self.exportador.registrar(self.clave_video, self.metricas)
         
         st.success("Sesión iniciada correctamente")
         return True
     
-    def capturar_y_procesar(self):
-        if not self.running or not self.cap or not self.model:
-            return None, None
+    def _restaurar_desde_diario(self):
+        """Carga las confirmaciones ya guardadas de la sesión que se reanuda"""
+        flujos = {flujo.nombre: flujo for flujo in self.flujos}
+        restauradas = 0
+        for timestamp, nombre, confianza, fuente in self.diario.detecciones(self.id_sesion):
+            self.almacen.agregar(nombre, confianza, timestamp, fuente)
+            self.estadisticas_sesion.registrar(nombre, confianza, timestamp)
+            flujo = flujos.get(fuente)
+            if flujo:
+                flujo.estadisticas[nombre] = flujo.estadisticas.get(nombre, 0) + 1
+                flujo.total_detecciones += 1
+            restauradas += 1
+        self.version_datos += restauradas
+        st.info(f"Sesión reanudada: {restauradas} detecciones restauradas")
+    
+    def _iniciar_worker(self):
+        self.ultimo_error = None
+        # La carga del modelo y de la cámara no cuenta como inactividad de la interfaz
+        self._ultima_vista = time.monotonic()
+        self._hilo_deteccion = threading.Thread(
+            target=self._bucle_deteccion, name="medseen-deteccion", daemon=True
+        )
+        self._hilo_deteccion.start()
+    
+    def _recolectar_lote(self):
+        """Toma el frame nuevo más reciente de cada fuente (las que no tienen uno se omiten)"""
+        lote = []
+        for flujo in self.flujos:
+            frame, timestamp, version = flujo.captura.leer_ultimo()
+            if frame is not None and version != flujo.version:
+                # Frames que la captura publicó y se sobrescribieron sin inferirse
+                if version - flujo.version > 1:
+                    self.metricas.incrementar('frames_descartados', version - flujo.version - 1)
+                flujo.version = version
+                flujo.captura.confirmar(version)
+                # Cuánto esperó el frame en la ranura antes de entrar a inferencia
+                self.metricas.registrar('edad_frame', time.time() - timestamp)
+                lote.append((flujo, frame))
+        return lote
+    
+    def procesar_pendientes(self):
+        """
+        Procesa en un solo lote los frames nuevos de todas las fuentes.
         
-        try:
-            # Limpiar buffer de la cámara para evitar lag
-            for _ in range(2):  # Descartar algunos frames viejos
-                ret, _ = self.cap.read()
-                if not ret:
-                    break
-            
-            # Capturar frame actual
-            ret, frame = self.cap.read()
-            if not ret:
-                # Reintentar captura
-                self.cap.release()
-                time.sleep(0.1)
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                ret, frame = self.cap.read()
-                if not ret:
-                    return None, None
-            
-            # Predicción YOLO
-            results = self.model.predict(source=frame, conf=self.confidence, verbose=False)
-            
-            info_actual = {
-                'detectando': False,
-                'instrumento': '',
-                'confianza': 0,
-                'progreso': f"0/{self.umbral_tiempo}"
-            }
-            
-            if results and hasattr(results[0], "boxes") and results[0].boxes is not None:
-                boxes = results[0].boxes
-                clases = results[0].names
-                
-                if boxes.conf is not None and len(boxes.conf) > 0:
-                    scores = boxes.conf.tolist()
-                    class_ids = boxes.cls.tolist()
-                    
-                    # Mejor detección
-                    max_idx = scores.index(max(scores))
-                    nombre = clases[int(class_ids[max_idx])]
-                    confianza = scores[max_idx]
-                    
-                    info_actual.update({
-                        'detectando': True,
-                        'instrumento': nombre,
-                        'confianza': confianza
-                    })
-                    
-                    # Lógica de confirmación
-                    if nombre == self.clase_en_proceso:
-                        self.tiempo_detectando += 1
-                    else:
-                        self.clase_en_proceso = nombre
-                        self.tiempo_detectando = 1
-                    
-                    info_actual['progreso'] = f"{self.tiempo_detectando}/{self.umbral_tiempo}"
-                    
-                    # Confirmar detección
-                    if self.tiempo_detectando >= self.umbral_tiempo:
-                        self._confirmar_deteccion(nombre, confianza)
-                        # Reducir tiempo pero no resetear completamente para mantener detección activa
-                        self.tiempo_detectando = max(1, self.umbral_tiempo - 2)
-            else:
-                self.clase_en_proceso = ""
-                self.tiempo_detectando = 0
+        Returns:
+            int: Número de frames procesados (0 si no había frames nuevos)
+        """
+        lote = self._recolectar_lote()
+        if lote:
+            self._procesar_lote(lote)
+        return len(lote)
+    
+    def fuentes_agotadas(self):
+        """True cuando todas las fuentes grabadas terminaron (las cámaras nunca se agotan)"""
+        return bool(self.flujos) and all(f.captura and f.captura.agotada for f in self.flujos)
+    
+    def _bucle_deteccion(self):
+        """Captura → predicción → confirmación al ritmo de la cámara, no de la UI"""
+        while self.running:
+            if self._huerfana():
+                self._abandonar_sesion()
+                break
             
-            annotated = results[0].plot() if results else frame
-            return annotated, info_actual
+            # Cualquier fuente que publique un frame despierta al worker
+            self._aviso_frames.wait(0.5)
+            self._aviso_frames.clear()
             
-        except Exception as e:
-            st.error(f"Error procesando frame: {e}")
-            # Intentar reiniciar cámara en caso de error
             try:
-                self.cap.release()
-                time.sleep(0.5)
-                self.cap = cv2.VideoCapture(0)
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            except:
-                pass
+                if self.procesar_pendientes():
+                    self.ultimo_error = None
+                elif self.fuentes_agotadas():
+                    self.fin_fuentes.set()
+            except Exception as e:
+                self.ultimo_error = str(e)
+    
+    def _procesar_lote(self, lote):
+        """
+        Una sola llamada batched a predecir para las fuentes a las que les toca
+        detector en este frame; las demás solo propagan sus pistas.
+        """
+        inicio = time.perf_counter()
+        zancada = self.gobernador.zancada if self.gobernador else self.detectar_cada
+        a_detectar = []
+        resultados = {}
+        reutilizados = set()
+        for flujo, frame in lote:
+            if flujo.frames_sin_detectar + 1 < zancada:
+                flujo.frames_sin_detectar += 1
+                continue
+            flujo.frames_sin_detectar = 0
+            if flujo.cambio is not None:
+                with self.metricas.medir('cambio_escena'):
+                    cambio = flujo.cambio.hay_cambio(frame)
+                if not cambio and flujo.ultimo_resultado is not None:
+                    # Escena sin cambios: las mismas cajas sobre el frame nuevo
+                    anterior = flujo.ultimo_resultado
+                    resultados[flujo.indice] = ResultadoDeteccion(anterior.xyxy, anterior.conf, anterior.cls,
+                                                                  anterior.names, frame)
+                    reutilizados.add(flujo.indice)
+                    self.metricas.incrementar('frames_reutilizados')
+                    continue
+            a_detectar.append((flujo, frame))
+        
+        segundos_detector = None
+        if a_detectar:
+            # Predicción YOLO con el backend seleccionado
+            imgsz = self.gobernador.imgsz if self.gobernador else None
+            inicio_detector = time.perf_counter()
+            predicciones = self.model.predecir([frame for _, frame in a_detectar], conf=self.confidence,
+                                               imgsz=imgsz, cronometro=self.metricas)
+            segundos_detector = time.perf_counter() - inicio_detector
+            self.metricas.incrementar('frames_inferidos', len(a_detectar))
+            for (flujo, frame), resultado in zip(a_detectar, predicciones):
+                resultados[flujo.indice] = resultado
+                flujo.ultimo_resultado = resultado
+                if flujo.cambio is not None:
+                    flujo.cambio.marcar_inferido()
+        
+        for flujo, frame in lote:
+            flujo.frames_procesados += 1
+            resultado = resultados.get(flujo.indice)
+            with self.metricas.medir('seguimiento'):
+                if resultado is not None:
+                    pistas = flujo.seguidor.actualizar(resultado, contar=flujo.indice not in reutilizados)
+                else:
+                    pistas = flujo.seguidor.propagar()
+                    resultado = flujo.seguidor.como_resultado(frame)
+                    self.metricas.incrementar('frames_propagados')
+            with self.metricas.medir('confirmacion'):
+                info_actual = self._procesar_resultado(flujo, pistas, resultado.names)
+            if self._hay_espectador():
+                with self.metricas.medir('anotacion'):
+                    annotated = flujo.renderizador.dibujar(resultado)
+            else:
+                annotated = None
+                self.metricas.incrementar('frames_sin_anotar')
+            flujo.resultados.publicar((annotated, info_actual))
+        
+        if self.gobernador and self.gobernador.registrar(time.perf_counter() - inicio, segundos_detector):
+            self.metricas.incrementar('ajustes_gobernador')
+    
+    def _hay_interfaz(self):
+        """Alguna pestaña leyó resultados hace poco (si no, la sesión quedó huérfana)"""
+        return time.monotonic() - self._ultima_vista < LATIDO_VENCIDO / 2
+    
+    def _huerfana(self):
+        return time.monotonic() - self._ultima_vista >= LATIDO_VENCIDO
+    
+    def _abandonar_sesion(self):
+        """
+        Ninguna pestaña atiende la sesión (p. ej. el navegador se recargó y el
+        detector quedó fuera de st.session_state): liberar la cámara y el resto
+        de recursos desde el propio worker. La sesión no se cierra en el diario:
+        queda como interrumpida para reanudarla desde la nueva pestaña.
+        """
+        self.running = False
+        self._detener_capturas()
+        retirar_sesion(self.clave_video)
+        if self.exportador:
+            self.exportador.retirar(self.clave_video)
+        if self.diario:
+            self.diario.detener()
+        self.ultimo_error = f"Sesión detenida: ninguna pestaña la atendió en {LATIDO_VENCIDO:.0f} s"
+    
+    def _hay_espectador(self):
+        return self.anotar and time.monotonic() - self._ultima_vista < ESPERA_SIN_ESPECTADOR
+    
+    def capturar_y_procesar(self, indice=0):
+        """Devuelve el último frame anotado y su info publicados por el worker (no bloquea)"""
+        if not self.running or indice >= len(self.flujos):
+            return None, None
+        
+        # Cada lectura de la UI indica que alguien está viendo el video
+        self._ultima_vista = time.monotonic()
+        
+        resultado, _, _ = self.flujos[indice].resultados.obtener()
+        if resultado is None:
             return None, None
+        return resultado
     
-    def _confirmar_deteccion(self, nombre, confianza):
-        timestamp = datetime.now()
+    def frame_para_transmision(self, indice):
+        """Proveedor del servidor MJPEG: (frame RGB anotado, versión) sin bloquear"""
+        if not self.running or indice >= len(self.flujos):
+            return None, 0
         
-        # Evitar duplicados cercanos
-        if (not self.detecciones_confirmadas or 
-            (timestamp - self.detecciones_confirmadas[-1]['timestamp']).total_seconds() > 2):
-            
-            deteccion = {
+        self._ultima_vista = time.monotonic()
+        flujo = self.flujos[indice]
+        resultado, _, version = flujo.resultados.obtener()
+        if resultado is None:
+            return None, version
+        if version != flujo.version_transmitida:
+            flujo.version_transmitida = version
+            self.metricas.incrementar('frames_mostrados')
+        return resultado[0], version
+    
+    def _procesar_resultado(self, flujo, pistas, clases):
+        """Lógica de confirmación de una fuente: cada pista activa lleva su propio contador"""
+        info_actual = {
+            'detectando': False,
+            'instrumento': '',
+            'confianza': 0,
+            'progreso': f"0/{self.umbral_tiempo}",
+            'pistas': []
+        }
+        
+        for pista in pistas:
+            nombre = clases.get(pista.clase, str(pista.clase))
+            info_actual['pistas'].append({
                 'instrumento': nombre,
-                'confianza': confianza,
-                'tiempo': timestamp.strftime("%H:%M:%S"),
-                'timestamp': timestamp
-            }
+                'confianza': pista.confianza,
+                'progreso': f"{min(pista.aciertos, self.umbral_tiempo)}/{self.umbral_tiempo}"
+            })
             
-            self.detecciones_confirmadas.append(deteccion)
+            # Confirmar detección
+            if pista.aciertos >= self.umbral_tiempo:
+                self._confirmar_deteccion(nombre, pista.confianza, flujo, pista)
+                # Reducir tiempo pero no resetear completamente para mantener detección activa
+                pista.aciertos = max(1, self.umbral_tiempo - 2)
+        
+        if info_actual['pistas']:
+            # El encabezado muestra la pista de mayor confianza
+            mejor = max(info_actual['pistas'], key=lambda p: p['confianza'])
+            info_actual.update(mejor, detectando=True)
+        
+        return info_actual
+    
+    def _confirmar_deteccion(self, nombre, confianza, flujo, pista=None):
+        timestamp = datetime.now()
+        # Sin pista (p. ej. llamadas externas) se deduplica por fuente como antes
+        origen = pista or flujo
+        anteriores = (origen.ultima_confirmacion, flujo.ultima_por_clase.get(nombre))
+        
+        # Evitar duplicados cercanos del mismo instrumento seguido (o de su pista recreada)
+        if all(previa is None or (timestamp - previa).total_seconds() > 2 for previa in anteriores):
             
-            if nombre not in self.estadisticas:
-                self.estadisticas[nombre] = 0
-            self.estadisticas[nombre] += 1
+            origen.ultima_confirmacion = timestamp
+            flujo.ultima_por_clase[nombre] = timestamp
+            self.almacen.agregar(nombre, confianza, timestamp, flujo.nombre)
+            if self.diario:
+                # Solo encola: la escritura por lotes ocurre en el hilo del diario
+                self.diario.registrar(self.id_sesion, nombre, confianza, timestamp, flujo.nombre)
+            self.metricas.incrementar('detecciones_confirmadas')
             
-            self.log_detecciones.append(f"{nombre} ({confianza:.1%}) - {timestamp.strftime('%H:%M:%S')}")
+            self.estadisticas_sesion.registrar(nombre, confianza, timestamp)
+            
+            flujo.estadisticas[nombre] = flujo.estadisticas.get(nombre, 0) + 1
+            flujo.total_detecciones += 1
+            self.version_datos += 1
         
-        # NO resetear la clase en proceso aquí para evitar que se pare
-        # self.tiempo_detectando = 0  # REMOVIDO - esto hacía que se parara
     
-    def detener_sesion(self):
+    def detener_sesion(self, registro_completo=False):
         self.running = False
-        if self.cap:
-            self.cap.release()
+        self._aviso_frames.set()
+        if self._hilo_deteccion:
+            self._hilo_deteccion.join(timeout=2.0)
+            self._hilo_deteccion = None
+        self._detener_capturas()
+        if self.exportador:
+            self.exportador.retirar(self.clave_video)
+        if self.diario and self.id_sesion:
+            # El escritor pudo haberse detenido si el worker abandonó la sesión por inactividad
+            self.diario.iniciar()
+            self.diario.cerrar_sesion(self.id_sesion)
+            self.diario.detener()
         cv2.destroyAllWindows()
         
-        # Generar PDF automáticamente
+        # Generar PDF automáticamente (en segundo plano)
         if self.detecciones_confirmadas:
-            return self.generar_pdf_sesion()
+            return self.generar_pdf_sesion(registro_completo)
         
         st.success("Sesión terminada")
         return None
     
-    def generar_pdf_sesion(self):
+    def generar_pdf_sesion(self, registro_completo=False):
+        """
+        Envía el reporte al pool de procesos y devuelve su TrabajoReporte (no bloquea).
+        
+        Con registro_completo el PDF incluye todas las detecciones, leídas por
+        páginas del diario (o del almacén), y se guarda en disco en RUTA_REPORTES.
+        """
         try:
-            pdf_buffer = self.pdf_generator.generar_reporte(self)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"reporte_dental_{timestamp}.pdf"
             
-            return pdf_buffer, filename
+            return enviar_reporte(InstantaneaSesion.desde(self, registro_completo), filename)
         except Exception as e:
             st.error(f"Error generando PDF: {e}")
-            return None, None
+            return None
 
 def crear_grafica_barras(df_stats):
     """Crea gráfica de barras minimalista"""
@@ -808,21 +869,19 @@ def crear_grafica_pie(df_stats):
     
     return fig
 
-def crear_grafica_area(detecciones):
+def crear_grafica_area(sesion):
     """Crea gráfica de área de detecciones acumuladas"""
-    if not detecciones:
+    if not sesion.total:
         return None
     
-    df_tiempo = pd.DataFrame(detecciones)
-    df_tiempo['minuto'] = df_tiempo['timestamp'].dt.strftime('%H:%M')
-    conteo_por_minuto = df_tiempo.groupby('minuto').size().reset_index(name='detecciones')
-    conteo_por_minuto['acumulado'] = conteo_por_minuto['detecciones'].cumsum()
+    cubetas, conteos, _ = sesion.serie()
     
     fig = go.Figure()
     
+    # Eje de fechas: ordena bien aunque la sesión cruce la medianoche
     fig.add_trace(go.Scatter(
-        x=conteo_por_minuto['minuto'],
-        y=conteo_por_minuto['acumulado'],
+        x=cubetas,
+        y=np.cumsum(conteos),
         fill='tozeroy',
         mode='lines',
         line=dict(color=COLORS['secondary'], width=2),
@@ -849,26 +908,21 @@ def crear_grafica_area(detecciones):
     
     return fig
 
-def crear_mapa_calor(detecciones):
+def crear_mapa_calor(sesion):
     """Crea mapa de calor de detecciones por hora y instrumento"""
-    if not detecciones or len(detecciones) < 3:
+    if sesion.total < 3:
         return None
     
-    df = pd.DataFrame(detecciones)
-    df['hora'] = df['timestamp'].dt.hour
-    df['minuto'] = df['timestamp'].dt.minute
-    df['periodo'] = df['hora'].astype(str) + ':' + (df['minuto'] // 10 * 10).astype(str).str.zfill(2)
+    # Matriz instrumento x periodo, con periodos según la duración de la sesión
+    instrumentos, periodos, matriz, resolucion = sesion.matriz_clase()
     
-    # Crear matriz de calor
-    heatmap_data = df.groupby(['instrumento', 'periodo']).size().unstack(fill_value=0)
-    
-    if heatmap_data.empty:
+    if matriz.size == 0:
         return None
     
     fig = go.Figure(data=go.Heatmap(
-        z=heatmap_data.values,
-        x=heatmap_data.columns,
-        y=heatmap_data.index,
+        z=matriz,
+        x=periodos,
+        y=instrumentos,
         colorscale=[
             [0, COLORS['white']],
             [0.5, COLORS['light']],
@@ -883,7 +937,7 @@ def crear_mapa_calor(detecciones):
             'x': 0.5,
             'font': {'color': COLORS['primary'], 'size': 16}
         },
-        xaxis_title="Período (Hora:Minuto)",
+        xaxis_title=f"Período ({NOMBRES_RESOLUCION[resolucion]})",
         yaxis_title="Instrumento",
         plot_bgcolor='white',
         paper_bgcolor='white',
@@ -933,24 +987,26 @@ def crear_grafica_radar(df_stats):
     
     return fig
 
-def crear_grafica_confianza(detecciones):
+def crear_grafica_confianza(sesion):
     """Crea gráfica de distribución de confianza"""
-    if not detecciones:
+    if not sesion.total:
         return None
     
-    confianzas = [d['confianza'] for d in detecciones]
+    # Histograma ya acumulado durante la sesión
+    centros, cuentas = sesion.histograma()
     
     fig = go.Figure()
     
-    fig.add_trace(go.Histogram(
-        x=confianzas,
-        nbinsx=10,
+    fig.add_trace(go.Bar(
+        x=centros,
+        y=cuentas,
+        width=1 / len(centros),
         marker_color=COLORS['secondary'],
         opacity=0.7
     ))
     
     # Agregar línea de promedio
-    promedio = sum(confianzas) / len(confianzas)
+    promedio = sesion.confianza_promedio
     fig.add_vline(x=promedio, line_dash="dash", line_color=COLORS['error'],
                   annotation_text=f"Promedio: {promedio:.1%}")
     
@@ -976,20 +1032,21 @@ def crear_grafica_confianza(detecciones):
 
 def crear_dashboard_completo(detector):
     """Crea un dashboard completo con múltiples gráficas"""
-    if not detector.estadisticas:
+    sesion = detector.estadisticas_sesion
+    if not sesion.total:
         return None
     
     df_stats = pd.DataFrame(
-        list(detector.estadisticas.items()),
+        list(sesion.copia_conteos().items()),
         columns=['Instrumento', 'Cantidad']
     )
     
     # Crear subplots
-    fig = make_subplots(
+    fig = subplots.make_subplots(
         rows=2, cols=2,
         subplot_titles=('Barras', 'Línea Temporal', 'Distribución', 'Confianza'),
         specs=[[{"type": "bar"}, {"type": "scatter"}],
-               [{"type": "pie"}, {"type": "histogram"}]]
+               [{"type": "pie"}, {"type": "bar"}]]
     )
     
     # Gráfica de barras
@@ -1000,13 +1057,10 @@ def crear_dashboard_completo(detector):
     )
     
     # Línea temporal
-    if detector.detecciones_confirmadas:
-        df_tiempo = pd.DataFrame(detector.detecciones_confirmadas)
-        df_tiempo['minuto'] = df_tiempo['timestamp'].dt.strftime('%H:%M')
-        conteo_temporal = df_tiempo.groupby('minuto').size().reset_index(name='count')
-        
+    cubetas, conteos, _ = sesion.serie()
+    if cubetas:
         fig.add_trace(
-            go.Scatter(x=conteo_temporal['minuto'], y=conteo_temporal['count'],
+            go.Scatter(x=cubetas, y=conteos,
                       mode='lines+markers', line_color=COLORS['secondary'], name="Temporal"),
             row=1, col=2
         )
@@ -1018,10 +1072,10 @@ def crear_dashboard_completo(detector):
     )
     
     # Histograma de confianza
-    if detector.detecciones_confirmadas:
-        confianzas = [d['confianza'] for d in detector.detecciones_confirmadas]
+    centros, cuentas = sesion.histograma()
+    if sesion.total:
         fig.add_trace(
-            go.Histogram(x=confianzas, marker_color=COLORS['accent'], name="Confianza"),
+            go.Bar(x=centros, y=cuentas, width=1 / len(centros), marker_color=COLORS['accent'], name="Confianza"),
             row=2, col=2
         )
     
@@ -1215,6 +1269,85 @@ def mostrar_equipo_desarrollo():
 
     
 
+def mostrar_panel_rendimiento(detector):
+    """Panel colapsable con contadores, FPS y latencia por etapa del pipeline"""
+    with st.expander("⏱️ Rendimiento del Pipeline", expanded=False):
+        datos = detector.metricas.instantanea()
+        contadores = datos['contadores']
+        fps = datos['fps']
+        # Pasadas del detector que la escena estática resolvió sin inferencia
+        reutilizados = contadores.get('frames_reutilizados', 0)
+        pasadas = reutilizados + contadores.get('frames_inferidos', 0)
+        
+        col_f1, col_f2, col_f3 = st.columns(3)
+        with col_f1:
+            st.metric("FPS Captura", f"{fps.get('frames_capturados', 0):.1f}")
+        with col_f2:
+            st.metric("FPS Inferencia", f"{fps.get('frames_inferidos', 0):.1f}")
+        with col_f3:
+            st.metric("FPS Vista", f"{fps.get('frames_mostrados', 0):.1f}")
+        
+        st.markdown(
+            f"Capturados: **{contadores.get('frames_capturados', 0)}** • "
+            f"Inferidos: **{contadores.get('frames_inferidos', 0)}** • "
+            f"Propagados: **{contadores.get('frames_propagados', 0)}** • "
+            f"Reutilizados: **{reutilizados}** ({reutilizados / max(pasadas, 1):.0%} de las pasadas del detector) • "
+            f"Descartados: **{contadores.get('frames_descartados', 0)}** • "
+            f"Reconexiones: **{contadores.get('reconexiones', 0)}**"
+        )
+        
+        if detector.gobernador:
+            estado = detector.gobernador.estado()
+            st.markdown(
+                f"Punto de operación: **{estado['imgsz']} px**, detector 1 de cada **{estado['zancada']}** "
+                f"frames (escalón {estado['nivel'] + 1}/{estado['niveles']}) • "
+                f"Capacidad: **{estado['capacidad_fps']:.1f} FPS** • CPU: **{estado['uso_cpu']:.0%}** • "
+                f"Ajustes: **{estado['cambios']}**"
+            )
+        
+        if datos['etapas']:
+            tabla = pd.DataFrame.from_dict(datos['etapas'], orient='index')
+            tabla = tabla[['n', 'media_ms', 'p50_ms', 'p95_ms', 'p99_ms']].round(2)
+            tabla.columns = ['n', 'media', 'p50', 'p95', 'p99']
+            st.dataframe(tabla, use_container_width=True)
+            st.caption("Latencias en ms (p50/p95/p99 estimados por histograma)")
+        
+        if detector.exportador:
+            if detector.exportador.ultimo_error:
+                st.caption(f"⚠️ Métricas Prometheus: {detector.exportador.ultimo_error}")
+            else:
+                st.caption(f"Métricas Prometheus: {detector.exportador.ruta}")
+        
+        if CARGADOS:
+            cargas = " • ".join(f"{nombre} {segundos * 1000:.0f} ms" for nombre, segundos in CARGADOS.items())
+            st.caption(f"Dependencias cargadas al usarse: {cargas}")
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def leer_pdf(ruta, mtime_ns):
+    """Bytes del PDF en disco; mtime_ns en la clave: se relee solo si el archivo cambia"""
+    with open(ruta, "rb") as archivo:
+        return archivo.read()
+
+@st.fragment(run_every=1.0)
+def mostrar_trabajo_pdf():
+    """Estado del reporte en generación; al terminar lo pasa a la sección de descarga"""
+    trabajo = st.session_state.get('trabajo_pdf')
+    if trabajo is None:
+        return
+    
+    estado = trabajo.estado
+    if estado == 'listo':
+        st.session_state.pdf_data = trabajo.resultado()
+        st.session_state.pdf_filename = trabajo.nombre_archivo
+        del st.session_state.trabajo_pdf
+        st.rerun()
+    elif estado == 'error':
+        st.error(f"Error generando PDF: {trabajo.error()}")
+        del st.session_state.trabajo_pdf
+    else:
+        texto = "en cola" if estado == 'en_cola' else "generando"
+        st.info(f"Reporte PDF {texto}... ({trabajo.segundos:.0f} s)")
+
 def main():
     # Header con logo
     st.markdown(f"""
@@ -1260,30 +1393,139 @@ def main():
             
             model_path = "runs/detect/instrumentos_dentales_yolo_model5/weights/best.pt"
             confidence = st.slider("Nivel de Confianza", 0.1, 1.0, 0.5, 0.1)
-            umbral_tiempo = st.slider("Frames para Confirmar", 1, 10, 3)
+            umbral_tiempo = st.slider(
+                "Detecciones para Confirmar", 1, 10, 3,
+                help="Pasadas del modelo seguidas que deben ver al instrumento; los frames solo seguidos no cuentan"
+            )
+            detectar_cada = st.slider(
+                "Detectar cada N frames", 1, 10, 3,
+                help="El modelo corre 1 de cada N frames; en los intermedios las cajas se siguen sin inferencia"
+            )
+            ajuste_automatico = st.checkbox(
+                "Ajuste automático de rendimiento", value=False,
+                help="Baja o sube imgsz y la frecuencia de detección para sostener el objetivo en este equipo"
+            )
+            fps_objetivo = cpu_objetivo = None
+            if ajuste_automatico:
+                fps_objetivo = st.slider("FPS Objetivo", 5, 30, 15)
+                cpu_maximo = st.slider("CPU Máxima (%)", 0, 100, 0, 5, help="0 = sin límite de CPU")
+                cpu_objetivo = cpu_maximo / 100 if cpu_maximo else None
+            reutilizar_estatica = st.checkbox(
+                "Omitir inferencia en escena estática", value=True,
+                help="Si la charola no cambia se reutilizan las últimas detecciones en lugar de correr el modelo"
+            )
+            edad_max_reutilizar = None
+            if reutilizar_estatica:
+                edad_max_reutilizar = st.slider(
+                    "Refresco Forzado (s)", 0.5, 10.0, 2.0, 0.5,
+                    help="Edad máxima de los resultados reutilizados antes de volver a inferir"
+                )
+            roi_texto = st.text_input(
+                "Región de la Charola", "",
+                help="x1,y1,x2,y2 en fracciones del frame (ej. 0.2,0.1,0.9,0.8); vacío = frame completo"
+            )
+            mosaico_texto = st.selectbox(
+                "Mosaico de Alta Resolución", ["Sin mosaico", "2x2", "2x3", "3x3"],
+                help="Divide la captura en ventanas traslapadas que se infieren juntas; útil para instrumentos delgados"
+            )
+            resolucion_captura = (640, 480)
+            if mosaico_texto != "Sin mosaico":
+                resolucion_captura = st.selectbox(
+                    "Resolución de Captura", [(1280, 720), (1920, 1080), (640, 480)],
+                    format_func=lambda r: f"{r[0]}x{r[1]}"
+                )
+            try:
+                roi = parsear_roi(roi_texto)
+            except ValueError as e:
+                st.warning(f"{e}; se usará el frame completo")
+                roi = None
+            mosaico = parsear_mosaico("" if mosaico_texto == "Sin mosaico" else mosaico_texto)
+            backend = st.selectbox(
+                "Backend de Inferencia",
+                list(DESCRIPCION_BACKENDS),
+                format_func=DESCRIPCION_BACKENDS.get,
+                help="Los backends ONNX/OpenVINO/OpenCV exportan best.pt una sola vez y no usan PyTorch"
+            )
+            fuentes = parsear_fuentes(st.text_input(
+                "Fuentes de Video", "0",
+                help="Índices de cámara, rutas de video, directorios de imágenes o 'sintetica', separados por comas"
+            ))
+            modo_replay = st.checkbox(
+                "Replay a máxima velocidad",
+                help="Procesa videos o directorios completos sin ritmo de reloj ni frames descartados"
+            )
+            mostrar_video = st.checkbox(
+                "Mostrar video anotado", value=True,
+                help="Desactivarlo omite el dibujo de cajas; la detección y el registro continúan"
+            )
+            if st.session_state.detector:
+                st.session_state.detector.anotar = mostrar_video
+            
+            modo_video = st.radio(
+                "Entrega de Video", ["MJPEG", "st.image"], horizontal=True,
+                help="MJPEG transmite el video aparte, a su propio ritmo, sin reconstruir la página"
+            )
+            servidor_video = None
+            if modo_video == "MJPEG":
+                calidad_jpeg = st.slider("Calidad JPEG", 40, 95, 80, 5)
+                ancho_video = st.select_slider("Ancho de Visualización", [320, 480, 640, 960, 1280], value=640)
+                fps_video = st.slider("FPS de Transmisión", 5, 30, 15)
+                try:
+                    servidor_video = obtener_servidor()
+                except OSError as e:
+                    st.warning(f"No se pudo iniciar la transmisión MJPEG ({e}); se usará st.image")
             
             st.markdown("---")
             st.markdown(f"### <span style='color: {COLORS['text']}'>Controles</span>", unsafe_allow_html=True)
             
+            registro_completo = st.checkbox(
+                "PDF con registro completo", value=False,
+                help=f"Incluye todas las detecciones (auditoría); el reporte se guarda en {RUTA_REPORTES}/"
+            )
+            
             if not st.session_state.detection_active:
+                # Sesión que no terminó con FINALIZAR (recarga, caída o reinicio)
+                diario = DiarioSesion(RUTA_DIARIO)
+                pendiente = diario.sesion_interrumpida()
+                reanudar = False
+                if pendiente:
+                    st.warning(f"Sesión interrumpida del {pendiente['inicio'].strftime('%d/%m %H:%M')} "
+                               f"con {pendiente['detecciones']} detecciones")
+                    reanudar = st.checkbox("Reanudar al iniciar", value=True)
+                    if st.button("Generar PDF de la sesión interrumpida", use_container_width=True):
+                        sesion = diario.cargar_sesion(pendiente['id'])
+                        st.session_state.trabajo_pdf = enviar_reporte(
+                            InstantaneaSesion.desde(sesion, registro_completo),
+                            f"reporte_dental_{pendiente['inicio'].strftime('%Y%m%d_%H%M%S')}.pdf"
+                        )
+                        diario.descartar_sesion(pendiente['id'])
+                        st.rerun()
+                
                 if st.button("INICIAR DETECCIÓN", type="primary", use_container_width=True):
                     with st.spinner("Iniciando sistema..."):
-                        st.session_state.detector = MedSeenDentalDetector(model_path, confidence, umbral_tiempo)
+                        st.session_state.detector = MedSeenDentalDetector(
+                            model_path, confidence, umbral_tiempo, backend, fuentes, modo_replay,
+                            ruta_metricas=RUTA_METRICAS_PROM, anotar=mostrar_video, ruta_diario=RUTA_DIARIO,
+                            detectar_cada=detectar_cada, fps_objetivo=fps_objetivo, cpu_objetivo=cpu_objetivo,
+                            edad_max_reutilizar=edad_max_reutilizar, roi=roi, mosaico=mosaico,
+                            resolucion_captura=resolucion_captura
+                        )
+                        if pendiente and not reanudar:
+                            diario.descartar_sesion(pendiente['id'])
                         
-                        if st.session_state.detector.iniciar_sesion():
+                        if st.session_state.detector.iniciar_sesion(reanudar=pendiente if reanudar else None):
                             st.session_state.detection_active = True
                             time.sleep(1)
                             st.rerun()
             else:
                 if st.button("FINALIZAR SESIÓN", type="secondary", use_container_width=True):
                     if st.session_state.detector:
-                        # Generar PDF antes de detener
-                        pdf_data = st.session_state.detector.detener_sesion()
+                        retirar_sesion(st.session_state.detector.clave_video)
+                        # El PDF se genera en otro proceso; la descarga aparece al terminar
+                        trabajo = st.session_state.detector.detener_sesion(registro_completo)
                         
-                        if pdf_data:
-                            pdf_buffer, filename = pdf_data
-                            st.session_state.pdf_data = pdf_buffer.getvalue()
-                            st.session_state.pdf_filename = filename
+                        if trabajo:
+                            st.session_state.trabajo_pdf = trabajo
                     
                     st.session_state.detection_active = False
                     st.session_state.detector = None
@@ -1300,7 +1542,7 @@ def main():
                 col_s1, col_s2 = st.columns(2)
                 
                 with col_s1:
-                    st.metric("Detecciones", len(detector.detecciones_confirmadas))
+                    st.metric("Detecciones", detector.estadisticas_sesion.total)
                 with col_s2:
                     st.metric("Instrumentos", len(detector.estadisticas))
                 
@@ -1308,6 +1550,8 @@ def main():
                     duracion = datetime.now() - detector.inicio_sesion
                     st.metric("Tiempo Activo", str(duracion).split('.')[0])
                 
+                mostrar_panel_rendimiento(detector)
+                
                 # Log reciente
                 if detector.log_detecciones:
                     st.markdown(f"### <span style='color: {COLORS['text']}'>Actividad Reciente</span>", unsafe_allow_html=True)
@@ -1334,30 +1578,57 @@ def main():
             with col1:
                 st.markdown(f"### <span style='color: {COLORS['text']}'>Video en Tiempo Real</span>", unsafe_allow_html=True)
                 
-                frame, info = st.session_state.detector.capturar_y_procesar()
+                detector = st.session_state.detector
+                if servidor_video:
+                    # Calidad, ancho y FPS propios de esta sesión (no cambian las de otras pestañas)
+                    servidor_video.registrar(detector.clave_video, detector.frame_para_transmision,
+                                             calidad=calidad_jpeg, ancho=ancho_video, fps=fps_video)
                 
-                if frame is not None:
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                # Una vista por fuente de video; cada una con su propio progreso
+                for flujo in detector.flujos:
+                    frame, info = detector.capturar_y_procesar(flujo.indice)
                     
-                    if info and info['detectando']:
-                        caption = f"DETECTANDO: {info['instrumento']} ({info['confianza']:.1%}) - Progreso: {info['progreso']}"
-                    else:
-                        caption = "DETECCIÓN ACTIVA - Buscando instrumentos..."
+                    if len(detector.flujos) > 1:
+                        st.markdown(f"**{flujo.nombre}** • {flujo.total_detecciones} detecciones")
                     
-                    st.image(frame_rgb, caption=caption, use_container_width=True)
-                    
-                    # Info de detección actual
-                    if info and info['detectando']:
-                        st.markdown(f"""
-                        <div class="detection-info">
-                            <strong>{info['instrumento']}</strong><br/>
-                            Confianza: {info['confianza']:.1%} • Progreso: {info['progreso']}
-                        </div>
-                        """, unsafe_allow_html=True)
+                    if frame is not None:
+                        if info and info['detectando']:
+                            caption = f"DETECTANDO: {info['instrumento']} ({info['confianza']:.1%}) - Progreso: {info['progreso']}"
+                        else:
+                            caption = "DETECCIÓN ACTIVA - Buscando instrumentos..."
+                        
+                        if servidor_video:
+                            # El <img> es idéntico entre reruns: el navegador conserva la conexión
+                            url = servidor_video.url(detector.clave_video, flujo.indice)
+                            st.markdown(f'<img src="{url}" style="width: 100%; border-radius: 8px;" alt="{html.escape(flujo.nombre)}"/>',
+                                        unsafe_allow_html=True)
+                            st.caption(caption)
+                        else:
+                            with detector.metricas.medir('visualizacion'):
+                                # El renderizador ya entrega el frame en RGB: sin cvtColor
+                                st.image(frame, caption=caption, use_container_width=True)
+                            detector.metricas.incrementar('frames_mostrados')
+                        
+                        # Info de detección actual
+                        if info and info['detectando']:
+                            # Una línea por instrumento seguido, cada uno con su progreso
+                            lineas = "<br/>".join(
+                                f"<strong>{p['instrumento']}</strong> • Confianza: {p['confianza']:.1%} • Progreso: {p['progreso']}"
+                                for p in info['pistas']
+                            )
+                            st.markdown(f"""
+                            <div class="detection-info">
+                                {lineas}
+                            </div>
+                            """, unsafe_allow_html=True)
+                        else:
+                            st.info("Buscando instrumentos dentales...")
+                    elif detector.ultimo_error:
+                        st.error(f"Error procesando frame: {detector.ultimo_error}")
+                    elif not detector.anotar:
+                        st.info("Vista de video desactivada (la detección sigue activa)")
                     else:
-                        st.info("Buscando instrumentos dentales...")
-                else:
-                    st.error("Error capturando video")
+                        st.info("Esperando el primer frame de la cámara...")
             
             with col2:
                 
@@ -1368,7 +1639,7 @@ def main():
                 with col_m1:
                     st.markdown(f"""
                     <div class="metric-card">
-                        <div class="metric-value">{len(detector.detecciones_confirmadas)}</div>
+                        <div class="metric-value">{detector.estadisticas_sesion.total}</div>
                         <div class="metric-label">Total</div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -1382,9 +1653,7 @@ def main():
                     """, unsafe_allow_html=True)
                 
                 with col_m3:
-                    confianza_prom = 0
-                    if detector.detecciones_confirmadas:
-                        confianza_prom = sum(d['confianza'] for d in detector.detecciones_confirmadas) / len(detector.detecciones_confirmadas)
+                    confianza_prom = detector.estadisticas_sesion.confianza_promedio
                     
                     st.markdown(f"""
                     <div class="metric-card">
@@ -1394,57 +1663,61 @@ def main():
                     """, unsafe_allow_html=True)
                 
                 # Múltiples gráficas
-                if detector.estadisticas:
-                    df_stats = pd.DataFrame(
-                        list(detector.estadisticas.items()),
-                        columns=['Instrumento', 'Cantidad']
-                    )
+                sesion = detector.estadisticas_sesion
+                if sesion.total:
+                    # Leer la versión antes que los datos: si llega una confirmación
+                    # mientras se construye, el siguiente rerun la reconstruye
+                    version = detector.version_datos
+                    figuras = detector.figuras
+                    conteos = sesion.copia_conteos()
+                    df_stats = pd.DataFrame(list(conteos.items()), columns=['Instrumento', 'Cantidad'])
                     
                     # Dashboard completo
                     st.markdown("#### Dashboard Completo")
-                    fig_dashboard = crear_dashboard_completo(detector)
+                    fig_dashboard = figuras.obtener('dashboard', version, crear_dashboard_completo, detector)
                     if fig_dashboard:
                         st.plotly_chart(fig_dashboard, use_container_width=True)
                     
-                    # Gráficas individuales en tabs
-                    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Barras", "🥧 Pie", "📈 Área", "🔥 Calor", "🎯 Radar"])
+                    # Gráficas individuales: solo se construye la que está seleccionada
+                    grafica = st.radio("Gráfica", ["📊 Barras", "🥧 Pie", "📈 Área", "🔥 Calor", "🎯 Radar"],
+                                       horizontal=True, label_visibility="collapsed", key="grafica_individual")
                     
-                    with tab1:
-                        fig_barras = crear_grafica_barras(df_stats)
+                    if grafica == "📊 Barras":
+                        fig_barras = figuras.obtener('barras', version, crear_grafica_barras, df_stats)
                         st.plotly_chart(fig_barras, use_container_width=True)
                     
-                    with tab2:
-                        fig_pie = crear_grafica_pie(df_stats)
+                    elif grafica == "🥧 Pie":
+                        fig_pie = figuras.obtener('pie', version, crear_grafica_pie, df_stats)
                         st.plotly_chart(fig_pie, use_container_width=True)
                     
-                    with tab3:
-                        if len(detector.detecciones_confirmadas) > 2:
-                            fig_area = crear_grafica_area(detector.detecciones_confirmadas)
+                    elif grafica == "📈 Área":
+                        if sesion.total > 2:
+                            fig_area = figuras.obtener('area', version, crear_grafica_area, sesion)
                             if fig_area:
                                 st.plotly_chart(fig_area, use_container_width=True)
                         else:
                             st.info("Se necesitan más detecciones para la gráfica de área")
                     
-                    with tab4:
-                        if len(detector.detecciones_confirmadas) > 3:
-                            fig_calor = crear_mapa_calor(detector.detecciones_confirmadas)
+                    elif grafica == "🔥 Calor":
+                        if sesion.total > 3:
+                            fig_calor = figuras.obtener('calor', version, crear_mapa_calor, sesion)
                             if fig_calor:
                                 st.plotly_chart(fig_calor, use_container_width=True)
                         else:
                             st.info("Se necesitan más detecciones para el mapa de calor")
                     
-                    with tab5:
+                    else:
                         if len(df_stats) >= 3:
-                            fig_radar = crear_grafica_radar(df_stats)
+                            fig_radar = figuras.obtener('radar', version, crear_grafica_radar, df_stats)
                             if fig_radar:
                                 st.plotly_chart(fig_radar, use_container_width=True)
                         else:
                             st.info("Se necesitan al menos 3 instrumentos para el radar")
                     
                     # Gráfica de confianza adicional
-                    if detector.detecciones_confirmadas:
+                    if sesion.total:
                         st.markdown("#### Análisis de Confianza")
-                        fig_confianza = crear_grafica_confianza(detector.detecciones_confirmadas)
+                        fig_confianza = figuras.obtener('confianza', version, crear_grafica_confianza, sesion)
                         if fig_confianza:
                             st.plotly_chart(fig_confianza, use_container_width=True)
                 else:
@@ -1459,12 +1732,9 @@ def main():
                 else:
                     st.info("Sin actividad registrada")
             
-            # Auto-refresh con control de estabilidad
-            if st.session_state.detection_active:
-                # Refresh más lento cuando hay detección activa para mayor estabilidad
-                time.sleep(0.5)
-            else:
-                time.sleep(0.1)
+            # Auto-refresh: la detección corre en su propio hilo, la UI solo
+            # consulta el canal de resultados a este intervalo
+            time.sleep(INTERVALO_REFRESCO_MJPEG if servidor_video else INTERVALO_REFRESCO_UI)
             st.rerun()
         
         else:
@@ -1510,6 +1780,10 @@ def main():
             for i, instruccion in enumerate(instrucciones, 1):
                 st.markdown(f"<span style='color: {COLORS['text']}'><strong>{i}.</strong> {instruccion}</span>", unsafe_allow_html=True)
         
+        # Reporte en generación: se consulta sin bloquear la interfaz
+        if st.session_state.get('trabajo_pdf'):
+            mostrar_trabajo_pdf()
+        
         # Descarga de PDF si está disponible
         if hasattr(st.session_state, 'pdf_data') and st.session_state.pdf_data:
             st.markdown("---")
@@ -1520,9 +1794,15 @@ def main():
             with col_pdf2:
                 st.success("Reporte PDF generado exitosamente")
                 
+                datos_pdf = st.session_state.pdf_data
+                if isinstance(datos_pdf, str):
+                    # Reporte con registro completo: quedó en disco; se lee una vez, no en cada rerun
+                    st.caption(f"Guardado en {datos_pdf}")
+                    datos_pdf = leer_pdf(datos_pdf, os.stat(datos_pdf).st_mtime_ns)
+                
                 st.download_button(
                     label="DESCARGAR REPORTE PDF",
-                    data=st.session_state.pdf_data,
+                    data=datos_pdf,
                     file_name=st.session_state.pdf_filename,
                     mime="application/pdf",
                     type="primary",
@@ -0,0 +1,437 @@
+"""
+Medición de Etapas del Pipeline de MedSeen
+
+Descripción:
+Este módulo provee cronómetros de bajo costo para medir cuánto tiempo
+consume cada etapa del pipeline de detección (captura, preproceso,
+inferencia, postproceso, anotación, conversión de color y visualización),
+además de utilidades para resumir las muestras en percentiles y obtener el
+pico de memoria del proceso.
+
+Cuando no se necesita medir se usa CronometroNulo, cuyo costo es
+prácticamente cero, de modo que la ruta caliente no paga por la medición.
+
+Para sesiones en vivo, MetricasPipeline mantiene contadores, FPS móviles e
+histogramas de latencia de memoria acotada, que se muestran en la barra
+lateral y se exportan periódicamente en formato de texto de Prometheus
+(textfile collector de node_exporter). Un solo exportador por proceso
+escribe las métricas de todas las sesiones activas en el mismo archivo,
+cada serie con la etiqueta sesion="<clave>".
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: medicion.py
+
+Requisitos:
+- numpy
+- psutil (solo en sistemas sin el módulo resource)
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Orden en el que se reportan las etapas conocidas
+ETAPAS = (
+    'captura', 'edad_frame', 'cambio_escena', 'preproceso', 'inferencia', 'postproceso',
+    'seguimiento', 'confirmacion', 'anotacion', 'conversion_color', 'visualizacion'
+)
+
+
+class CronometroNulo:
+    """Cronómetro que no mide nada (costo prácticamente nulo)"""
+
+    activo = False
+
+    def medir(self, etapa):
+        return nullcontext()
+
+    def registrar(self, etapa, segundos):
+        pass
+
+    def incrementar(self, contador, n=1):
+        pass
+
+
+class CronometroEtapas:
+    """
+    Acumula muestras de duración por etapa.
+
+    Es seguro usarlo desde varios hilos: list.append es atómico en CPython.
+    """
+
+    activo = True
+
+    def __init__(self):
+        self.muestras = defaultdict(list)
+        self.contadores = defaultdict(int)
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.muestras[etapa].append(time.perf_counter() - inicio)
+
+    def registrar(self, etapa, segundos):
+        """Agrega una duración medida externamente (en segundos)"""
+        self.muestras[etapa].append(segundos)
+
+    def incrementar(self, contador, n=1):
+        self.contadores[contador] += n
+
+    def reiniciar(self):
+        self.muestras = defaultdict(list)
+        self.contadores = defaultdict(int)
+
+    def resumen(self):
+        """
+        Resume las muestras de cada etapa.
+
+        Returns:
+            dict: etapa -> {n, media_ms, p50_ms, p95_ms, p99_ms, max_ms}
+        """
+        orden = [e for e in ETAPAS if e in self.muestras]
+        orden += sorted(e for e in self.muestras if e not in ETAPAS)
+        return {etapa: resumir_muestras(self.muestras[etapa]) for etapa in orden}
+
+
+def resumir_muestras(muestras):
+    """Estadísticas en milisegundos de una lista de duraciones en segundos"""
+    if not muestras:
+        return {'n': 0, 'media_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    ms = np.asarray(muestras, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'n': int(ms.size),
+        'media_ms': float(ms.mean()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(ms.max())
+    }
+
+
+def memoria_pico_mb():
+    """Pico de memoria residente (RSS) del proceso en MB"""
+    try:
+        import resource
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB; macOS reporta bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+
+
+# Límites (segundos) de los histogramas de latencia, estilo Prometheus
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class HistogramaLatencia:
+    """Histograma de cubetas fijas: memoria constante sin importar la duración de la sesión"""
+
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.n = 0
+
+    def observar(self, segundos):
+        self.cuentas[bisect.bisect_left(self.limites, segundos)] += 1
+        self.suma += segundos
+        self.n += 1
+
+    def cuantil(self, q):
+        """Estimación del cuantil q (0-1) interpolando dentro de la cubeta, como histogram_quantile"""
+        if self.n == 0:
+            return 0.0
+        objetivo = q * self.n
+        acumulado = 0
+        for i, cuenta in enumerate(self.cuentas):
+            if acumulado + cuenta >= objetivo and cuenta:
+                inferior = self.limites[i - 1] if i > 0 else 0.0
+                if i == len(self.limites):
+                    return inferior
+                return inferior + (self.limites[i] - inferior) * (objetivo - acumulado) / cuenta
+            acumulado += cuenta
+        return self.limites[-1]
+
+
+class TasaMovil:
+    """Eventos por segundo en una ventana deslizante de tiempo"""
+
+    def __init__(self, ventana=5.0):
+        self.ventana = ventana
+        self._eventos = deque()
+        self._creada = time.monotonic()
+
+    def marcar(self, n=1, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        self._eventos.append((ahora, n))
+        self._recortar(ahora)
+
+    def _recortar(self, ahora):
+        limite = ahora - self.ventana
+        while self._eventos and self._eventos[0][0] < limite:
+            self._eventos.popleft()
+
+    def valor(self, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        self._recortar(ahora)
+        if not self._eventos:
+            return 0.0
+        # Al inicio de la sesión la ventana aún no se ha llenado
+        duracion = min(self.ventana, max(ahora - self._creada, 1e-3))
+        return sum(n for _, n in self._eventos) / duracion
+
+
+class MetricasPipeline:
+    """
+    Métricas en vivo del pipeline, compatibles con la interfaz de los cronómetros.
+
+    Attributes:
+        contadores (dict): frames_capturados, frames_descartados, frames_inferidos,
+            reconexiones, detecciones_confirmadas, ...
+        histogramas (dict): etapa -> HistogramaLatencia
+        detalle: Cronómetro opcional que además recibe cada muestra cruda
+            (por ejemplo CronometroEtapas en el benchmark)
+    """
+
+    activo = True
+
+    def __init__(self, detalle=None, ventana_fps=5.0):
+        self.detalle = detalle or CronometroNulo()
+        self.ventana_fps = ventana_fps
+        self.inicio = time.time()
+        self.contadores = defaultdict(int)
+        self.histogramas = {}
+        self._tasas = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    def registrar(self, etapa, segundos):
+        with self._lock:
+            histograma = self.histogramas.get(etapa)
+            if histograma is None:
+                histograma = self.histogramas[etapa] = HistogramaLatencia()
+            histograma.observar(segundos)
+        self.detalle.registrar(etapa, segundos)
+
+    def incrementar(self, contador, n=1):
+        with self._lock:
+            self.contadores[contador] += n
+            tasa = self._tasas.get(contador)
+            if tasa is None:
+                tasa = self._tasas[contador] = TasaMovil(self.ventana_fps)
+            tasa.marcar(n)
+        self.detalle.incrementar(contador, n)
+
+    def fps(self, contador='frames_inferidos'):
+        """Tasa móvil (eventos/s) de un contador"""
+        with self._lock:
+            tasa = self._tasas.get(contador)
+            return tasa.valor() if tasa else 0.0
+
+    def instantanea(self):
+        """
+        Copia consistente de las métricas para mostrarlas.
+
+        Returns:
+            dict: contadores, fps (por contador) y etapas
+            (etapa -> {n, media_ms, p50_ms, p95_ms, p99_ms})
+        """
+        with self._lock:
+            contadores = dict(self.contadores)
+            fps = {c: t.valor() for c, t in self._tasas.items()}
+            orden = [e for e in ETAPAS if e in self.histogramas]
+            orden += sorted(e for e in self.histogramas if e not in ETAPAS)
+            etapas = {}
+            for etapa in orden:
+                h = self.histogramas[etapa]
+                etapas[etapa] = {
+                    'n': h.n,
+                    'media_ms': h.suma / h.n * 1000.0 if h.n else 0.0,
+                    'p50_ms': h.cuantil(0.50) * 1000.0,
+                    'p95_ms': h.cuantil(0.95) * 1000.0,
+                    'p99_ms': h.cuantil(0.99) * 1000.0
+                }
+        return {'contadores': contadores, 'fps': fps, 'etapas': etapas,
+                'activo_s': time.time() - self.inicio}
+
+    def familias_prometheus(self, prefijo="medseen", etiquetas=""):
+        """
+        Series agrupadas por familia de métrica.
+
+        Args:
+            etiquetas (str): Etiquetas comunes ya formateadas (p. ej. 'sesion="ab12"')
+
+        Returns:
+            dict: nombre -> (tipo, ayuda, [líneas de muestras])
+        """
+        def serie(nombre, *extra):
+            pares = ",".join(e for e in (etiquetas, *extra) if e)
+            return f"{nombre}{{{pares}}}" if pares else nombre
+
+        familias = {}
+        with self._lock:
+            for contador in sorted(self.contadores):
+                nombre = f"{prefijo}_{contador}_total"
+                familias[nombre] = ("counter", None, [f"{serie(nombre)} {self.contadores[contador]}"])
+
+            nombre = f"{prefijo}_fps"
+            familias[nombre] = ("gauge", "Tasa móvil de eventos por segundo", [
+                f"{serie(nombre, 'contador=' + repr_etiqueta(contador))} {self._tasas[contador].valor():.3f}"
+                for contador in sorted(self._tasas)
+            ])
+
+            nombre = f"{prefijo}_etapa_segundos"
+            lineas = []
+            for etapa in sorted(self.histogramas):
+                h = self.histogramas[etapa]
+                por_etapa = "etapa=" + repr_etiqueta(etapa)
+                acumulado = 0
+                for limite, cuenta in zip(h.limites, h.cuentas):
+                    acumulado += cuenta
+                    lineas.append(f"{serie(nombre + '_bucket', por_etapa, 'le=' + repr_etiqueta(limite))} {acumulado}")
+                lineas.append(f"{serie(nombre + '_bucket', por_etapa, 'le=' + repr_etiqueta('+Inf'))} {h.n}")
+                lineas.append(f'{serie(nombre + "_sum", por_etapa)} {h.suma:.6f}')
+                lineas.append(f'{serie(nombre + "_count", por_etapa)} {h.n}')
+            familias[nombre] = ("histogram", "Latencia de cada etapa del pipeline", lineas)
+        return familias
+
+    def a_prometheus(self, prefijo="medseen"):
+        """Serializa las métricas en el formato de texto de Prometheus"""
+        return formatear_prometheus([self.familias_prometheus(prefijo)], prefijo)
+
+
+def repr_etiqueta(valor):
+    """Valor de etiqueta de Prometheus entre comillas"""
+    return '"' + str(valor).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def formatear_prometheus(grupos, prefijo="medseen"):
+    """
+    Une las familias de varias fuentes (una por sesión) en un solo texto:
+    cada familia aparece una vez, con las muestras de todas las sesiones.
+    """
+    unidas = {}
+    for familias in grupos:
+        for nombre, (tipo, ayuda, lineas) in familias.items():
+            unidas.setdefault(nombre, (tipo, ayuda, []))[2].extend(lineas)
+
+    salida = []
+    for nombre, (tipo, ayuda, lineas) in unidas.items():
+        if ayuda:
+            salida.append(f"# HELP {nombre} {ayuda}")
+        salida.append(f"# TYPE {nombre} {tipo}")
+        salida.extend(lineas)
+
+    # La memoria es del proceso, no de una sesión
+    salida.append(f"# TYPE {prefijo}_memoria_pico_bytes gauge")
+    salida.append(f"{prefijo}_memoria_pico_bytes {int(memoria_pico_mb() * 1024 * 1024)}")
+    return "\n".join(salida) + "\n"
+
+
+class ExportadorPrometheus:
+    """
+    Escribe periódicamente las métricas de las sesiones registradas en un archivo .prom.
+
+    Hay un exportador por archivo en el proceso (ver obtener_exportador): si
+    cada sesión escribiera el suyo, las sesiones concurrentes se pisarían y
+    los valores raspados saltarían de una a otra. Cada serie lleva la
+    etiqueta sesion="<clave>".
+
+    La escritura es atómica (archivo temporal + os.replace) para que
+    node_exporter nunca lea un archivo a medio escribir.
+    """
+
+    def __init__(self, ruta, intervalo=10.0):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.ultimo_error = None
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def registrar(self, clave, metricas):
+        """Agrega las métricas de una sesión al archivo (e inicia el hilo la primera vez)"""
+        with self._lock:
+            self._sesiones[clave] = metricas
+            if self._hilo is None:
+                self.iniciar()
+
+    def retirar(self, clave):
+        """Deja escrito el estado final y quita la sesión del archivo en la siguiente escritura"""
+        self.escribir()
+        with self._lock:
+            self._sesiones.pop(clave, None)
+
+    def escribir(self):
+        with self._lock:
+            sesiones = sorted(self._sesiones.items())
+        texto = formatear_prometheus([m.familias_prometheus(etiquetas="sesion=" + repr_etiqueta(clave))
+                                      for clave, m in sesiones])
+        try:
+            carpeta = os.path.dirname(self.ruta)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.write(texto)
+            os.replace(temporal, self.ruta)
+            self.ultimo_error = None
+        except OSError as e:
+            self.ultimo_error = str(e)
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.escribir()
+
+    def iniciar(self):
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="medseen-metricas", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo y deja escrito el estado final"""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=2.0)
+            self._hilo = None
+        self.escribir()
+
+
+# Un exportador por archivo en el proceso: sobrevive a los reruns de Streamlit
+_exportadores = {}
+_lock_exportadores = threading.Lock()
+
+
+def obtener_exportador(ruta, intervalo=10.0):
+    """Devuelve el exportador compartido del archivo `ruta`"""
+    with _lock_exportadores:
+        exportador = _exportadores.get(ruta)
+        if exportador is None:
+            exportador = _exportadores[ruta] = ExportadorPrometheus(ruta, intervalo)
+        return exportador
@@ -1,92 +1,114 @@
-"""
-Predicción e Inferencia con Modelo YOLO para Instrumentos Dentales
-
-Descripción:
-Este script realiza inferencia utilizando un modelo YOLO v8 previamente entrenado
-para detectar instrumentos dentales en imágenes individuales. El programa carga
-una imagen específica, aplica el modelo de detección y muestra los resultados
-tanto guardando la imagen con las detecciones como visualizándola en tiempo real.
-
-Funcionalidades:
-- Carga de modelo entrenado desde archivo de pesos
-- Predicción sobre imagen específica
-- Guardado automático de resultados con bounding boxes
-- Visualización interactiva usando OpenCV
-- Detección de múltiples instrumentos dentales en una sola imagen
-
-Autor(es):
-- Juan Fernando Vaquera Sanchez (21130869)
-- Miriam Alicia Sanchez Cervantes (21130882)  
-- Diego Muñoz Rede (21130893)
-
-Fecha de creación: Mayo 2025
-Archivo: predict_dental_instruments_yolo.py
-
-Requisitos:
-- ultralytics
-- opencv-python (cv2)
-- PyTorch
-- Modelo entrenado (best.pt)
-- Imagen de prueba (forceps.jpg)
-
-Estructura esperada:
-runs/detect/instrumentos_dentales_yolo_model5/weights/best.pt
-forceps.jpg (imagen de entrada)
-
-Salida:
-- Imagen guardada con detecciones en runs/detect/predict/
-- Ventana de visualización interactiva
-"""
-
-from ultralytics import YOLO
-import cv2
-
-def main():
-    """
-    Función principal para realizar predicciones con el modelo YOLO entrenado.
-    
-    Carga el modelo entrenado, ejecuta la predicción sobre una imagen específica,
-    guarda los resultados automáticamente y muestra la visualización interactiva
-    de las detecciones encontradas.
-    
-    Returns:
-        None: Muestra resultados en ventana de OpenCV y guarda archivos
-    """
-    
-    # Cargar modelo YOLO entrenado desde archivo de pesos
-    # best.pt contiene los pesos del modelo con mejor rendimiento durante entrenamiento
-    # El modelo ya está entrenado para reconocer instrumentos dentales específicos
-    model = YOLO("runs/detect/instrumentos_dentales_yolo_model5/weights/best.pt")
-    
-    # Ejecutar predicción sobre imagen específica
-    # source: Ruta a la imagen de entrada (cambiar según imagen deseada)
-    # save=True: Guarda automáticamente la imagen con detecciones en runs/detect/predict/
-    # La predicción retorna objetos Results con información de detecciones
-    results = model.predict(source="forceps.jpg", save=True)
-    
-    # Procesamiento y visualización de resultados
-    # Itera sobre todos los resultados de predicción (normalmente uno por imagen)
-    for r in results:
-        # Generar imagen con bounding boxes y etiquetas dibujadas
-        # plot() renderiza las detecciones sobre la imagen original
-        # Incluye: cajas delimitadoras, etiquetas de clase, scores de confianza
-        im_bgr = r.plot()  # Obtiene imagen con los boxes dibujados
-        
-        # Mostrar resultado usando OpenCV
-        # Crea ventana interactiva para visualizar las detecciones
-        cv2.imshow("Resultado", im_bgr)
-        
-        # Esperar interacción del usuario
-        # waitKey(0): Pausa ejecución hasta que se presione cualquier tecla
-        # Permite al usuario examinar detalladamente los resultados
-        cv2.waitKey(0)  # Espera hasta que presiones una tecla
-        
-        # Limpiar recursos de OpenCV
-        # Cierra todas las ventanas abiertas y libera memoria
-        cv2.destroyAllWindows()
-
-if __name__ == "__main__":
-    # Punto de entrada del programa
-    # Ejecuta la función main() solo cuando el script se ejecuta directamente
-    # No se ejecuta si el archivo es importado como módulo
+"""
+Predicción e Inferencia con Modelo YOLO para Instrumentos Dentales
+
+Descripción:
+Este script realiza inferencia utilizando un modelo YOLO v8 previamente entrenado
+para detectar instrumentos dentales en imágenes individuales. El programa carga
+una imagen específica, aplica el modelo de detección y muestra los resultados
+tanto guardando la imagen con las detecciones como visualizándola en tiempo real.
+
+Funcionalidades:
+- Carga de modelo entrenado desde archivo de pesos
+- Predicción sobre imagen específica
+- Guardado automático de resultados con bounding boxes
+- Visualización interactiva usando OpenCV
+- Detección de múltiples instrumentos dentales en una sola imagen
+- Backend de inferencia seleccionable (torch, onnx, openvino, opencv)
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)  
+- Diego Muñoz Rede (21130893)
+
+Fecha de creación: Mayo 2025
+Archivo: predict_dental_instruments_yolo.py
+
+Requisitos:
+- ultralytics
+- opencv-python (cv2)
+- PyTorch
+- Modelo entrenado (best.pt)
+- Imagen de prueba (forceps.jpg)
+
+Estructura esperada:
+runs/detect/instrumentos_dentales_yolo_model5/weights/best.pt
+forceps.jpg (imagen de entrada)
+
+Uso:
+python predict_dental_instruments_yolo.py --imagen forceps.jpg --backend onnx
+
+Salida:
+- Imagen guardada con detecciones en runs/detect/predict/
+- Ventana de visualización interactiva
+"""
+
+import argparse
+import os
+import cv2
+
+from backends_inferencia import BACKENDS, RUTA_MODELO_PT, crear_backend
+
+def main(argv=None):
+    """
+    Función principal para realizar predicciones con el modelo YOLO entrenado.
+    
+    Carga el modelo entrenado, ejecuta la predicción sobre una imagen específica,
+    guarda los resultados automáticamente y muestra la visualización interactiva
+    de las detecciones encontradas.
+    
+    Returns:
+        None: Muestra resultados en ventana de OpenCV y guarda archivos
+    """
+    
+    # Argumentos de línea de comandos: imagen de entrada y backend de inferencia
+    parser = argparse.ArgumentParser(description="Predicción de instrumentos dentales en una imagen")
+    parser.add_argument("--imagen", default="forceps.jpg", help="Ruta a la imagen de entrada")
+    parser.add_argument("--modelo", default=RUTA_MODELO_PT, help="Ruta al checkpoint best.pt")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="torch",
+                        help="Backend de inferencia (los exportados no importan PyTorch)")
+    parser.add_argument("--salida", default="runs/detect/predict", help="Carpeta donde guardar el resultado")
+    args = parser.parse_args(argv)
+    
+    # Cargar modelo YOLO entrenado desde archivo de pesos
+    # best.pt contiene los pesos del modelo con mejor rendimiento durante entrenamiento
+    # Con --backend onnx/openvino/opencv se exporta una sola vez y se reutiliza el artefacto
+    model = crear_backend(args.modelo, args.backend)
+    
+    # Ejecutar predicción sobre la imagen indicada
+    # La predicción retorna un ResultadoDeteccion por imagen
+    imagen = cv2.imread(args.imagen)
+    if imagen is None:
+        print(f"❌ No se pudo leer la imagen: {args.imagen}")
+        return
+    results = model.predecir([imagen])
+    
+    # Procesamiento y visualización de resultados
+    # Itera sobre todos los resultados de predicción (normalmente uno por imagen)
+    for r in results:
+        # Generar imagen con bounding boxes y etiquetas dibujadas
+        # plot() renderiza las detecciones sobre la imagen original
+        # Incluye: cajas delimitadoras, etiquetas de clase, scores de confianza
+        im_bgr = r.plot()  # Obtiene imagen con los boxes dibujados
+        
+        # Guardar la imagen con detecciones en la carpeta de salida
+        os.makedirs(args.salida, exist_ok=True)
+        cv2.imwrite(os.path.join(args.salida, os.path.basename(args.imagen)), im_bgr)
+        
+        # Mostrar resultado usando OpenCV
+        # Crea ventana interactiva para visualizar las detecciones
+        cv2.imshow("Resultado", im_bgr)
+        
+        # Esperar interacción del usuario
+        # waitKey(0): Pausa ejecución hasta que se presione cualquier tecla
+        # Permite al usuario examinar detalladamente los resultados
+        cv2.waitKey(0)  # Espera hasta que presiones una tecla
+        
+        # Limpiar recursos de OpenCV
+        # Cierra todas las ventanas abiertas y libera memoria
+        cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    # Punto de entrada del programa
+    # Ejecuta la función main() solo cuando el script se ejecuta directamente
+    # No se ejecuta si el archivo es importado como módulo
     main()
\ No newline at end of file
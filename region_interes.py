@@ -0,0 +1,216 @@
+"""
+Región de Interés e Inferencia por Mosaico para MedSeen
+
+Descripción:
+Este módulo envuelve cualquier backend de inferencia para limitar la
+detección a la región de la charola (ROI) y, opcionalmente, dividirla en
+mosaicos traslapados. Instrumentos delgados como el botador o la gubia
+ocupan pocos píxeles en un frame 640x480 reducido a 640; con el mosaico,
+una captura de mayor resolución se parte en ventanas que el modelo ve a
+resolución casi completa, todas en una sola llamada batched.
+
+Con solo ROI, el recorte se infiere con un imgsz proporcional a su tamaño
+(misma densidad de píxeles que el frame completo), así que una charola que
+ocupa media vista cuesta aproximadamente una cuarta parte por frame.
+
+Las cajas se regresan a coordenadas del frame completo; en el mosaico, las
+cajas de una misma clase que se traslapan entre ventanas (incluidas las
+partes de un instrumento cortado por el borde de una ventana) se fusionan
+por intersección sobre el área menor.
+
+Funcionalidades:
+- ROI en fracciones del frame (independiente de la resolución de captura)
+- Mosaico filas x columnas con traslape configurable
+- Una sola llamada a predecir por lote de frames
+- Fusión de cajas de ventanas distintas (NMS por intersección sobre el área menor)
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: region_interes.py
+
+Requisitos:
+- numpy
+- backends_inferencia.py
+"""
+
+import math
+
+import numpy as np
+
+from backends_inferencia import SIN_CRONOMETRO, ResultadoDeteccion
+
+
+def parsear_roi(texto):
+    """
+    Convierte "x1,y1,x2,y2" (fracciones 0-1 del frame) en una tupla.
+
+    Returns:
+        tuple: (x1, y1, x2, y2) o None si el texto está vacío
+    """
+    if not texto or not texto.strip():
+        return None
+    valores = tuple(float(v) for v in texto.split(','))
+    if len(valores) != 4:
+        raise ValueError(f"La ROI necesita 4 valores x1,y1,x2,y2: {texto!r}")
+    x1, y1, x2, y2 = valores
+    if not (0 <= x1 < x2 <= 1 and 0 <= y1 < y2 <= 1):
+        raise ValueError(f"La ROI debe estar en fracciones 0-1 con x1 < x2 e y1 < y2: {texto!r}")
+    return valores
+
+
+def parsear_mosaico(texto):
+    """Convierte "2x3" en (filas, columnas); None si está vacío o es 1x1"""
+    if not texto or not texto.strip():
+        return None
+    try:
+        filas, columnas = (int(v) for v in texto.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"El mosaico debe tener la forma FILASxCOLUMNAS: {texto!r}") from None
+    if filas < 1 or columnas < 1:
+        raise ValueError(f"El mosaico necesita al menos 1 fila y 1 columna: {texto!r}")
+    return (filas, columnas) if filas * columnas > 1 else None
+
+
+def _multiplo_32(valor):
+    return max(32, int(math.ceil(valor / 32)) * 32)
+
+
+def fusionar_cajas(xyxy, conf, cls, ventana, umbral=0.6):
+    """
+    Fusión voraz entre ventanas: la caja de mayor confianza absorbe a las de
+    su clase, de otra ventana, cuya intersección cubre más de `umbral` de la
+    caja menor, y crece hasta su unión (reconstruye instrumentos cortados por
+    un borde). Las cajas de una misma ventana ya pasaron por el NMS del
+    modelo y nunca se fusionan: dos instrumentos iguales contiguos siguen
+    siendo dos cajas.
+
+    Args:
+        ventana (np.ndarray): Índice de la ventana de origen de cada caja
+
+    Returns:
+        tuple: (xyxy, conf, cls) fusionados
+    """
+    if len(conf) == 0:
+        return xyxy, conf, cls
+    orden = np.argsort(-conf)
+    xyxy, conf, cls, ventana = xyxy[orden].copy(), conf[orden], cls[orden], ventana[orden]
+    areas = (xyxy[:, 2] - xyxy[:, 0]).clip(0) * (xyxy[:, 3] - xyxy[:, 1]).clip(0)
+    vivas = np.ones(len(conf), dtype=bool)
+    for i in range(len(conf)):
+        if not vivas[i]:
+            continue
+        resto = np.flatnonzero(vivas & (cls == cls[i]) & (ventana != ventana[i]))
+        resto = resto[resto > i]
+        if resto.size == 0:
+            continue
+        ix1 = np.maximum(xyxy[i, 0], xyxy[resto, 0])
+        iy1 = np.maximum(xyxy[i, 1], xyxy[resto, 1])
+        ix2 = np.minimum(xyxy[i, 2], xyxy[resto, 2])
+        iy2 = np.minimum(xyxy[i, 3], xyxy[resto, 3])
+        inter = (ix2 - ix1).clip(0) * (iy2 - iy1).clip(0)
+        absorbidas = resto[inter > umbral * np.maximum(np.minimum(areas[i], areas[resto]), 1e-9)]
+        if absorbidas.size:
+            xyxy[i, :2] = np.minimum(xyxy[i, :2], xyxy[absorbidas, :2].min(axis=0))
+            xyxy[i, 2:] = np.maximum(xyxy[i, 2:], xyxy[absorbidas, 2:].max(axis=0))
+            areas[i] = (xyxy[i, 2] - xyxy[i, 0]) * (xyxy[i, 3] - xyxy[i, 1])
+            vivas[absorbidas] = False
+    return xyxy[vivas], conf[vivas], cls[vivas]
+
+
+class InferenciaRegiones:
+    """
+    Envoltura de un backend que infiere solo la ROI, opcionalmente en mosaico.
+
+    Expone la misma interfaz predecir(frames, ...) que los backends; el
+    resto de atributos (names, imgsz, nombre, ...) se delegan al backend.
+
+    Args:
+        modelo: Backend (o ModeloCompartido) a envolver
+        roi (tuple): (x1, y1, x2, y2) en fracciones del frame; None = frame completo
+        mosaico (tuple): (filas, columnas) de ventanas; None = sin mosaico
+        traslape (float): Fracción de cada ventana compartida con sus vecinas
+        umbral_fusion (float): Intersección sobre el área menor para fusionar cajas
+    """
+
+    def __init__(self, modelo, roi=None, mosaico=None, traslape=0.2, umbral_fusion=0.6):
+        self.modelo = modelo
+        self.roi = roi
+        self.mosaico = mosaico if mosaico and mosaico[0] * mosaico[1] > 1 else None
+        self.traslape = traslape
+        self.umbral_fusion = umbral_fusion
+
+    def __getattr__(self, nombre):
+        return getattr(self.modelo, nombre)
+
+    def region(self, frame):
+        """ROI en píxeles (x1, y1, x2, y2) para este frame"""
+        alto, ancho = frame.shape[:2]
+        if self.roi is None:
+            return 0, 0, ancho, alto
+        fx1, fy1, fx2, fy2 = self.roi
+        x1, y1 = int(fx1 * ancho), int(fy1 * alto)
+        return x1, y1, max(int(fx2 * ancho), x1 + 1), max(int(fy2 * alto), y1 + 1)
+
+    def ventanas(self, frame):
+        """Ventanas (x1, y1, x2, y2) en píxeles que cubren la ROI con traslape"""
+        rx1, ry1, rx2, ry2 = self.region(frame)
+        if self.mosaico is None:
+            return [(rx1, ry1, rx2, ry2)]
+        filas, columnas = self.mosaico
+        ventanas = []
+        for inicio_y, fin_y in self._particion(ry1, ry2, filas):
+            for inicio_x, fin_x in self._particion(rx1, rx2, columnas):
+                ventanas.append((inicio_x, inicio_y, fin_x, fin_y))
+        return ventanas
+
+    def _particion(self, inicio, fin, n):
+        """n tramos de igual tamaño sobre [inicio, fin) que se traslapan `traslape`"""
+        largo = fin - inicio
+        if n <= 1:
+            return [(inicio, fin)]
+        tramo = largo / (n - (n - 1) * self.traslape)
+        paso = tramo * (1 - self.traslape)
+        return [(inicio + int(round(i * paso)), min(fin, inicio + int(round(i * paso + tramo))))
+                for i in range(n)]
+
+    def predecir(self, frames, conf=0.25, iou=0.7, imgsz=None, cronometro=SIN_CRONOMETRO):
+        imgsz = imgsz or self.modelo.imgsz
+        recortes, origen = [], []
+        for i, frame in enumerate(frames):
+            for v, (x1, y1, x2, y2) in enumerate(self.ventanas(frame)):
+                recortes.append(frame[y1:y2, x1:x2])
+                origen.append((i, v, x1, y1))
+
+        if self.mosaico is None and self.roi is not None:
+            # Misma densidad de píxeles que el frame completo: la ROI menor cuesta menos
+            proporcion = max(max(r.shape[:2]) / max(f.shape[:2]) for r, f in zip(recortes, frames))
+            imgsz = min(imgsz, _multiplo_32(imgsz * proporcion))
+
+        predicciones = self.modelo.predecir(recortes, conf=conf, iou=iou, imgsz=imgsz, cronometro=cronometro)
+
+        # Regresar cada caja a coordenadas del frame completo y agrupar por frame
+        por_frame = [([], [], [], []) for _ in frames]
+        for (i, v, x1, y1), resultado in zip(origen, predicciones):
+            if len(resultado):
+                cajas, confs, clases, ventanas = por_frame[i]
+                cajas.append(np.asarray(resultado.xyxy, dtype=np.float32) + (x1, y1, x1, y1))
+                confs.append(np.asarray(resultado.conf, dtype=np.float32))
+                clases.append(np.asarray(resultado.cls))
+                ventanas.append(np.full(len(resultado), v))
+
+        resultados = []
+        for frame, (cajas, confs, clases, ventanas) in zip(frames, por_frame):
+            if cajas:
+                xyxy, conf_f, cls_f = np.concatenate(cajas), np.concatenate(confs), np.concatenate(clases)
+                if self.mosaico is not None:
+                    xyxy, conf_f, cls_f = fusionar_cajas(xyxy, conf_f, cls_f, np.concatenate(ventanas),
+                                                         self.umbral_fusion)
+            else:
+                xyxy = np.zeros((0, 4), dtype=np.float32)
+                conf_f = np.zeros(0, dtype=np.float32)
+                cls_f = np.zeros(0, dtype=np.int64)
+            resultados.append(ResultadoDeteccion(xyxy, conf_f, cls_f, self.modelo.names, frame))
+        return resultados
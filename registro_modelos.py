@@ -0,0 +1,220 @@
+"""
+Registro de Modelos Compartido por Proceso para MedSeen
+
+Descripción:
+Este módulo mantiene un registro de modelos YOLO a nivel de proceso. Cada
+modelo se identifica por la ruta del checkpoint, el hash del archivo que
+realmente se carga (el .pt o el artefacto exportado) y las opciones de
+inferencia (backend, tamaño de entrada), se carga y se "calienta" una sola
+vez, y la misma instancia se entrega a todos los MedSeenDentalDetector del
+proceso. Los modelos que dejan de usarse se expulsan con una política LRU/TTL.
+
+Funcionalidades:
+- Clave de caché por ruta absoluta, SHA-256 del archivo cargado y opciones
+- Carga y warm-up únicos por modelo (carga concurrente deduplicada)
+- Acceso a predecir serializado por modelo (seguro entre sesiones)
+- Expulsión LRU por capacidad y TTL por inactividad
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: registro_modelos.py
+
+Requisitos:
+- backends_inferencia.py
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from backends_inferencia import cargar_backend, ruta_artefacto
+
+# Formato exportado que carga cada backend (torch lee directamente el .pt)
+FORMATO_BACKEND = {
+    'onnx': 'onnx',
+    'onnx_int8': 'onnx_int8',
+    'openvino': 'openvino',
+    'opencv': 'onnx'
+}
+
+
+def calcular_hash_archivo(ruta, tam_bloque=1 << 20):
+    """Calcula el SHA-256 de un archivo leyendo por bloques"""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class ModeloCompartido:
+    """
+    Envoltura de un modelo compartido entre sesiones.
+
+    Los runtimes (en particular el predictor de Ultralytics) no son seguros
+    ante llamadas concurrentes, por lo que predecir se serializa con un
+    candado propio del modelo. El resto de atributos (names, etc.) se delegan
+    al backend original.
+
+    Cada predicción renueva ultimo_uso: un modelo en uso continuo nunca
+    expira por TTL aunque ninguna sesión nueva lo solicite.
+    """
+
+    def __init__(self, modelo, clave):
+        self.modelo = modelo
+        self.clave = clave
+        self.ultimo_uso = time.monotonic()
+        self._lock = threading.Lock()
+
+    def predecir(self, *args, **kwargs):
+        with self._lock:
+            try:
+                return self.modelo.predecir(*args, **kwargs)
+            finally:
+                self.ultimo_uso = time.monotonic()
+
+    def __getattr__(self, nombre):
+        return getattr(self.modelo, nombre)
+
+
+class _EntradaRegistro:
+    def __init__(self, modelo):
+        self.modelo = modelo
+
+    @property
+    def ultimo_uso(self):
+        return self.modelo.ultimo_uso
+
+    @ultimo_uso.setter
+    def ultimo_uso(self, valor):
+        self.modelo.ultimo_uso = valor
+
+
+class RegistroModelos:
+    """Caché de modelos a nivel de proceso con política LRU/TTL"""
+
+    def __init__(self, capacidad=2, ttl_segundos=1800, cargador=cargar_backend):
+        self.capacidad = capacidad
+        self.ttl_segundos = ttl_segundos
+        self.cargador = cargador
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._locks_carga = {}
+        self._hashes = {}
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def _hash_archivo(self, ruta):
+        # Reutilizar el hash mientras el archivo no cambie (mtime y tamaño)
+        st = os.stat(ruta)
+        firma = (ruta, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if firma in self._hashes:
+                return self._hashes[firma]
+        digest = calcular_hash_archivo(ruta)
+        with self._lock:
+            self._hashes[firma] = digest
+        return digest
+
+    def _archivo_cargado(self, ruta, backend):
+        # Los backends exportados leen el artefacto, no el .pt: se hashea el
+        # artefacto si existe (también cuando se despliega sin checkpoint)
+        formato = FORMATO_BACKEND.get(backend)
+        if formato is not None:
+            artefacto = ruta_artefacto(ruta, formato)
+            if os.path.exists(artefacto):
+                return artefacto
+        return ruta
+
+    def clave(self, ruta, **opciones):
+        """Construye la clave (ruta, hash, opciones) de un modelo"""
+        ruta = os.path.abspath(ruta)
+        archivo = self._archivo_cargado(ruta, opciones.get('backend', 'torch'))
+        return (ruta, self._hash_archivo(archivo), tuple(sorted(opciones.items())))
+
+    def obtener(self, ruta, **opciones):
+        """
+        Devuelve el modelo compartido para la ruta y opciones dadas.
+
+        Si el modelo no está en el registro se carga y calienta una sola vez,
+        aunque varias sesiones lo soliciten al mismo tiempo.
+
+        Returns:
+            ModeloCompartido: instancia compartida por todo el proceso
+        """
+        clave = self.clave(ruta, **opciones)
+
+        with self._lock:
+            self._purgar_expirados()
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                return self._marcar_uso(clave, entrada)
+            lock_carga = self._locks_carga.setdefault(clave, threading.Lock())
+
+        with lock_carga:
+            # Otra sesión pudo haber terminado de cargarlo mientras esperábamos
+            with self._lock:
+                entrada = self._entradas.get(clave)
+                if entrada is not None:
+                    return self._marcar_uso(clave, entrada)
+
+            modelo = ModeloCompartido(self.cargador(clave[0], **opciones), clave)
+
+            with self._lock:
+                self.fallos += 1
+                self._entradas[clave] = _EntradaRegistro(modelo)
+                self._locks_carga.pop(clave, None)
+                self._aplicar_capacidad()
+            return modelo
+
+    def _marcar_uso(self, clave, entrada):
+        entrada.ultimo_uso = time.monotonic()
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return entrada.modelo
+
+    def _purgar_expirados(self):
+        if self.ttl_segundos is None:
+            return
+        limite = time.monotonic() - self.ttl_segundos
+        for clave in [c for c, e in self._entradas.items() if e.ultimo_uso < limite]:
+            del self._entradas[clave]
+            self.expulsiones += 1
+
+    def _aplicar_capacidad(self):
+        while len(self._entradas) > self.capacidad:
+            # El menos usado recientemente, contando predicciones y no solo solicitudes
+            del self._entradas[min(self._entradas, key=lambda c: self._entradas[c].ultimo_uso)]
+            self.expulsiones += 1
+
+    def limpiar(self):
+        """Elimina todos los modelos del registro"""
+        with self._lock:
+            self._entradas.clear()
+
+    def info(self):
+        """Resumen del estado del registro"""
+        with self._lock:
+            return {
+                'modelos': len(self._entradas),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'expulsiones': self.expulsiones
+            }
+
+
+# Registro único del proceso: los módulos importados sobreviven a los reruns de Streamlit
+registro = RegistroModelos()
+
+
+def obtener_modelo(ruta, **opciones):
+    """Atajo para obtener un modelo del registro del proceso"""
+    return registro.obtener(ruta, **opciones)
@@ -0,0 +1,196 @@
+"""
+Generación de Reportes PDF de MedSeen
+
+Descripción:
+Este módulo genera el reporte PDF de una sesión fuera del hilo de
+Streamlit. Al finalizar, el detector entrega una instantánea compacta de la
+sesión (agregados y últimas detecciones, no el detector vivo) a un pool de
+procesos, y la interfaz consulta el estado del trabajo para mostrar la
+descarga cuando termina. Varias sesiones que terminan a la vez se atienden
+en paralelo.
+
+Es una fachada ligera: el armado del PDF (ReportLab, Matplotlib) vive en
+generador_pdf.py y solo se importa dentro de los procesos trabajadores.
+
+Funcionalidades:
+- InstantaneaSesion: copia serializable de lo que lee el reporte
+- Pool de procesos compartido (inicio por spawn, seguro con hilos)
+- TrabajoReporte: estado (en cola, generando, listo, error) y resultado
+- Modo de registro completo: el log se lee por páginas (del diario SQLite o
+  de las columnas del almacén) y se escribe a un archivo en disco
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: reporte_pdf.py
+
+Requisitos:
+- generador_pdf.py (en los procesos trabajadores)
+- estadisticas_sesion.py, diario_sesion.py
+"""
+
+import copy
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from almacen_detecciones import desde_epoch_ns
+from diario_sesion import DiarioSesion
+
+# Procesos del pool de reportes: sesiones que terminan a la vez no se esperan entre sí
+PROCESOS_REPORTE = int(os.environ.get("MEDSEEN_PROCESOS_PDF", 2))
+# Filas del registro cronológico que incluye el reporte normal
+FILAS_REGISTRO = 20
+# Carpeta de los reportes con registro completo (se escriben a disco)
+RUTA_REPORTES = os.environ.get("MEDSEEN_REPORTES", "reportes")
+# Filas leídas por consulta al recorrer el almacén
+FILAS_POR_LOTE = 4096
+
+
+class RegistroDiario:
+    """Registro completo leído del diario SQLite con un cursor (memoria constante)"""
+
+    def __init__(self, ruta, id_sesion):
+        self.ruta = ruta
+        self.id_sesion = id_sesion
+
+    def __iter__(self):
+        return DiarioSesion(self.ruta).detecciones(self.id_sesion)
+
+
+class RegistroColumnas:
+    """
+    Registro completo a partir de las columnas del almacén (13 bytes por fila);
+    las filas se convierten a datetime y texto por lotes al recorrerlo.
+    """
+
+    def __init__(self, almacen):
+        columnas = almacen.columnas()
+        self.timestamp = columnas['timestamp']
+        self.clase = columnas['clase']
+        self.confianza = columnas['confianza']
+        self.fuente = columnas['fuente']
+        self.clases = list(almacen.clases.nombres)
+        self.fuentes = list(almacen.fuentes.nombres)
+
+    def __iter__(self):
+        for inicio in range(0, len(self.timestamp), FILAS_POR_LOTE):
+            fin = inicio + FILAS_POR_LOTE
+            for ns, k, conf, f in zip(self.timestamp[inicio:fin].tolist(), self.clase[inicio:fin].tolist(),
+                                      self.confianza[inicio:fin].tolist(), self.fuente[inicio:fin].tolist()):
+                yield desde_epoch_ns(ns), self.clases[k], conf, self.fuentes[f]
+
+
+def fuente_registro(sesion):
+    """Diario de la sesión si lo tiene (no hay que copiar nada), si no, sus columnas"""
+    diario = getattr(sesion, 'diario', None)
+    if diario is not None and sesion.id_sesion:
+        return RegistroDiario(diario.ruta, sesion.id_sesion)
+    return RegistroColumnas(sesion.almacen)
+
+
+class InstantaneaSesion:
+    """
+    Copia compacta y serializable de lo que el reporte lee de una sesión.
+
+    Contiene los agregados (EstadisticasSesion, tamaño proporcional a
+    instrumentos x minutos) y las últimas filas del registro, no el almacén
+    completo ni el detector con sus hilos y capturas.
+    """
+
+    def __init__(self, inicio_sesion, estadisticas_sesion, detecciones_confirmadas, registro=None):
+        self.inicio_sesion = inicio_sesion
+        self.estadisticas_sesion = estadisticas_sesion
+        self.detecciones_confirmadas = detecciones_confirmadas
+        # Fuente del registro completo (RegistroDiario o RegistroColumnas), si se pidió
+        self.registro = registro
+
+    @classmethod
+    def desde(cls, sesion, registro_completo=False):
+        """Toma la instantánea de un detector o de una SesionDiario"""
+        return cls(sesion.inicio_sesion, copy.deepcopy(sesion.estadisticas_sesion),
+                   sesion.detecciones_confirmadas[-FILAS_REGISTRO:],
+                   fuente_registro(sesion) if registro_completo else None)
+
+    @property
+    def estadisticas(self):
+        return self.estadisticas_sesion.conteos
+
+
+def generar_pdf(instantanea, nombre_archivo):
+    """
+    Punto de entrada del proceso trabajador.
+
+    Returns:
+        bytes del PDF, o la ruta del archivo si la instantánea trae registro completo
+    """
+    # ReportLab y Matplotlib se importan aquí, solo en el proceso trabajador
+    from generador_pdf import PDFGenerator
+
+    if instantanea.registro is None:
+        return PDFGenerator().generar_reporte(instantanea).getvalue()
+    os.makedirs(RUTA_REPORTES, exist_ok=True)
+    ruta = os.path.join(RUTA_REPORTES, nombre_archivo)
+    # Se escribe a un temporal y se renombra: nunca queda un PDF a medias con el nombre final
+    temporal = ruta + ".tmp"
+    PDFGenerator().generar_reporte(instantanea, destino=temporal, registro=instantanea.registro)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+class TrabajoReporte:
+    """Referencia a un reporte enviado al pool, para consultarla desde session_state"""
+
+    def __init__(self, futuro, nombre_archivo):
+        self.futuro = futuro
+        self.nombre_archivo = nombre_archivo
+        self.enviado = time.monotonic()
+
+    @property
+    def estado(self):
+        if self.futuro.done():
+            return 'error' if self.futuro.exception() is not None else 'listo'
+        return 'generando' if self.futuro.running() else 'en_cola'
+
+    @property
+    def segundos(self):
+        return time.monotonic() - self.enviado
+
+    def resultado(self):
+        return self.futuro.result()
+
+    def error(self):
+        return self.futuro.exception()
+
+
+# Un solo pool por proceso, compartido por todas las sesiones de Streamlit
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _obtener_pool(reiniciar=False):
+    global _pool
+    with _lock_pool:
+        if reiniciar and _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            # spawn: no hereda por fork los hilos de captura y de Streamlit
+            _pool = ProcessPoolExecutor(max_workers=PROCESOS_REPORTE,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def enviar_reporte(instantanea, nombre_archivo):
+    """Encola la generación del PDF y devuelve su TrabajoReporte sin esperar"""
+    try:
+        futuro = _obtener_pool().submit(generar_pdf, instantanea, nombre_archivo)
+    except BrokenProcessPool:
+        # Un trabajador murió (p. ej. sin memoria): recrear el pool una vez
+        futuro = _obtener_pool(reiniciar=True).submit(generar_pdf, instantanea, nombre_archivo)
+    return TrabajoReporte(futuro, nombre_archivo)
@@ -0,0 +1,189 @@
+"""
+Seguimiento Multi-Objeto de Instrumentos para MedSeen
+
+Descripción:
+Este módulo sigue cada caja detectada a lo largo de los frames con un
+filtro de Kalman de velocidad constante por pista y asociación por IoU
+(estilo SORT). Cada pista tiene su propio contador de confirmación, así que
+varios instrumentos en la charola se confirman a la vez en lugar de que la
+caja de mayor confianza reinicie el contador de las demás.
+
+Como las pistas pueden predecirse sin el modelo, el detector completo solo
+necesita correr cada N frames: en los intermedios las cajas se propagan con
+la predicción de Kalman, que cuesta microsegundos.
+
+Funcionalidades:
+- Filtro de Kalman (cx, cy, w, h y sus velocidades) por pista
+- Asociación voraz por IoU, solo entre cajas de la misma clase
+- Contador de aciertos por pista para la lógica de confirmación
+- Conversión de las pistas activas a ResultadoDeteccion (para anotar)
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: seguimiento.py
+
+Requisitos:
+- numpy
+- backends_inferencia.py
+"""
+
+import itertools
+
+import numpy as np
+
+from backends_inferencia import NOMBRES_CLASES, ResultadoDeteccion
+
+# Modelo de velocidad constante: x' = x + v (un paso por frame)
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8, dtype=np.float64)
+# Ruido de proceso (posición/tamaño y velocidades) y de medición, en píxeles²
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.25, 0.25, 0.25, 0.25])
+_R = np.diag([4.0, 4.0, 16.0, 16.0])
+# Incertidumbre inicial: posición conocida, velocidad desconocida
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0, 1000.0, 1000.0])
+
+
+def _a_medicion(caja):
+    x1, y1, x2, y2 = caja
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=np.float64)
+
+
+def iou_matriz(a, b):
+    """IoU entre cada caja de a (N, 4) y cada caja de b (M, 4), en xyxy"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    interseccion = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return interseccion / np.maximum(area_a[:, None] + area_b[None, :] - interseccion, 1e-6)
+
+
+class Pista:
+    """Un instrumento seguido entre frames"""
+
+    def __init__(self, ident, caja, confianza, clase):
+        self.id = ident
+        self.clase = int(clase)
+        self.confianza = float(confianza)
+        # Pasadas del detector seguidas en que la pista se asoció (contador de confirmación);
+        # los frames propagados no cuentan: solo el detector confirma
+        self.aciertos = 1
+        # Pasadas del detector sin asociarse
+        self.perdidos = 0
+        self.ultima_confirmacion = None
+        self.x = np.zeros(8, dtype=np.float64)
+        self.x[:4] = _a_medicion(caja)
+        self.P = _P0.copy()
+
+    @property
+    def caja(self):
+        cx, cy, w, h = self.x[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+    def predecir(self):
+        self.x = _F @ self.x
+        self.P = _F @ self.P @ _F.T + _Q
+
+    def corregir(self, caja, confianza):
+        y = _a_medicion(caja) - _H @ self.x
+        S = _H @ self.P @ _H.T + _R
+        K = self.P @ _H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(8) - K @ _H) @ self.P
+        self.confianza = float(confianza)
+
+
+class SeguidorMultiple:
+    """
+    Pistas de una fuente de video.
+
+    Args:
+        iou_min (float): IoU mínimo para asociar una detección a una pista
+        max_perdidos (int): Pasadas del detector sin asociación antes de descartar la pista
+    """
+
+    def __init__(self, iou_min=0.3, max_perdidos=2):
+        self.iou_min = iou_min
+        self.max_perdidos = max_perdidos
+        self.pistas = []
+        self._ids = itertools.count(1)
+
+    @property
+    def activas(self):
+        """Pistas asociadas en la última pasada del detector"""
+        return [p for p in self.pistas if p.perdidos == 0]
+
+    def propagar(self):
+        """Frame sin detector: avanzar las pistas con la predicción de Kalman (sin contar aciertos)"""
+        for pista in self.pistas:
+            pista.predecir()
+        return self.activas
+
+    def actualizar(self, resultado, contar=True):
+        """
+        Frame con detector: predecir, asociar por IoU y crear/descartar pistas.
+
+        Con contar=False (cajas reutilizadas de una escena estática, no una
+        pasada nueva del detector) las pistas se corrigen pero no suman aciertos.
+        """
+        for pista in self.pistas:
+            pista.predecir()
+
+        cajas = np.asarray(resultado.xyxy, dtype=np.float32).reshape(-1, 4)
+        confs = np.asarray(resultado.conf).reshape(-1)
+        clases = np.asarray(resultado.cls).reshape(-1).astype(int)
+
+        asociadas = set()
+        detecciones_usadas = set()
+        if self.pistas and len(cajas):
+            previstas = np.stack([p.caja for p in self.pistas])
+            iou = iou_matriz(previstas, cajas)
+            # Solo se asocian cajas de la misma clase
+            iou[np.array([p.clase for p in self.pistas])[:, None] != clases[None, :]] = 0
+            # Asociación voraz: pares de mayor IoU primero
+            for plano in np.argsort(-iou, axis=None):
+                i, j = divmod(int(plano), iou.shape[1])
+                if iou[i, j] < self.iou_min:
+                    break
+                if i in asociadas or j in detecciones_usadas:
+                    continue
+                asociadas.add(i)
+                detecciones_usadas.add(j)
+                pista = self.pistas[i]
+                pista.corregir(cajas[j], confs[j])
+                if contar:
+                    pista.aciertos = pista.aciertos + 1 if pista.perdidos == 0 else 1
+                pista.perdidos = 0
+
+        for i, pista in enumerate(self.pistas):
+            if i not in asociadas:
+                pista.perdidos += 1
+        self.pistas = [p for p in self.pistas if p.perdidos <= self.max_perdidos]
+
+        for j in range(len(cajas)):
+            if j not in detecciones_usadas:
+                self.pistas.append(Pista(next(self._ids), cajas[j], confs[j], clases[j]))
+        return self.activas
+
+    def como_resultado(self, frame, names=None):
+        """Pistas activas como ResultadoDeteccion sobre `frame` (para el renderizador)"""
+        activas = self.activas
+        if activas:
+            xyxy = np.stack([p.caja for p in activas])
+        else:
+            xyxy = np.zeros((0, 4), dtype=np.float32)
+        conf = np.array([p.confianza for p in activas], dtype=np.float32)
+        cls = np.array([p.clase for p in activas], dtype=np.float32)
+        return ResultadoDeteccion(xyxy, conf, cls, names or NOMBRES_CLASES, frame)
+
+    def reiniciar(self):
+        self.pistas = []
@@ -0,0 +1,59 @@
+"""
+Dueño y latido de las sesiones del diario.
+"""
+
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from diario_sesion import DiarioSesion  # noqa: E402
+
+
+def _detecciones(diario, sesion_id):
+    return [instrumento for _, instrumento, _, _ in diario.detecciones(sesion_id)]
+
+
+def test_reanudar_con_el_escritor_anterior_vivo(tmp_path):
+    ruta = str(tmp_path / "diario.db")
+    anterior = DiarioSesion(ruta)
+    anterior.iniciar()
+    sesion_id = anterior.abrir_sesion(datetime.now())
+    anterior.registrar(sesion_id, "Espejo", 0.9, datetime.now())
+    anterior.vaciar()
+
+    # Otra pestaña reanuda la sesión mientras el worker anterior sigue escribiendo
+    nuevo = DiarioSesion(ruta)
+    nuevo.iniciar()
+    nuevo.reclamar_sesion(sesion_id)
+    nuevo.vaciar()
+
+    anterior.registrar(sesion_id, "Pinza", 0.8, datetime.now())
+    anterior.cerrar_sesion(sesion_id)
+    anterior.vaciar()
+    nuevo.registrar(sesion_id, "Gubia", 0.7, datetime.now())
+    nuevo.vaciar()
+
+    # Las escrituras del dueño desplazado se descartan y no puede cerrar la sesión
+    assert _detecciones(nuevo, sesion_id) == ["Espejo", "Gubia"]
+    assert nuevo.sesion_interrumpida() is None
+
+    anterior.detener()
+    nuevo.cerrar_sesion(sesion_id)
+    nuevo.detener()
+    assert nuevo.sesion_interrumpida() is None
+
+
+def test_sesion_viva_en_otra_pestana_no_se_ofrece(tmp_path):
+    ruta = str(tmp_path / "diario.db")
+    diario = DiarioSesion(ruta)
+    diario.iniciar()
+    sesion_id = diario.abrir_sesion(datetime.now())
+    diario.vaciar()
+
+    assert DiarioSesion(ruta).sesion_interrumpida() is None
+
+    # Escritor detenido sin cerrar la sesión: ahora sí está interrumpida
+    diario.detener()
+    assert DiarioSesion(ruta).sesion_interrumpida()['id'] == sesion_id
@@ -0,0 +1,25 @@
+"""
+Presupuesto de tiempo de arranque de la aplicación.
+
+Importa la página en intérpretes nuevos con tiempo_arranque.medir_importacion
+(Streamlit precargado, como con `streamlit run`) y verifica que la mediana
+quede dentro de PRESUPUESTO_MS.
+"""
+
+import statistics
+
+import pytest
+
+from tiempo_arranque import MODULO_APP, PRESUPUESTO_MS, desglose, medir_importacion
+
+REPETICIONES = 3
+
+
+def test_importacion_de_la_app_dentro_del_presupuesto():
+    pytest.importorskip("streamlit")
+    totales = [desglose(medir_importacion(MODULO_APP))[0] for _ in range(REPETICIONES)]
+    mediana = statistics.median(totales)
+    assert mediana <= PRESUPUESTO_MS, (
+        f"La importación de {MODULO_APP} tarda {mediana:.0f} ms "
+        f"(presupuesto {PRESUPUESTO_MS:.0f} ms); ver `python tiempo_arranque.py` para el desglose"
+    )
@@ -0,0 +1,124 @@
+"""
+Presupuesto de Tiempo de Arranque de MedSeen
+
+Descripción:
+Este script mide cuánto tarda en importarse la aplicación de Streamlit en
+un intérprete nuevo (arranque en frío) y desglosa ese tiempo por
+dependencia, a partir de la salida de `python -X importtime`. Con
+`streamlit run` el servidor ya importó Streamlit antes de ejecutar la
+página, así que por defecto Streamlit se precarga y no se cuenta: lo que se
+mide es lo que la página agrega antes de su primera pintura.
+
+Se repite varias veces y se reporta la mediana; si supera el presupuesto el
+script termina con código 1. El mismo presupuesto se verifica en la suite
+de pruebas (tests/test_tiempo_arranque.py).
+
+Uso:
+python tiempo_arranque.py
+python tiempo_arranque.py --presupuesto 300 --repeticiones 7
+python tiempo_arranque.py --modulo reporte_pdf --sin-precarga
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: tiempo_arranque.py
+
+Requisitos:
+- medSeen_dental_detector_app.py y sus dependencias
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+MODULO_APP = "medSeen_dental_detector_app"
+# Presupuesto de la importación de la página (sin Streamlit), en ms
+PRESUPUESTO_MS = 350.0
+
+LINEA_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def medir_importacion(modulo, precarga=("streamlit",)):
+    """
+    Importa `modulo` en un intérprete nuevo con -X importtime.
+
+    Returns:
+        list: (propio_us, acumulado_us, profundidad, nombre) de los imports
+        que provocó `modulo`, sin los de la precarga
+    """
+    codigo = "".join(f"import {m}; " for m in precarga) + f"import {modulo}"
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                             capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    entradas = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, nombre = coincidencia.groups()
+            entradas.append((int(propio), int(acumulado), (len(sangria) - 1) // 2, nombre))
+
+    # importtime lista cada módulo después de sus dependencias: todo lo que
+    # aparece tras la última raíz de la precarga pertenece a `modulo`
+    ultima_precarga = max((i for i, e in enumerate(entradas) if e[2] == 0 and e[3] in precarga), default=-1)
+    return entradas[ultima_precarga + 1:]
+
+
+def desglose(entradas):
+    """
+    Tiempo por dependencia directa del módulo, agrupado por paquete raíz.
+
+    Returns:
+        tuple: (total_ms, propio_ms, [(paquete, ms), ...] de mayor a menor)
+    """
+    raiz = entradas[-1]
+    por_paquete = defaultdict(float)
+    for _, acumulado, profundidad, nombre in entradas:
+        if profundidad == 1:
+            por_paquete[nombre.split(".")[0]] += acumulado / 1000
+    return raiz[1] / 1000, raiz[0] / 1000, sorted(por_paquete.items(), key=lambda p: -p[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app de MedSeen")
+    parser.add_argument("--modulo", default=MODULO_APP, help="Módulo a medir")
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_MS,
+                        help="Máximo permitido para la mediana, en ms")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Mediciones en frío")
+    parser.add_argument("--sin-precarga", action="store_true",
+                        help="Contar también la importación de Streamlit")
+    parser.add_argument("--top", type=int, default=12, help="Dependencias a listar")
+    args = parser.parse_args(argv)
+
+    precarga = () if args.sin_precarga else ("streamlit",)
+    mediciones = [desglose(medir_importacion(args.modulo, precarga)) for _ in range(args.repeticiones)]
+    totales = [m[0] for m in mediciones]
+    mediana = statistics.median(totales)
+    # Desglose de la corrida más cercana a la mediana
+    total, propio, paquetes = min(mediciones, key=lambda m: abs(m[0] - mediana))
+
+    excluido = " (sin Streamlit)" if precarga else ""
+    print(f"\n⏱  Importación de {args.modulo}{excluido}: mediana {mediana:.0f} ms "
+          f"(mín {min(totales):.0f}, máx {max(totales):.0f}, n={len(totales)})")
+    print(f"  {'dependencia':<28}{'ms':>9}{'%':>7}")
+    for paquete, ms in paquetes[:args.top]:
+        print(f"  {paquete:<28}{ms:>9.1f}{ms / total:>7.0%}")
+    print(f"  {'(código propio)':<28}{propio:>9.1f}{propio / total:>7.0%}")
+
+    if mediana > args.presupuesto:
+        print(f"\n❌ Excede el presupuesto de {args.presupuesto:.0f} ms")
+        return 1
+    print(f"\n✅ Dentro del presupuesto de {args.presupuesto:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,55 +1,298 @@
-"""
-Entrenamiento de Modelo YOLO para Reconocimiento de Instrumentos Dentales
-
-Descripción:
-Este script entrena un modelo de detección de objetos YOLO (You Only Look Once) 
-versión 8 para reconocer y clasificar instrumentos dentales. Utiliza el framework 
-Ultralytics YOLO con configuración optimizada para GPU NVIDIA RTX 3050.
-
-El modelo entrenado será capaz de detectar y clasificar diferentes tipos de 
-instrumentos dentales en imágenes, proporcionando coordenadas de bounding boxes 
-y etiquetas de clasificación.
-
-Autor(es):
-- Juan Fernando Vaquera Sanchez (21130869)
-- Miriam Alicia Sanchez Cervantes (21130882)  
-- Diego Muñoz Rede (21130893)
-
-Archivo: train_dental_instruments_yolo.py
-
-Requisitos:
-- ultralytics
-- PyTorch con soporte CUDA
-- GPU NVIDIA RTX 3050 
-- Dataset estructurado en formato YOLO
-"""
-
-from ultralytics import YOLO
-
-def main():
-    """
-    Función principal para entrenar el modelo YOLO de instrumentos dentales.
-    
-    Configura y ejecuta el entrenamiento del modelo utilizando los parámetros
-    optimizados para detección de instrumentos dentales con hardware RTX 3050.
-    """
-    
-    # Inicialización del modelo YOLO pre-entrenado
-    # yolov8n.pt: Modelo nano (más rápido, menos preciso)
-    # Alternativa: yolov8s.pt para mayor precisión con mayor tiempo de procesamiento
-    model = YOLO("yolov8n.pt")
-    
-    # Configuración y ejecución del entrenamiento
-    model.train(
-        data="datasets/data.yaml",                    # Ruta al archivo de configuración del dataset
-        epochs=100,                                   # Número de épocas de entrenamiento
-        imgsz=640,                                   # Tamaño de imagen de entrada (640x640 píxeles)
-        batch=8,                                     # Tamaño del batch (optimizado para RTX 3050)
-        name="instrumentos_dentales_yolo_model",     # Nombre del experimento para guardar resultados
-        device="cuda"                                # Utilizar GPU CUDA para acelerar entrenamiento
-    )
-
-if __name__ == "__main__":
-    # Punto de entrada del programa
-    # Ejecuta la función main() solo si el script se ejecuta directamente
-    main()
\ No newline at end of file
+"""
+Entrenamiento de Modelo YOLO para Reconocimiento de Instrumentos Dentales
+
+Descripción:
+Este script entrena un modelo de detección de objetos YOLO (You Only Look Once)
+versión 8 para reconocer y clasificar instrumentos dentales. Utiliza el framework
+Ultralytics YOLO y se configura por línea de comandos o archivo YAML, sin editar
+el código: elige el dispositivo disponible (GPU CUDA, Apple MPS o CPU), cachea las
+imágenes en RAM o disco, dimensiona los workers y el batch según el equipo, y
+reanuda automáticamente desde el último checkpoint si un entrenamiento se
+interrumpió.
+
+El modelo entrenado será capaz de detectar y clasificar diferentes tipos de
+instrumentos dentales en imágenes, proporcionando coordenadas de bounding boxes
+y etiquetas de clasificación.
+
+Uso:
+python train_dental_instruments_yolo.py
+python train_dental_instruments_yolo.py --device cpu --imgsz 416 --epocas 50 --cache ram
+python train_dental_instruments_yolo.py --config entrenamiento_nocturno.yaml
+python train_dental_instruments_yolo.py --nuevo   # ignorar el checkpoint y empezar de cero
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: train_dental_instruments_yolo.py
+
+Requisitos:
+- ultralytics
+- PyTorch (CUDA opcional; en CPU también funciona)
+- psutil, PyYAML
+- Dataset estructurado en formato YOLO
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import psutil
+import yaml
+
+RUTA_DATA_YAML = "datasets/data.yaml"
+PROYECTO = "runs/detect"
+NOMBRE_EXPERIMENTO = "instrumentos_dentales_yolo_entrenamiento"
+
+# Fracción de la RAM disponible que puede ocupar el caché de imágenes
+FRACCION_RAM_CACHE = 0.5
+# Batch por GPU con varias GPUs (DDP): AutoBatch no está disponible ahí
+BATCH_POR_GPU = 16
+
+# Opciones que fija el checkpoint al reanudar: argumento -> clave de train_args
+OPCIONES_CHECKPOINT = {'modelo': 'model', 'data': 'data', 'epocas': 'epochs', 'imgsz': 'imgsz'}
+
+
+def elegir_dispositivo(solicitado="auto"):
+    """
+    Dispositivo de entrenamiento: el solicitado o, con "auto", el mejor disponible.
+
+    Returns:
+        str: "cuda", "mps" o "cpu" (o el valor explícito recibido, p. ej. "0,1")
+    """
+    if solicitado != "auto":
+        return solicitado
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def imagenes_entrenamiento(data=RUTA_DATA_YAML):
+    """Rutas de las imágenes de entrenamiento declaradas en data.yaml"""
+    with open(data, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    carpeta = os.path.normpath(os.path.join(os.path.dirname(data), config["train"]))
+    if not os.path.isdir(carpeta):
+        # Roboflow escribe "../train/images" relativo a la carpeta padre del YAML
+        carpeta = os.path.join(os.path.dirname(data), "train", "images")
+    return glob.glob(os.path.join(carpeta, "*.*"))
+
+
+def elegir_cache(solicitado, imgsz, data=RUTA_DATA_YAML):
+    """
+    Caché de imágenes: "ram", "disk" o False.
+
+    Con "auto", RAM si las imágenes decodificadas a imgsz caben holgadamente
+    en la memoria disponible; si no, disco (archivos .npy junto a las imágenes),
+    que aun así evita decodificar JPEG en cada época.
+    """
+    if solicitado in ("no", "false", False, None):
+        return False
+    if solicitado != "auto":
+        return solicitado
+    # Estimación: imgsz x imgsz x 3 bytes por imagen (Ultralytics redimensiona al cachear)
+    bytes_cache = len(imagenes_entrenamiento(data)) * imgsz * imgsz * 3
+    disponible = psutil.virtual_memory().available
+    return "ram" if bytes_cache < disponible * FRACCION_RAM_CACHE else "disk"
+
+
+def elegir_workers(dispositivo, solicitado=None):
+    """
+    Procesos del DataLoader.
+
+    En GPU conviene un worker por núcleo (hasta 8) para no dejarla esperando;
+    en CPU los workers compiten con el propio entrenamiento, así que se usa
+    la mitad de los núcleos y el resto queda para PyTorch.
+    """
+    if solicitado is not None:
+        return solicitado
+    nucleos = os.cpu_count() or 1
+    if dispositivo == "cpu":
+        return max(1, min(8, nucleos // 2))
+    return max(1, min(8, nucleos))
+
+
+def elegir_batch(dispositivo, imgsz, solicitado="auto"):
+    """
+    Tamaño del batch.
+
+    En una sola GPU CUDA, -1 activa AutoBatch de Ultralytics (~60% de su
+    memoria). Con varias GPUs ("0,1") Ultralytics entrena con DDP, que no
+    admite AutoBatch: se usa BATCH_POR_GPU por cada una. En CPU/MPS AutoBatch
+    no aplica: se escala un batch base de 16 a 640 px inversamente al área
+    de la imagen, acotado entre 4 y 64.
+    """
+    if solicitado != "auto":
+        return int(solicitado)
+    if dispositivo.startswith("cuda") or dispositivo[:1].isdigit():
+        gpus = [g for g in dispositivo.replace("cuda:", "").split(",") if g.strip()]
+        return -1 if len(gpus) <= 1 else BATCH_POR_GPU * len(gpus)
+    batch = int(16 * (640 / imgsz) ** 2)
+    # Potencia de 2 más cercana por debajo
+    return max(4, min(64, 1 << (batch.bit_length() - 1)))
+
+
+def estado_experimento(nombre=NOMBRE_EXPERIMENTO, proyecto=PROYECTO):
+    """
+    Estado del experimento según su last.pt.
+
+    Al terminar, Ultralytics elimina el optimizador del checkpoint y marca
+    epoch = -1; un last.pt con epoch >= 0 pertenece a un entrenamiento que
+    no llegó al final y puede reanudarse.
+
+    Returns:
+        tuple: ("nuevo" | "interrumpido" | "terminado", ruta de last.pt,
+        train_args del checkpoint)
+    """
+    ultimo = os.path.join(proyecto, nombre, "weights", "last.pt")
+    if not os.path.exists(ultimo):
+        return "nuevo", ultimo, {}
+    import torch
+
+    checkpoint = torch.load(ultimo, map_location="cpu", weights_only=False)
+    estado = "interrumpido" if checkpoint.get("epoch", -1) >= 0 else "terminado"
+    return estado, ultimo, checkpoint.get("train_args") or {}
+
+
+def _mismo_valor(opcion, solicitado, guardado):
+    if opcion == 'data':
+        return os.path.abspath(str(solicitado)) == os.path.abspath(str(guardado))
+    if opcion == 'modelo':
+        return os.path.basename(str(solicitado)) == os.path.basename(str(guardado))
+    return str(solicitado) == str(guardado)
+
+
+def diferencias_checkpoint(args, train_args, predeterminados):
+    """
+    Opciones pedidas con un valor distinto del predeterminado (línea de
+    comandos o --config) que no coinciden con las del entrenamiento que se
+    reanudaría; las que quedan en su valor predeterminado siguen al checkpoint.
+
+    Returns:
+        list: (opción, valor pedido, valor del checkpoint)
+    """
+    diferencias = []
+    for opcion, clave in OPCIONES_CHECKPOINT.items():
+        solicitado = getattr(args, opcion)
+        if solicitado == getattr(predeterminados, opcion) or clave not in train_args:
+            continue
+        if not _mismo_valor(opcion, solicitado, train_args[clave]):
+            diferencias.append((opcion, solicitado, train_args[clave]))
+    return diferencias
+
+
+def parametros_entrenamiento(dispositivo="auto", imgsz=640, batch="auto", cache="auto", workers=None,
+                             data=RUTA_DATA_YAML):
+    """Parámetros de model.train que dependen del equipo (compartidos con barrido_pareto.py)"""
+    dispositivo = elegir_dispositivo(dispositivo)
+    return {
+        'device': dispositivo,
+        'batch': elegir_batch(dispositivo, imgsz, batch),
+        'cache': elegir_cache(cache, imgsz, data),
+        'workers': elegir_workers(dispositivo, workers),
+        # Precisión mixta solo tiene sentido en GPU
+        'amp': dispositivo != "cpu"
+    }
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo YOLO de instrumentos dentales")
+    parser.add_argument("--config", default=None,
+                        help="Archivo YAML con cualquiera de estas opciones (la línea de comandos tiene prioridad)")
+    parser.add_argument("--modelo", default="yolov8n.pt",
+                        help="Pesos iniciales: yolov8n.pt (rápido), yolov8s.pt (más preciso) o un best.pt propio")
+    parser.add_argument("--data", default=RUTA_DATA_YAML, help="Archivo YAML del dataset")
+    parser.add_argument("--epocas", type=int, default=100, help="Número de épocas de entrenamiento")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamaño de imagen de entrada")
+    parser.add_argument("--batch", default="auto", help="Tamaño del batch o 'auto'")
+    parser.add_argument("--device", default="auto", help="auto, cpu, cuda, mps o índices de GPU (0,1)")
+    parser.add_argument("--cache", choices=["auto", "ram", "disk", "no"], default="auto",
+                        help="Caché de imágenes decodificadas entre épocas")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del DataLoader (auto por defecto)")
+    parser.add_argument("--paciencia", type=int, default=50,
+                        help="Épocas sin mejora antes de detener (early stopping)")
+    parser.add_argument("--nombre", default=NOMBRE_EXPERIMENTO,
+                        help="Nombre del experimento (carpeta fija en runs/detect, para poder reanudar)")
+    parser.add_argument("--nuevo", action="store_true",
+                        help="Empezar de cero y sobrescribir el experimento con ese nombre (interrumpido o terminado)")
+    return parser
+
+
+def leer_argumentos(argv=None):
+    """Línea de comandos sobre los valores del archivo --config (si se indica)"""
+    parser = crear_parser()
+    previos, _ = parser.parse_known_args(argv)
+    if previos.config:
+        with open(previos.config, encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        desconocidas = set(config) - {a.dest for a in parser._actions}
+        if desconocidas:
+            parser.error(f"Opciones desconocidas en {previos.config}: {', '.join(sorted(desconocidas))}")
+        parser.set_defaults(**config)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Función principal para entrenar el modelo YOLO de instrumentos dentales.
+
+    Resuelve la configuración dependiente del equipo y entrena, o reanuda el
+    entrenamiento interrumpido del mismo experimento desde su last.pt.
+    """
+    from ultralytics import YOLO
+
+    args = leer_argumentos(argv)
+    parametros = parametros_entrenamiento(args.device, args.imgsz, args.batch, args.cache, args.workers, args.data)
+    print(f"⚙️ Dispositivo: {parametros['device']} • batch: {parametros['batch']} • "
+          f"caché: {parametros['cache'] or 'no'} • workers: {parametros['workers']}")
+
+    estado, ultimo, train_args = estado_experimento(args.nombre)
+    if estado == "terminado" and not args.nuevo:
+        print(f"❌ El experimento {args.nombre} ya terminó ({ultimo}); usa otro --nombre o --nuevo para sobrescribirlo")
+        return 1
+    if estado == "interrumpido" and not args.nuevo:
+        # Al reanudar, Ultralytics usa modelo, data, épocas e imgsz del checkpoint:
+        # pedir otros valores sin --nuevo se ignoraría en silencio
+        diferencias = diferencias_checkpoint(args, train_args, crear_parser().parse_args([]))
+        if diferencias:
+            for opcion, solicitado, guardado in diferencias:
+                print(f"❌ --{opcion} {solicitado} no coincide con el entrenamiento interrumpido ({guardado})")
+            print(f"   Reanudar usa los valores de {ultimo}; usa --nuevo u otro --nombre para aplicarlos")
+            return 1
+        # Ultralytics retoma época, optimizador y EMA del checkpoint; device y batch
+        # se pueden cambiar (p. ej. reanudar en CPU un entrenamiento iniciado en GPU)
+        print(f"↩️ Reanudando desde {ultimo}")
+        YOLO(ultimo).train(resume=True, device=parametros['device'], batch=parametros['batch'],
+                           workers=parametros['workers'])
+        return 0
+
+    # Inicialización del modelo YOLO pre-entrenado
+    model = YOLO(args.modelo)
+
+    # Configuración y ejecución del entrenamiento
+    model.train(
+        data=args.data,                               # Ruta al archivo de configuración del dataset
+        epochs=args.epocas,                           # Número de épocas de entrenamiento
+        imgsz=args.imgsz,                             # Tamaño de imagen de entrada
+        patience=args.paciencia,                      # Early stopping
+        project=PROYECTO,
+        name=args.nombre,                             # Nombre fijo: el mismo experimento se puede reanudar
+        exist_ok=True,
+        **parametros                                  # device, batch, cache, workers, amp
+    )
+    return 0
+
+if __name__ == "__main__":
+    # Configuración específica para compatibilidad con Windows
+    # freeze_support() evita problemas con los workers del DataLoader en Windows
+    import multiprocessing
+    multiprocessing.freeze_support()
+
+    # Punto de entrada del programa
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Transmisión MJPEG del Video Anotado para MedSeen
+
+Descripción:
+Este módulo sirve el video anotado al navegador como un flujo MJPEG
+(multipart/x-mixed-replace) desde un servidor HTTP ligero en segundo plano,
+en lugar de reenviar cada frame con st.image en cada rerun de Streamlit.
+El navegador muestra el flujo en una etiqueta <img> que no cambia entre
+reruns, así el video avanza al ritmo de la cámara mientras el resto de la
+página permanece estático.
+
+Cada frame se redimensiona a la resolución de visualización y se codifica a
+JPEG una sola vez por versión, sin importar cuántos clientes lo vean. La
+calidad JPEG, la resolución y los FPS de la transmisión son independientes
+de la resolución de inferencia y propios de cada sesión.
+
+El servidor escucha solo en 127.0.0.1: el video clínico no se expone a la
+red sin autenticación. Para verlo desde otro equipo hay que definir
+MEDSEEN_HOST_VIDEO (y MEDSEEN_URL_VIDEO con la dirección accesible).
+
+Funcionalidades:
+- Endpoint /video/<clave>/<indice>.mjpg (flujo) y /frame/<clave>/<indice>.jpg
+- Calidad JPEG, ancho de visualización y FPS configurables en vivo por sesión
+- Codificación compartida entre clientes (una vez por frame nuevo)
+- Varias sesiones en el mismo proceso, separadas por clave
+
+Autor(es):
+- Juan Fernando Vaquera Sanchez (21130869)
+- Miriam Alicia Sanchez Cervantes (21130882)
+- Diego Muñoz Rede (21130893)
+
+Archivo: transmision.py
+
+Requisitos:
+- opencv-python (cv2)
+"""
+
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+# Interfaz en la que escucha el servidor; por defecto solo el propio equipo
+HOST_VIDEO = os.environ.get("MEDSEEN_HOST_VIDEO", "127.0.0.1")
+PUERTO_VIDEO = int(os.environ.get("MEDSEEN_PUERTO_VIDEO", 8765))
+# Dirección con la que el navegador llega al servidor (cambiarla si la app se usa de forma remota)
+URL_BASE_VIDEO = os.environ.get("MEDSEEN_URL_VIDEO", f"http://localhost:{PUERTO_VIDEO}")
+
+LIMITE = b"frame"
+RUTA_VIDEO = re.compile(r"^/(video|frame)/([\w-]+)/(\d+)\.(mjpg|jpg)$")
+
+
+class CanalVideo:
+    """JPEG más reciente de una fuente; se codifica una sola vez por versión"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clave = None
+        self._jpeg = None
+
+    def jpeg(self, frame, version, calidad, ancho):
+        clave = (version, calidad, ancho)
+        with self._lock:
+            if clave != self._clave:
+                self._jpeg = codificar_jpeg(frame, calidad, ancho)
+                self._clave = clave
+            return self._jpeg
+
+
+def codificar_jpeg(frame_rgb, calidad=80, ancho=None):
+    """Redimensiona (si es más ancho que `ancho`) y codifica un frame RGB a JPEG"""
+    alto_orig, ancho_orig = frame_rgb.shape[:2]
+    if ancho and ancho_orig > ancho:
+        alto = round(alto_orig * ancho / ancho_orig)
+        frame_rgb = cv2.resize(frame_rgb, (ancho, alto), interpolation=cv2.INTER_AREA)
+    # Convertir después de reducir: la copia BGR es del tamaño de visualización
+    frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+    ok, datos = cv2.imencode(".jpg", frame_bgr, [cv2.IMWRITE_JPEG_QUALITY, int(calidad)])
+    return datos.tobytes() if ok else None
+
+
+class _ManejadorMJPEG(BaseHTTPRequestHandler):
+    servidor_medseen = None
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        coincidencia = RUTA_VIDEO.match(self.path.split("?")[0])
+        if not coincidencia:
+            self.send_error(404)
+            return
+        tipo, clave, indice = coincidencia.group(1), coincidencia.group(2), int(coincidencia.group(3))
+        if not self.servidor_medseen.tiene(clave):
+            self.send_error(404, "Sesión no encontrada")
+            return
+
+        try:
+            if tipo == "frame":
+                self._enviar_frame(clave, indice)
+            else:
+                self._enviar_flujo(clave, indice)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _enviar_frame(self, clave, indice):
+        jpeg, _ = self.servidor_medseen.jpeg(clave, indice)
+        if jpeg is None:
+            self.send_error(503, "Sin frames")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def _enviar_flujo(self, clave, indice):
+        servidor = self.servidor_medseen
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={LIMITE.decode()}")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        ultima = None
+        servidor.clientes += 1
+        try:
+            while servidor.activo and servidor.tiene(clave):
+                inicio = time.monotonic()
+                fps = servidor.ajustes(clave)['fps']
+                jpeg, version = servidor.jpeg(clave, indice)
+                if jpeg is not None and version != ultima:
+                    ultima = version
+                    self.wfile.write(b"--" + LIMITE + b"\r\nContent-Type: image/jpeg\r\n"
+                                     + f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                    self.wfile.flush()
+                time.sleep(max(0.0, 1.0 / fps - (time.monotonic() - inicio)))
+        finally:
+            servidor.clientes -= 1
+
+
+class ServidorMJPEG:
+    """
+    Servidor HTTP en segundo plano que transmite el video de una o más sesiones.
+
+    Cada sesión se registra con una clave y un proveedor
+    `proveedor(indice) -> (frame_rgb, version)` que devuelve el último
+    frame anotado de la fuente indicada sin bloquear. Calidad, ancho y FPS
+    se guardan por sesión: lo que ajusta una pestaña no cambia las demás.
+    Los valores del constructor son los de una sesión que no indica otros.
+    """
+
+    def __init__(self, host=HOST_VIDEO, puerto=PUERTO_VIDEO, calidad=80, ancho=640, fps=15):
+        self.host = host
+        self.puerto = puerto
+        self.predeterminados = {'calidad': calidad, 'ancho': ancho, 'fps': fps}
+        self.activo = False
+        self.clientes = 0
+        self._proveedores = {}
+        self._ajustes = {}
+        self._canales = {}
+        self._lock = threading.Lock()
+        self._http = None
+        self._hilo = None
+
+    def configurar(self, clave, calidad=None, ancho=None, fps=None):
+        """Cambia calidad, ancho de visualización o FPS de una sesión; aplica al siguiente frame"""
+        with self._lock:
+            ajustes = dict(self._ajustes.get(clave, self.predeterminados))
+            if calidad is not None:
+                ajustes['calidad'] = calidad
+            if ancho is not None:
+                ajustes['ancho'] = ancho
+            if fps is not None:
+                ajustes['fps'] = max(1, fps)
+            self._ajustes[clave] = ajustes
+
+    def ajustes(self, clave):
+        return self._ajustes.get(clave, self.predeterminados)
+
+    def registrar(self, clave, proveedor, **ajustes):
+        """Registra (o actualiza) una sesión; `ajustes` acepta calidad, ancho y fps"""
+        with self._lock:
+            self._proveedores[clave] = proveedor
+        self.configurar(clave, **ajustes)
+
+    def retirar(self, clave):
+        with self._lock:
+            self._proveedores.pop(clave, None)
+            self._ajustes.pop(clave, None)
+            for k in [k for k in self._canales if k[0] == clave]:
+                del self._canales[k]
+
+    def tiene(self, clave):
+        return clave in self._proveedores
+
+    def jpeg(self, clave, indice):
+        """JPEG del último frame de la fuente (compartido entre clientes)"""
+        with self._lock:
+            proveedor = self._proveedores.get(clave)
+            canal = self._canales.setdefault((clave, indice), CanalVideo())
+        if proveedor is None:
+            return None, None
+        frame, version = proveedor(indice)
+        if frame is None:
+            return None, version
+        ajustes = self.ajustes(clave)
+        return canal.jpeg(frame, version, ajustes['calidad'], ajustes['ancho']), version
+
+    def url(self, clave, indice, base=URL_BASE_VIDEO):
+        return f"{base}/video/{clave}/{indice}.mjpg"
+
+    def iniciar(self):
+        """Abre el puerto y atiende en un hilo daemon; lanza OSError si el puerto está ocupado"""
+        if self.activo:
+            return
+        manejador = type("ManejadorMedSeen", (_ManejadorMJPEG,), {"servidor_medseen": self})
+        self._http = ThreadingHTTPServer((self.host, self.puerto), manejador)
+        self._http.daemon_threads = True
+        self.activo = True
+        self._hilo = threading.Thread(target=self._http.serve_forever, name="medseen-mjpeg", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self.activo = False
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+
+# Un solo servidor por proceso: sobrevive a los reruns de Streamlit
+_servidor = None
+_lock_servidor = threading.Lock()
+
+
+def obtener_servidor():
+    """Devuelve el servidor MJPEG del proceso, iniciándolo la primera vez"""
+    global _servidor
+    with _lock_servidor:
+        if _servidor is None:
+            servidor = ServidorMJPEG()
+            servidor.iniciar()
+            _servidor = servidor
+        return _servidor
+
+
+def retirar_sesion(clave):
+    """Deja de transmitir una sesión (no hace nada si el servidor nunca se inició)"""
+    with _lock_servidor:
+        servidor = _servidor
+    if servidor is not None:
+        servidor.retirar(clave)